@@ -9,5 +9,6 @@ echo "Waiting for database to be ready..."
 
 #python manage.py makemigrations --noinput
 #python manage.py migrate --noinput
+#python manage.py refresh_tenant_template
 
 exec "$@"
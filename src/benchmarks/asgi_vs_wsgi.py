@@ -0,0 +1,87 @@
+"""
+This file is part of the Yoona.ai project.
+It compares the WSGI (gunicorn) and the ASGI (daphne) deployments
+by hammering the `me` endpoint of both with the same bearer token.
+
+Usage:
+    python -m benchmarks.asgi_vs_wsgi --token <access token> \\
+        --wsgi-url http://localhost:8000/users/me/ \\
+        --asgi-url http://localhost:8001/users/me/async/
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+
+async def _worker(session, url, headers, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, token: str, host: str, concurrency: int, duration: float) -> dict:
+    """
+    Run `concurrency` clients against the url for `duration` seconds.
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    if host:
+        # the tenant is resolved from the host header
+        headers["Host"] = host
+    latencies: list[float] = []
+    errors: list = []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                _worker(session, url, headers, deadline, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+    latencies.sort()
+    p99_index = min(len(latencies) - 1, int(len(latencies) * 0.99))
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[p99_index] * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--token", required=True, help="access token of an active user")
+    parser.add_argument("--host", default="", help="host header used to resolve the tenant")
+    parser.add_argument("--wsgi-url", default="http://localhost:8000/users/me/")
+    parser.add_argument("--asgi-url", default="http://localhost:8001/users/me/async/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, url in (("wsgi", args.wsgi_url), ("asgi", args.asgi_url)):
+        result = asyncio.run(
+            run(url, args.token, args.host, args.concurrency, args.duration)
+        )
+        print(
+            f"{name:<6} {result['requests']:>9} {result['errors']:>7} "
+            f"{result['rps']:>9.1f} {result['p50_ms'] or 0:>8.2f} {result['p99_ms'] or 0:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+This file is part of the Yoona.ai project.
+It compares the time to create the schema of a country
+by running the migrations and by cloning the template schema.
+The migrations path grows with the number of migrations,
+the clone path with the size of the schema only.
+
+The schemas are created under throwaway names and dropped afterwards,
+no country row is created.
+
+Usage:
+    python -m benchmarks.country_provisioning --rounds 3
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django.db import connection  # noqa: E402
+from django_tenants.models import TenantMixin  # noqa: E402
+
+from services.country.models import Country  # noqa: E402
+from services.country.utils import template  # noqa: E402
+
+
+def drop_schema(schema_name: str) -> None:
+    connection.set_schema_to_public()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE')
+
+
+def time_creation(create) -> float:
+    """
+    Create a throwaway schema with `create` and return the elapsed seconds.
+    """
+    schema_name = f"bench_{uuid.uuid4().hex[:12]}"
+    country = Country(schema_name=schema_name, name=schema_name)
+    start = time.perf_counter()
+    try:
+        create(country)
+        return time.perf_counter() - start
+    finally:
+        drop_schema(schema_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    if not template.is_template_current():
+        print("Refreshing the template schema...")
+        template.refresh_template(verbosity=0)
+
+    migrations = len(template.get_disk_migrations())
+    results = {
+        "migrate": [
+            time_creation(lambda country: TenantMixin.create_schema(country, verbosity=0))
+            for _ in range(args.rounds)
+        ],
+        "clone": [
+            time_creation(lambda country: template.clone_template(country.schema_name))
+            for _ in range(args.rounds)
+        ],
+    }
+
+    print(f"{migrations} migrations, {args.rounds} rounds")
+    for mode, timings in results.items():
+        print(
+            f"{mode:<8} median {statistics.median(timings):7.3f}s"
+            f"  min {min(timings):7.3f}s  max {max(timings):7.3f}s"
+        )
+    print(f"migrate  {statistics.median(results['migrate']) / max(migrations, 1) * 1000:7.1f}ms per migration")
+    print(
+        f"speedup {statistics.median(results['migrate']) / statistics.median(results['clone']):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
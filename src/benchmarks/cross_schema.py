@@ -0,0 +1,103 @@
+"""
+This file is part of the Yoona.ai project.
+It compares an aggregate over the users of many country schemas,
+run as one `UNION ALL` statement (`iterate_cross_schema`)
+and as a loop switching the schema of every country.
+
+Without enough countries, `--create` clones throwaway schemas
+from the template schema and drops them afterwards.
+
+Usage:
+    python -m benchmarks.cross_schema --create 150 --rounds 5
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django_tenants.utils import schema_context  # noqa: E402
+
+from services.country.utils import template  # noqa: E402
+from services.country.utils.cross_schema import get_country_schemas, iterate_cross_schema  # noqa: E402
+from services.user.models import User  # noqa: E402
+
+
+def make_queryset():
+    return User.objects.values("is_active", "is_verified").annotate(count=Count("id")).order_by()
+
+
+def per_schema_loop(schemas) -> list:
+    rows = []
+    for schema_name in schemas:
+        with schema_context(schema_name):
+            rows.extend({"schema_name": schema_name, **row} for row in make_queryset())
+    return rows
+
+
+def union_all(schemas) -> list:
+    return list(iterate_cross_schema(make_queryset(), schemas))
+
+
+def measure(func, schemas, rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(schemas)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--create", type=int, default=0, help="Number of throwaway schemas to create")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    created = []
+    if args.create:
+        if not template.is_template_current():
+            template.refresh_template(verbosity=0)
+        for _ in range(args.create):
+            schema_name = f"bench_{uuid.uuid4().hex[:12]}"
+            template.clone_template(schema_name)
+            created.append(schema_name)
+    schemas = created or get_country_schemas()
+
+    try:
+        # warm up the connection and check both return the same rows
+        key = lambda row: (row["schema_name"], row["is_active"], row["is_verified"])  # noqa: E731
+        assert sorted(per_schema_loop(schemas), key=key) == sorted(union_all(schemas), key=key)
+
+        results = {
+            "loop": measure(per_schema_loop, schemas, args.rounds),
+            "union all": measure(union_all, schemas, args.rounds),
+        }
+    finally:
+        connection.set_schema_to_public()
+        with connection.cursor() as cursor:
+            for schema_name in created:
+                cursor.execute(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE')
+
+    print(f"{len(schemas)} schemas, {args.rounds} rounds")
+    for name, timings in results.items():
+        print(
+            f"{name:<10} median {statistics.median(timings) * 1000:9.1f}ms"
+            f"  min {min(timings) * 1000:9.1f}ms  max {max(timings) * 1000:9.1f}ms"
+        )
+    print(
+        f"speedup {statistics.median(results['loop']) / statistics.median(results['union all']):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+This file is part of the Yoona.ai project.
+It compares the two worker models for the email tasks, sending the same
+messages over `helpers.email.pool` to an SMTP server answering with a latency:
+- prefork: a process per SMTP conversation in flight (the default celery pool),
+- threads: a single process with a thread per conversation (`celery-email-worker`).
+
+The memory is the proportional set size (PSS) of the sending processes,
+so the pages the forked processes share are not counted more than once.
+
+By default, the messages are sent to a local aiosmtpd server discarding them
+after `--latency` ms (`pip install aiosmtpd`, it is not a dependency of the project).
+
+Usage:
+    python -m benchmarks.email_worker_pool --messages 2000 --concurrency 50 --latency 50
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django.conf import settings  # noqa: E402
+from django.core.mail import EmailMultiAlternatives  # noqa: E402
+
+from helpers.email.pool import SMTPConnectionPool  # noqa: E402
+
+
+class LatencySink:
+    """
+    aiosmtpd handler accepting every message after a delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802 pylint: disable=invalid-name
+        await asyncio.sleep(self.latency)
+        return "250 OK"
+
+
+def make_message() -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        "Benchmark", "text body", "bench@example.com", ["recipient@example.com"]
+    )
+    message.attach_alternative("<p>html body</p>", "text/html")
+    return message
+
+
+def get_memory() -> int:
+    """
+    Return the PSS (RSS if unavailable) of the current process in bytes.
+    """
+    for path, field in (("/proc/self/smaps_rollup", "Pss:"), ("/proc/self/status", "VmRSS:")):
+        try:
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    if line.startswith(field):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return 0
+
+
+def run_sender(count: int, threads: int, start, results) -> None:
+    """
+    Send `count` messages with `threads` threads sharing the pool of the process.
+    """
+    pool = SMTPConnectionPool(
+        max_connections=threads,
+        max_messages=10_000,
+        noop_after=30,
+        max_idle=240,
+        max_per_host=threads,
+    )
+    start.wait()
+    started_at = time.perf_counter()
+    if threads == 1:
+        for _ in range(count):
+            pool.send(make_message())
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: pool.send(make_message()), range(count)))
+    elapsed = time.perf_counter() - started_at
+    results.put((elapsed, get_memory()))
+    pool.close_all()
+
+
+def measure(processes: int, threads: int, messages: int) -> tuple[float, int]:
+    """
+    Send the messages from `processes` processes of `threads` threads each.
+
+    :return: the elapsed seconds and the memory of the processes in bytes
+    """
+    context = multiprocessing.get_context("fork")
+    start, results = context.Event(), context.Queue()
+    workers = [
+        context.Process(
+            target=run_sender,
+            args=(messages // processes + (index < messages % processes), threads, start, results),
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    start.set()
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return max(elapsed for elapsed, _ in outcomes), sum(memory for _, memory in outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50, help="SMTP conversations in flight")
+    parser.add_argument("--latency", type=float, default=50, help="Latency of the local server in ms")
+    parser.add_argument("--host", help="SMTP server, a local aiosmtpd server is started if missing")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller = None
+    if args.host is None:
+        # pylint: disable=import-outside-toplevel
+        from aiosmtpd.controller import Controller
+
+        controller = Controller(LatencySink(args.latency / 1000), hostname="127.0.0.1", port=args.port)
+        controller.start()
+        settings.EMAIL_HOST, settings.EMAIL_PORT = "127.0.0.1", args.port
+        settings.EMAIL_USE_TLS = settings.EMAIL_USE_SSL = False
+        settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+    else:
+        settings.EMAIL_HOST, settings.EMAIL_PORT = args.host, args.port
+
+    try:
+        results = {
+            "prefork": measure(args.concurrency, 1, args.messages),
+            "threads": measure(1, args.concurrency, args.messages),
+        }
+    finally:
+        if controller is not None:
+            controller.stop()
+
+    print(
+        f"{args.messages} messages to {settings.EMAIL_HOST}:{settings.EMAIL_PORT}, "
+        f"{args.concurrency} in flight"
+    )
+    efficiency = {}
+    for name, (elapsed, memory) in results.items():
+        rate = args.messages / elapsed
+        megabytes = memory / 2**20
+        efficiency[name] = rate / megabytes if megabytes else 0
+        print(
+            f"{name:<8} {rate:8.1f} msg/s  {megabytes:8.1f} MB  {efficiency[name]:8.2f} msg/s per MB"
+        )
+    if efficiency["prefork"]:
+        print(f"threads / prefork {efficiency['threads'] / efficiency['prefork']:.1f}x msg/s per MB")
+
+
+if __name__ == "__main__":
+    main()
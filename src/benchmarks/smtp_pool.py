@@ -0,0 +1,94 @@
+"""
+This file is part of the Yoona.ai project.
+It measures the messages/sec sent by `helpers.email.send.send_email`
+with a new SMTP session per message (`msg.send()`) and with the pooled
+sessions of `helpers.email.pool`.
+
+By default, the messages are sent to a local aiosmtpd server discarding them
+(`pip install aiosmtpd`, it is not a dependency of the project).
+Use --host/--port (and the EMAIL_* settings) to target another server,
+the gap is much larger with TLS and a remote server.
+
+Usage:
+    python -m benchmarks.smtp_pool --messages 500
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django.conf import settings  # noqa: E402
+from django.core.mail import EmailMultiAlternatives  # noqa: E402
+
+from helpers.email.pool import SMTPConnectionPool  # noqa: E402
+
+
+def make_message() -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        "Benchmark", "text body", "bench@example.com", ["recipient@example.com"]
+    )
+    message.attach_alternative("<p>html body</p>", "text/html")
+    return message
+
+
+def per_message_session(count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        make_message().send(fail_silently=False)
+    return time.perf_counter() - start
+
+
+def pooled_session(count: int) -> float:
+    pool = SMTPConnectionPool.from_settings()
+    start = time.perf_counter()
+    for _ in range(count):
+        pool.send(make_message())
+    elapsed = time.perf_counter() - start
+    pool.close_all()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--host", help="SMTP server, a local aiosmtpd server is started if missing")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller = None
+    if args.host is None:
+        # pylint: disable=import-outside-toplevel
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+
+        controller = Controller(Sink(), hostname="127.0.0.1", port=args.port)
+        controller.start()
+        settings.EMAIL_HOST, settings.EMAIL_PORT = "127.0.0.1", args.port
+        settings.EMAIL_USE_TLS = settings.EMAIL_USE_SSL = False
+        settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+    else:
+        settings.EMAIL_HOST, settings.EMAIL_PORT = args.host, args.port
+
+    try:
+        results = {
+            "per message": per_message_session(args.messages),
+            "pooled": pooled_session(args.messages),
+        }
+    finally:
+        if controller is not None:
+            controller.stop()
+
+    print(f"{args.messages} messages to {settings.EMAIL_HOST}:{settings.EMAIL_PORT}")
+    for name, elapsed in results.items():
+        print(f"{name:<12} {args.messages / elapsed:9.1f} msg/s  ({elapsed:.2f}s)")
+    print(f"speedup {results['per message'] / results['pooled']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,21 @@
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
+from services.mailer.utils.queues import SECURITY_EMAIL_LANES  # noqa # pylint: disable=import-error
+
 from helpers.environ.environ import Env  # noqa # pylint: disable=import-error
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 env = Env(os.path.join(BASE_DIR, ".env"))
 
-include = ["services.mailer.tasks.security"]
-imports = ["services.mailer.tasks.security"]
+include = [
+    "services.mailer.tasks.security",
+    "services.mailer.tasks.partitions",
+    "services.country.tasks.onboarding",
+]
+imports = include
 
 enable_utc = os.environ.get("CELERY_ENABLE_UTC", True)
 timezone = os.environ.get("CELERY_TIMEZONE", "Europe/Berlin")
@@ -27,3 +35,42 @@ broker_write_url = CELERY_BROKER_URL
 broker_read_url = CELERY_BROKER_URL
 result_backend = CELERY_BROKER_URL
 broker_connection_max_retries = env.int_env("CELERY_BROKER_CONNECTION_MAX_RETRIES", 100)
+
+# The email tasks are network bound, they are consumed by the threaded
+# `celery-email-worker` (`-P threads`), not by the prefork worker.
+# Each lane (purpose) of the security emails has its own queue:
+# emails.password_reset > emails.activation > emails.verification > emails.bulk
+task_routes = ("services.mailer.utils.queues.route_email_task",)
+# consume the queues of a worker (`-Q`) in the given order
+# instead of round robin, so a queue is only read when the previous ones are empty
+broker_transport_options = {"queue_order_strategy": "priority"}
+worker_prefetch_multiplier = env.int_env("CELERY_WORKER_PREFETCH_MULTIPLIER", 4)
+
+# run by the `celery-beat` service
+beat_schedule = {
+    "maintain-mail-partitions": {
+        "task": "services.mailer.tasks.partitions.maintain_mail_partitions",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "reap-stale-onboarding-items": {
+        "task": "services.country.tasks.onboarding.reap_stale_onboarding_items",
+        "schedule": 300,
+    },
+    # a lost flush task (or its countdown) can not strand the pending emails of a lane
+    **{
+        f"flush-security-emails-{lane}": {
+            "task": "services.mailer.tasks.security.flush_security_emails",
+            "schedule": env.int_env("SECURITY_EMAIL_BATCH_FLUSH_INTERVAL", 10),
+            "kwargs": {"lane": lane},
+        }
+        for lane in SECURITY_EMAIL_LANES
+    },
+    **{
+        f"requeue-stale-security-emails-{lane}": {
+            "task": "services.mailer.tasks.security.requeue_stale_security_emails",
+            "schedule": 60,
+            "kwargs": {"lane": lane},
+        }
+        for lane in SECURITY_EMAIL_LANES
+    },
+}
@@ -7,3 +7,8 @@ import os
 
 # Set the number of gunicorn workers
 workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+
+# Set the number of threads per worker.
+# Threads keep serving requests while another one
+# waits for the password hashing pool.
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
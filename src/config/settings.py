@@ -38,6 +38,8 @@ SHARED_APPS = (
     "django_tenants",
     # tenant app
     "services.country",
+    # transactional outbox
+    "services.outbox",
     # yasg
     "drf_yasg",
     # jwt
@@ -79,7 +81,7 @@ CORS_ALLOW_CREDENTIALS = env.bool_env("CORS_ALLOW_CREDENTIALS", True)
 # *******************
 MIDDLEWARE = [
     # DEBUG
-    "django_tenants.middleware.main.TenantMainMiddleware",
+    "services.country.middleware.tenant.CachedTenantMiddleware",
     "django_prometheus.middleware.PrometheusBeforeMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -150,7 +152,8 @@ ASGI_APPLICATION = "core.asgi.application"
 # *******************
 DATABASES = {
     "default": {
-        "ENGINE": "django_tenants.postgresql_backend",
+        # django_tenants backend keeping the connections in a per-process pool
+        "ENGINE": "helpers.db.backends.tenant_pool",
         "NAME": env.str_env("POSTGRESQL_DATABASE", "postgres"),
         "USER": env.str_env("POSTGRESQL_USER", "postgres"),
         "PASSWORD": env.str_env("POSTGRESQL_PASSWORD", "postgres"),
@@ -159,8 +162,20 @@ DATABASES = {
         "TEST": {
             "NAME": "test_db",
         },
+        # connections are given back to the pool at the end of every request
+        "CONN_MAX_AGE": 0,
+        "POOL": {
+            "MAX_SIZE": env.int_env("DB_POOL_MAX_SIZE", 10),
+            "TIMEOUT": env.int_env("DB_POOL_TIMEOUT", 10),  # seconds
+            "MAX_IDLE": env.int_env("DB_POOL_MAX_IDLE", 300),  # seconds
+            "MAX_LIFETIME": env.int_env("DB_POOL_MAX_LIFETIME", 3600),  # seconds
+            "HEALTH_CHECK_AFTER": env.int_env("DB_POOL_HEALTH_CHECK_AFTER", 30),  # seconds
+        },
     }
 }
+# Only SET the search_path when the schema of the connection changes,
+# the pool remembers the search_path of every connection.
+TENANT_LIMIT_SET_CALLS = True
 DATABASE_ROUTERS = ("django_tenants.routers.TenantSyncRouter",)
 
 # ****************************
@@ -181,6 +196,11 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Number of processes hashing and verifying passwords
+# off the request thread (see `helpers.auth.hashing`).
+# 0 hashes the passwords on the calling thread.
+PASSWORD_HASHING_POOL_SIZE = env.int_env("PASSWORD_HASHING_POOL_SIZE", 2)
+
 # ****************************
 # *     MODELS Config        *
 # ****************************
@@ -188,6 +208,18 @@ TENANT_MODEL = "country.Country"
 TENANT_DOMAIN_MODEL = "country.Domain"
 AUTH_USER_MODEL = "user.User"
 
+# How the schema of a new country is created:
+# "clone" copies the pre-migrated template schema (if it is up-to-date),
+# "migrate" runs all the migrations of the tenant apps.
+TENANT_PROVISIONING = env.str_env("TENANT_PROVISIONING", "clone")
+TENANT_TEMPLATE_SCHEMA = env.str_env("TENANT_TEMPLATE_SCHEMA", "tenant_template")
+# Maximum number of countries of a bulk onboarding request
+COUNTRY_ONBOARDING_MAX_COUNTRIES = env.int_env("COUNTRY_ONBOARDING_MAX_COUNTRIES", 100)
+# Maximum number of countries of an onboarding job provisioned at the same time
+COUNTRY_ONBOARDING_CONCURRENCY = env.int_env("COUNTRY_ONBOARDING_CONCURRENCY", 4)
+# Seconds after which a country still being provisioned is considered lost with its worker
+COUNTRY_ONBOARDING_TIMEOUT = env.int_env("COUNTRY_ONBOARDING_TIMEOUT", 900)
+
 # ****************************
 # *  INTERNATIONALIZATION    *
 # ****************************
@@ -253,11 +285,21 @@ REST_FRAMEWORK = {
 # *      AUTHENTICATION       *
 # *****************************
 
+# `CachedPermissionBackend` replaces both `django.contrib.auth.backends.ModelBackend`
+# and `guardian.backends.ObjectPermissionBackend`, the permission checks are
+# answered from the per-user permission cache.
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
-    "guardian.backends.ObjectPermissionBackend",
+    "helpers.permissions.backends.CachedPermissionBackend",
 ]
 
+# guardian expects its own backend in AUTHENTICATION_BACKENDS
+SILENCED_SYSTEM_CHECKS = ["guardian.W001"]
+
+PERMISSION_CACHE = {
+    "CACHE_ALIAS": "shared",
+    "TIMEOUT": env.int_env("PERMISSION_CACHE_TIMEOUT", 300),  # seconds
+}
+
 # ********************************
 # *          GUARDIAN            *
 # ********************************
@@ -310,6 +352,13 @@ SIMPLE_JWT = {
     "USER_MODEL": "users.User",
 }
 
+# Memoized validated tokens (see `helpers.auth.custom_jwt.JWTAuth`).
+# Entries expire with their token, DEFAULT_TTL is used for tokens without `exp`.
+VALIDATED_TOKEN_CACHE = {
+    "MAXSIZE": env.int_env("VALIDATED_TOKEN_CACHE_MAXSIZE", 4096),
+    "DEFAULT_TTL": env.int_env("VALIDATED_TOKEN_CACHE_DEFAULT_TTL", 60),  # seconds
+}
+
 # *************************************
 # *          SWAGGER                  *
 # *************************************
@@ -331,6 +380,27 @@ EMAIL_USE_SSL = env.bool_env("EMAIL_USE_SSL", 0)
 EMAIL_HOST = env.str_env("EMAIL_HOST")
 EMAIL_PORT = env.str_env("EMAIL_PORT")
 EMAIL_FROM = env.str_env("EMAIL_FROM")
+# Persistent SMTP connections of each worker process (`helpers.email.pool`)
+EMAIL_POOL = {
+    "MAX_CONNECTIONS": env.int_env("EMAIL_POOL_MAX_CONNECTIONS", 1),
+    # the connection is closed and opened again after this number of messages
+    "MAX_MESSAGES": env.int_env("EMAIL_POOL_MAX_MESSAGES", 100),
+    # idle connections are checked with NOOP before being reused
+    "NOOP_AFTER": env.int_env("EMAIL_POOL_NOOP_AFTER", 30),  # seconds
+    "MAX_IDLE": env.int_env("EMAIL_POOL_MAX_IDLE", 240),  # seconds
+    # connections in use at the same time to the SMTP server (threaded email worker)
+    "MAX_PER_HOST": env.int_env("EMAIL_POOL_MAX_PER_HOST", 100),
+}
+
+# The mail log of each country is partitioned by month (`partition_mails`),
+# the partitions older than RETENTION_MONTHS are dumped to ARCHIVE_DIR and dropped.
+# ARCHIVE_DIR must be an existing, persistent and backed up volume: without it,
+# no partition is archived.
+MAIL_PARTITIONS = {
+    "MONTHS_AHEAD": env.int_env("MAIL_PARTITIONS_MONTHS_AHEAD", 3),
+    "RETENTION_MONTHS": env.int_env("MAIL_PARTITIONS_RETENTION_MONTHS", 12),
+    "ARCHIVE_DIR": env.str_env("MAIL_ARCHIVE_DIR"),
+}
 
 # *******************************
 # *         REDIS               *
@@ -341,6 +411,23 @@ REDIS_PASSWORD = env.str_env("REDIS_PASSWORD")
 REDIS_DB = env.str_env("REDIS_DB")
 DJANGO_CACHING_REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/10"
 
+# Security emails are queued in a redis list per lane and sent in batches over one
+# SMTP connection (`services.mailer.tasks.security.flush_security_emails`):
+# a batch is flushed when it holds MAX_MESSAGES emails or MAX_DELAY_MS after its first email.
+SECURITY_EMAIL_BATCH = {
+    "REDIS_URL": DJANGO_CACHING_REDIS_URL,
+    "KEY": "security-emails",
+    "MAX_MESSAGES": env.int_env("SECURITY_EMAIL_BATCH_MAX_MESSAGES", 50),
+    "MAX_DELAY_MS": env.int_env("SECURITY_EMAIL_BATCH_MAX_DELAY_MS", 200),
+    # the emails of a flush which did not finish within CLAIM_TIMEOUT are queued again
+    "CLAIM_TIMEOUT": env.int_env("SECURITY_EMAIL_BATCH_CLAIM_TIMEOUT", 300),  # seconds
+    # overrides per lane (`services.mailer.utils.queues.SECURITY_EMAIL_LANES`)
+    "LANES": {
+        "password_reset": {"MAX_DELAY_MS": 50},
+        "bulk": {"MAX_MESSAGES": 200, "MAX_DELAY_MS": 1000},
+    },
+}
+
 # *******************************
 # *         MONITORING          *
 # *******************************
@@ -357,16 +444,56 @@ SHOW_PUBLIC_IF_NO_TENANT_FOUND = env.bool_env("SHOW_PUBLIC_IF_NO_TENANT_FOUND",
 # *******************************
 # *          CACHE              *
 # *******************************
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-#         "LOCATION": DJANGO_CACHING_REDIS_URL,
-#     }
-# }
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # cache shared between all the processes (e.g. user snapshots)
+    "shared": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": DJANGO_CACHING_REDIS_URL,
+    },
+}
 CACHE_MIDDLEWARE_ALIAS = "default"
 CACHE_MIDDLEWARE_SECONDS = 5
 CACHE_MIDDLEWARE_KEY_PREFIX = "django-site-cache"
 
+# Two-tier cache of the users resolved by `helpers.auth.custom_jwt.JWTAuth`.
+# The per-process tier can not be invalidated from other processes,
+# so its TTL bounds how long a stale user may be served.
+USER_SNAPSHOT_CACHE = {
+    "CACHE_ALIAS": "shared",
+    "LOCAL_MAXSIZE": env.int_env("USER_SNAPSHOT_LOCAL_MAXSIZE", 1024),
+    "LOCAL_TTL": env.int_env("USER_SNAPSHOT_LOCAL_TTL", 5),  # seconds
+    "SHARED_TTL": env.int_env("USER_SNAPSHOT_SHARED_TTL", 300),  # seconds
+}
+
+# Two-tier cache of the tenants resolved by `CachedTenantMiddleware`.
+# The per-process tiers are invalidated through redis pub/sub,
+# their TTL only bounds the staleness if a message is lost.
+TENANT_CACHE = {
+    "CACHE_ALIAS": "shared",
+    "LOCAL_MAXSIZE": env.int_env("TENANT_CACHE_LOCAL_MAXSIZE", 1024),
+    "LOCAL_TTL": env.int_env("TENANT_CACHE_LOCAL_TTL", 300),  # seconds
+    "SHARED_TTL": env.int_env("TENANT_CACHE_SHARED_TTL", 3600),  # seconds
+    "NOT_FOUND_TTL": env.int_env("TENANT_CACHE_NOT_FOUND_TTL", 30),  # seconds
+    "PUBSUB_URL": DJANGO_CACHING_REDIS_URL,
+    "PUBSUB_CHANNEL": "tenant-cache",
+}
+
+# *******************************
+# *          OUTBOX             *
+# *******************************
+# Messages written in the transactions (`services.outbox.utils.outbox.publish`)
+# and published by `python manage.py relay_outbox` once committed.
+OUTBOX = {
+    "BATCH_SIZE": env.int_env("OUTBOX_BATCH_SIZE", 500),
+    # the relay is woken up by NOTIFY, it also polls for the messages to retry
+    "POLL_INTERVAL": env.int_env("OUTBOX_POLL_INTERVAL", 5),  # seconds
+    "RETRY_DELAY": env.int_env("OUTBOX_RETRY_DELAY", 5),  # seconds
+    "MAX_RETRY_DELAY": env.int_env("OUTBOX_MAX_RETRY_DELAY", 600),  # seconds
+}
+
 # *******************************
 # *       REGISTRATION          *
 # *******************************
@@ -381,6 +508,8 @@ VALID_DOMAINS_REGEX = env.str_env(
 )
 
 APP_DOMAIN = env.str_env("APP_DOMAIN", "http://localhost")
+# Maximum number of emails accepted by the batch resend endpoints
+USER_BATCH_MAX_EMAILS = env.int_env("USER_BATCH_MAX_EMAILS", 1000)
 
 # *******************************
 # *          Channels           *
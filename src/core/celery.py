@@ -1,8 +1,38 @@
 import os
-from celery import Celery
+from celery import Celery, bootsteps
+from click import Option
+from prometheus_client import start_http_server
 
 os.environ.setdefault("CELERY_CONFIG_MODULE", "config.celery_config")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("Guide")
 app.config_from_envvar("CELERY_CONFIG_MODULE")
+
+
+class MetricsServer(bootsteps.StartStopStep):
+    """
+    Serves the prometheus metrics of the worker (`celery worker --metrics-port`),
+    e.g. the batches and retries of the email tasks.
+    The metrics are those of the worker process: use it with a single process
+    pool (`-P threads`), the children of a prefork pool are not served.
+    """
+
+    def __init__(self, worker, metrics_port=None, **options):
+        super().__init__(worker, **options)
+        self.metrics_port = metrics_port
+
+    def start(self, worker):
+        if self.metrics_port:
+            start_http_server(self.metrics_port)
+
+
+app.user_options["worker"].add(
+    Option(
+        ("--metrics-port",),
+        type=int,
+        default=None,
+        help="Serve the prometheus metrics of the worker on this port.",
+    )
+)
+app.steps["worker"].add(MetricsServer)
@@ -21,6 +21,7 @@ urlpatterns = [
     path("users/", include("services.user.urls.user")),
     path("countries/", include("services.country.urls.country")),
     path("countries/", include("services.country.urls.domain")),
+    path("mails/", include("services.mailer.urls.mail")),
 
     # prometheus
     path("", include("django_prometheus.urls")),
@@ -2,14 +2,20 @@
 JWT uses this rule to return the user object. We can modify
 it for our need (e.g. is_verified=True)
 """
+import hashlib
+import time
+
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from prometheus_client import Counter
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.settings import APISettings, IMPORT_STRINGS
 
 from helpers.auth.token import ActivationToken, VerificationToken, PasswordResetToken
+from helpers.auth.user_cache import user_snapshot_cache
+from helpers.cache.lru import LRUCache
 
 # We need to provide our OWN DEFAULTS
 # because if the custom keys which we added are not provided
@@ -24,6 +30,21 @@ api_settings = APISettings(
     IMPORT_STRINGS,
 )
 
+# Validated tokens keyed by (purpose, sha256 of the raw token).
+# Each entry expires together with its token (`exp` claim).
+validated_token_cache = LRUCache(
+    maxsize=getattr(settings, "VALIDATED_TOKEN_CACHE", {}).get("MAXSIZE", 4096),
+    ttl=getattr(settings, "VALIDATED_TOKEN_CACHE", {}).get("DEFAULT_TTL", 60),
+)
+
+# hit ratio: rate(validated_token_cache_requests_total{result="hit"}[5m])
+#            / rate(validated_token_cache_requests_total[5m])
+VALIDATED_TOKEN_CACHE_REQUESTS = Counter(
+    "validated_token_cache_requests",
+    "Lookups of the validated token cache.",
+    ["purpose", "result"],
+)
+
 
 class JWTAuth(JWTAuthentication):
     """
@@ -48,6 +69,38 @@ class JWTAuth(JWTAuthentication):
         Override the default get_validated_token method to
         check if the token is valid or not for not only authentication
         purpose but also for activation/verification/password-reset purposes.
+        Validated tokens are memoized until they expire,
+        so the signature of the same token is verified only once.
+        """
+        if not raw_token:
+            return self._validate_token(raw_token, purpose)
+
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        key = (purpose, hashlib.sha256(raw_token).hexdigest())
+        token = validated_token_cache.get(key)
+        if token is not None:
+            VALIDATED_TOKEN_CACHE_REQUESTS.labels(purpose, "hit").inc()
+            return token
+        VALIDATED_TOKEN_CACHE_REQUESTS.labels(purpose, "miss").inc()
+        token = self._validate_token(raw_token, purpose)
+        validated_token_cache.set(key, token, ttl=self._token_ttl(token))
+        return token
+
+    @staticmethod
+    def _token_ttl(token):
+        """
+        Number of seconds the token is still valid for,
+        `None` (cache default) if the token does not expire.
+        """
+        try:
+            return token["exp"] - time.time()
+        except KeyError:
+            return None
+
+    def _validate_token(self, raw_token, purpose):
+        """
+        Decode and verify the raw token for the given purpose.
         """
         match purpose:
             case "authentication":
@@ -97,8 +150,66 @@ class JWTAuth(JWTAuthentication):
         """
         Override the default get_user method.
         It adds the force_unverified and force_inactive parameters.
+        The user is resolved from the user snapshot cache,
+        so the database is only hit on a cache miss.
+
+        :param validated_token: validated token
+        :param force_unverified: if True, it will return the
+            user even if it is not verified
+        :param force_inactive: if True, it will return the
+            user even if it is inactive
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as exc:
+            raise InvalidToken(
+                detail=_("Token contained no recognizable user identification"),
+                code="invalid_token",
+            ) from exc
+
+        try:
+            user = user_snapshot_cache.get(
+                self.user_model, api_settings.USER_ID_FIELD, user_id
+            )
+        except self.user_model.DoesNotExist as exc:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from exc
+
+        return self._check_user(user, force_unverified, force_inactive)
+
+    async def aauthenticate(self, request):
+        """
+        Async version of `authenticate` for async (ASGI) views.
+        It works with plain django requests as well.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = await self.aget_user(
+            validated_token,
+            schema_name=request.tenant.schema_name,
+        )
+        return user, validated_token
+
+    async def aget_user(
+            self,
+            validated_token,
+            schema_name,
+            force_unverified=False,
+            force_inactive=False,
+    ):
+        """
+        Async version of `get_user` built on the async ORM.
 
         :param validated_token: validated token
+        :param schema_name: schema of the tenant the user belongs to
         :param force_unverified: if True, it will return the
             user even if it is not verified
         :param force_inactive: if True, it will return the
@@ -113,12 +224,22 @@ class JWTAuth(JWTAuthentication):
             ) from exc
 
         try:
-            user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            user = await user_snapshot_cache.aget(
+                self.user_model, api_settings.USER_ID_FIELD, user_id, schema_name
+            )
         except self.user_model.DoesNotExist as exc:
             raise AuthenticationFailed(
                 _("User not found"), code="user_not_found"
             ) from exc
 
+        return self._check_user(user, force_unverified, force_inactive)
+
+    @staticmethod
+    def _check_user(user, force_unverified, force_inactive):
+        """
+        Check that the user is active and verified
+        unless forced otherwise.
+        """
         if not user.is_active and not force_inactive:
             raise AuthenticationFailed(
                 detail="User is not active", code="user_inactive"
@@ -0,0 +1,123 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the process pool used to hash and verify
+passwords off the request thread.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from prometheus_client import Histogram
+
+PASSWORD_HASHING_SECONDS = Histogram(
+    "password_hashing_seconds",
+    "Time spent hashing or verifying a password, including the time queued in the pool.",
+    ["operation"],
+)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Pool processes are spawned (not forked from a threaded server),
+    so Django has to be set up again in each of them.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+def _get_pool():
+    """
+    Return the pool of the current process, `None` if pooling is disabled.
+    The pool is created lazily, so every (forked) server worker gets its own.
+    Daemonic processes (e.g. the children of a Celery prefork pool)
+    are not allowed to have children, they hash in-process.
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+
+    size = getattr(settings, "PASSWORD_HASHING_POOL_SIZE", 0)
+    if size <= 0 or multiprocessing.current_process().daemon:
+        return None
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _reset_pool():
+    global _pool  # pylint: disable=global-statement
+
+    with _pool_lock:
+        _pool = None
+
+
+def _run(operation: str, func, *args):
+    start = time.perf_counter()
+    try:
+        pool = _get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(func, *args).result()
+            except BrokenProcessPool:
+                # a pool process died, start a new pool on the next call
+                _reset_pool()
+        return func(*args)
+    finally:
+        PASSWORD_HASHING_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+
+def must_update(encoded: str) -> bool:
+    """
+    Check if the encoded password has to be re-hashed with the preferred hasher.
+    Same rules as `django.contrib.auth.hashers.check_password`.
+    """
+    preferred = hashers.get_hasher("default")
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def make_password(raw_password) -> str:
+    """
+    Hash the password in the pool.
+    """
+    if raw_password is None:
+        # unusable password, nothing to hash
+        return hashers.make_password(None)
+    return _run("hash", hashers.make_password, raw_password)
+
+
+def check_password(raw_password, encoded, setter=None) -> bool:
+    """
+    Verify the password in the pool.
+    If the password is correct but was hashed with
+    an outdated hasher, `setter(raw_password)` is called.
+    """
+    if raw_password is None or not hashers.is_password_usable(encoded):
+        # Hash the password anyway, so a user with an unusable password
+        # can not be told apart from the others by the response time.
+        make_password(raw_password)
+        return False
+    is_correct = _run("check", hashers.check_password, raw_password, encoded)
+    if is_correct and setter and must_update(encoded):
+        setter(raw_password)
+    return is_correct
+
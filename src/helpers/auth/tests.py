@@ -0,0 +1,186 @@
+# pylint: disable=protected-access
+import multiprocessing
+import time
+import uuid
+
+import pytest
+from django.contrib.auth import hashers
+from prometheus_client import REGISTRY
+
+from helpers.auth import hashing
+from helpers.auth.custom_jwt import JWTAuth, validated_token_cache
+from helpers.auth.token import (
+    ActivationToken,
+    BaseToken,
+    PasswordResetToken,
+    VerificationToken,
+)
+from helpers.auth.token.base import token_generated, tokens_generated
+
+
+@pytest.fixture
+def in_process(settings):
+    settings.PASSWORD_HASHING_POOL_SIZE = 0
+
+
+@pytest.mark.unit
+class TestHashing:
+    def test_check_password(self, in_process):
+        encoded = hashing.make_password("secret")
+
+        assert hashing.check_password("secret", encoded)
+        assert not hashing.check_password("wrong", encoded)
+
+    def test_unusable_password_is_hashed_anyway(self, in_process, mocker):
+        make_password = mocker.spy(hashers, "make_password")
+
+        assert not hashing.check_password("secret", hashers.make_password(None))
+        make_password.assert_called_with("secret")
+
+    def test_outdated_hash_is_upgraded(self, in_process, settings, mocker):
+        settings.PASSWORD_HASHERS = [
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+        setter = mocker.Mock()
+        encoded = hashers.make_password("secret", hasher="md5")
+
+        assert hashing.check_password("secret", encoded, setter)
+        setter.assert_called_once_with("secret")
+
+    def test_daemonic_process_hashes_in_process(self, settings, mocker):
+        settings.PASSWORD_HASHING_POOL_SIZE = 2
+        mocker.patch.object(
+            multiprocessing, "current_process", return_value=mocker.Mock(daemon=True)
+        )
+
+        assert hashing._get_pool() is None
+
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_password_is_checked_in_the_pool(settings):
+    settings.PASSWORD_HASHING_POOL_SIZE = 1
+    encoded = hashing.make_password("secret")
+
+    assert hashing._get_pool() is not None
+    assert hashing.check_password("secret", encoded)
+    assert not hashing.check_password("wrong", encoded)
+
+
+@pytest.fixture
+def jwt_auth(mocker):
+    """
+    JWTAuth whose token validation returns a token expiring in 10 seconds.
+    """
+    validated_token_cache.clear()
+    auth = JWTAuth()
+    mocker.patch.object(
+        auth,
+        "_validate_token",
+        side_effect=lambda raw_token, purpose: {
+            "purpose": purpose,
+            "exp": time.time() + 10,
+        },
+    )
+    yield auth
+    validated_token_cache.clear()
+
+
+def get_requests(purpose: str, result: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "validated_token_cache_requests_total",
+            {"purpose": purpose, "result": result},
+        )
+        or 0
+    )
+
+
+@pytest.mark.unit
+class TestValidatedTokenCache:
+    def test_token_is_validated_once(self, jwt_auth):
+        first = jwt_auth.get_validated_token("token")
+
+        assert jwt_auth.get_validated_token(b"token") is first
+        jwt_auth._validate_token.assert_called_once()
+
+    def test_token_is_cached_until_it_expires(self, jwt_auth, mocker):
+        monotonic = mocker.patch("helpers.cache.lru.time.monotonic", return_value=100)
+        jwt_auth.get_validated_token("token")
+
+        monotonic.return_value = 109
+        jwt_auth.get_validated_token("token")
+        assert jwt_auth._validate_token.call_count == 1
+
+        monotonic.return_value = 111
+        jwt_auth.get_validated_token("token")
+        assert jwt_auth._validate_token.call_count == 2
+
+    def test_expired_token_is_not_cached(self, jwt_auth):
+        jwt_auth._validate_token.side_effect = None
+        jwt_auth._validate_token.return_value = {"exp": time.time() - 1}
+
+        jwt_auth.get_validated_token("token")
+
+        assert len(validated_token_cache) == 0
+
+    def test_purposes_are_cached_apart(self, jwt_auth):
+        authentication = jwt_auth.get_validated_token("token")
+        activation = jwt_auth.get_validated_token("token", purpose="activation")
+
+        assert authentication["purpose"] == "authentication"
+        assert activation["purpose"] == "activation"
+        assert jwt_auth.get_validated_token("token", purpose="activation") is activation
+
+    def test_hits_and_misses_are_counted(self, jwt_auth):
+        hits = get_requests("verification", "hit")
+        misses = get_requests("verification", "miss")
+
+        jwt_auth.get_validated_token("token", purpose="verification")
+        jwt_auth.get_validated_token("token", purpose="verification")
+
+        assert get_requests("verification", "hit") == hits + 1
+        assert get_requests("verification", "miss") == misses + 1
+
+
+class FakeUser:
+    def __init__(self, pk):
+        self.id = pk  # pylint: disable=invalid-name
+
+
+@pytest.mark.unit
+class TestTokensForUsers:
+    users = [FakeUser(uuid.UUID(int=1)), FakeUser(2)]
+
+    def test_tokens_of_the_purpose_in_the_order_of_the_users(self):
+        tokens = BaseToken.for_users(self.users, purpose="verification", should_signal=False)
+
+        assert [type(token) for token in tokens] == [VerificationToken] * 2
+        assert [token["id"] for token in tokens] == [str(uuid.UUID(int=1)), 2]
+        assert {token["intended_for"] for token in tokens} == {"user.User"}
+        assert tokens[0]["jti"] != tokens[1]["jti"]
+
+    def test_token_class_is_the_default_purpose(self):
+        tokens = ActivationToken.for_users(self.users, should_signal=False)
+
+        assert {token["token_type"] for token in tokens} == {"activation"}
+
+    def test_unknown_purpose(self):
+        with pytest.raises(ValueError):
+            BaseToken.for_users(self.users, purpose="unknown")
+
+    def test_one_signal_per_batch(self, mocker):
+        send = mocker.patch.object(tokens_generated, "send")
+        single = mocker.patch.object(token_generated, "send")
+
+        tokens = BaseToken.for_users(self.users, purpose="password_reset")
+
+        send.assert_called_once_with(sender=PasswordResetToken, tokens=tokens)
+        single.assert_not_called()
+
+    def test_no_signal_without_users(self, mocker):
+        send = mocker.patch.object(tokens_generated, "send")
+
+        assert not BaseToken.for_users([], purpose="activation")
+        send.assert_not_called()
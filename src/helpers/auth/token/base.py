@@ -2,9 +2,12 @@ from datetime import timedelta
 
 from django.conf import settings
 from django.dispatch import Signal
+from django.db.models import QuerySet
 from rest_framework_simplejwt.tokens import Token
 
 token_generated = Signal()
+# Sent once per batch of tokens minted by `BaseToken.for_users`
+tokens_generated = Signal()
 
 
 class BaseToken(Token):
@@ -16,20 +19,64 @@ class BaseToken(Token):
 
     @classmethod
     def for_user(cls, user, should_signal=True):
-        user_id = getattr(user, cls.api_settings["USER_ID_FIELD"])
+        token = cls._for_user_id(getattr(user, cls.api_settings["USER_ID_FIELD"]))
+
+        # Signal that the activation token has been generated
+        # for the given user
+        if should_signal:
+            cls.signal(token)
+        return token
+
+    @classmethod
+    def for_users(cls, users, purpose=None, should_signal=True):
+        """
+        Mint tokens for many users in one pass.
+        Instead of a signal per token, a single `tokens_generated`
+        signal is sent for the whole batch.
+
+        :param users: iterable of users or a queryset of users
+        :param purpose: token type (e.g. "verification"),
+            defaults to the token type of the class it is called on
+        :param should_signal: send the batch signal
+        :return: list of tokens in the order of the given users
+        """
+        token_class = cls.get_token_class(purpose) if purpose else cls
+        id_field = cls.api_settings["USER_ID_FIELD"]
+        if isinstance(users, QuerySet):
+            user_ids = users.values_list(id_field, flat=True)
+        else:
+            user_ids = (getattr(user, id_field) for user in users)
+
+        tokens = [token_class._for_user_id(user_id) for user_id in user_ids]
+        if should_signal and tokens:
+            token_class.signal_many(tokens)
+        return tokens
+
+    @classmethod
+    def _for_user_id(cls, user_id):
         if not isinstance(user_id, int):
             user_id = str(user_id)
 
         token = cls()
         token[cls.api_settings["USER_ID_CLAIM"]] = user_id
         token["intended_for"] = "user.User"
-
-        # Signal that the activation token has been generated
-        # for the given user
-        if should_signal:
-            cls.signal(token)
         return token
 
+    @classmethod
+    def get_token_class(cls, purpose):
+        """
+        Return the token class (this class or one of its subclasses)
+        whose token type is the given purpose.
+        """
+        if cls.token_type == purpose:
+            return cls
+        for subclass in cls.__subclasses__():
+            try:
+                return subclass.get_token_class(purpose)
+            except ValueError:
+                continue
+        raise ValueError(f"No token class for the purpose {purpose}.")
+
     @classmethod
     def for_company(cls, company, should_signal=True):
         company_id = getattr(company, cls.api_settings["COMPANY_ID_CLAIM"])
@@ -47,3 +94,7 @@ class BaseToken(Token):
 
     def signal(self):
         token_generated.send(sender=self.__class__, token=self)
+
+    @classmethod
+    def signal_many(cls, tokens):
+        tokens_generated.send(sender=cls, tokens=tokens)
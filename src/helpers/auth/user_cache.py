@@ -0,0 +1,215 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the two-tier cache of user snapshots
+which is used by JWTAuth to resolve the user of a token
+without hitting the database on every request.
+"""
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, router, transaction
+from django_tenants.utils import schema_context
+
+from helpers.cache.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Fields which are never written to the shared tier.
+# They are loaded lazily from the database when accessed.
+EXCLUDED_FIELDS = ("password",)
+
+
+class UserSnapshotCache:
+    """
+    Two-tier cache of user snapshots.
+    1. A per-process LRU cache with a short TTL.
+    2. A shared (redis) cache with a longer TTL.
+    A snapshot is a dict of the concrete field values of the user
+    (except the `EXCLUDED_FIELDS`) and is turned back into a model
+    instance using `Model.from_db`, so no query is issued on a hit.
+    """
+
+    def __init__(
+        self,
+        local_maxsize: int,
+        local_ttl: float,
+        shared_ttl: int,
+        cache_alias: str,
+        key_prefix: str = "user-snapshot",
+    ):
+        """
+        :param local_maxsize: Maximum number of snapshots kept per process
+        :param local_ttl: TTL of the per-process tier in seconds.
+            It bounds how long other processes may serve a stale snapshot.
+        :param shared_ttl: TTL of the shared tier in seconds
+        :param cache_alias: Alias of the shared cache in `settings.CACHES`
+        :param key_prefix: Prefix of the cache keys
+        """
+        self.local = LRUCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.shared_ttl = shared_ttl
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Build the cache from `settings.USER_SNAPSHOT_CACHE`.
+        """
+        config = getattr(settings, "USER_SNAPSHOT_CACHE", {})
+        return cls(
+            local_maxsize=config.get("LOCAL_MAXSIZE", 1024),
+            local_ttl=config.get("LOCAL_TTL", 5),
+            shared_ttl=config.get("SHARED_TTL", 300),
+            cache_alias=config.get("CACHE_ALIAS", "default"),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, user_id, schema_name: str = None) -> str:
+        """
+        Users live in the tenant schemas,
+        so the schema name is a part of the key.
+        It defaults to the schema of the current connection.
+        """
+        if schema_name is None:
+            schema_name = getattr(connection, "schema_name", "public")
+        return f"{self.key_prefix}:{schema_name}:{user_id}"
+
+    @staticmethod
+    def snapshot_fields(user_model) -> list[str]:
+        # pylint: disable=protected-access
+        return [
+            field.attname
+            for field in user_model._meta.concrete_fields
+            if field.name not in EXCLUDED_FIELDS
+        ]
+
+    def get(self, user_model, lookup_field: str, user_id):
+        """
+        Return the user with the given id.
+        Raises `user_model.DoesNotExist` if the user does not exist.
+
+        :param user_model: User model class
+        :param lookup_field: Field used to look the user up
+        :param user_id: Value of the lookup field
+        """
+        key = self.make_key(user_id)
+        snapshot = self.local.get(key)
+        if snapshot is None:
+            snapshot = self._shared_get(key)
+            if snapshot is None:
+                snapshot = self.load(user_model, lookup_field, user_id)
+                self._shared_set(key, snapshot)
+            self.local.set(key, snapshot)
+        return self.build(user_model, snapshot)
+
+    async def aget(self, user_model, lookup_field: str, user_id, schema_name: str):
+        """
+        Async version of `get`.
+        The schema name has to be given explicitly: the queries run in
+        the thread shared by the concurrent requests, whose connection
+        may have been set to the tenant of another request.
+        """
+        key = self.make_key(user_id, schema_name)
+        snapshot = self.local.get(key)
+        if snapshot is None:
+            snapshot = await self._ashared_get(key)
+            if snapshot is None:
+                snapshot = await self.aload(
+                    user_model, lookup_field, user_id, schema_name
+                )
+                await self._ashared_set(key, snapshot)
+            self.local.set(key, snapshot)
+        return self.build(user_model, snapshot)
+
+    def load(self, user_model, lookup_field: str, user_id) -> dict:
+        """
+        Load the snapshot of the user from the database.
+        """
+        fields = self.snapshot_fields(user_model)
+        values = (
+            user_model.objects.filter(**{lookup_field: user_id})
+            .values_list(*fields)
+            .get()
+        )
+        return dict(zip(fields, values))
+
+    async def aload(
+        self, user_model, lookup_field: str, user_id, schema_name: str
+    ) -> dict:
+        """
+        Async version of `load`, run in the schema of the tenant.
+        """
+
+        def load():
+            with schema_context(schema_name):
+                return self.load(user_model, lookup_field, user_id)
+
+        return await sync_to_async(load)()
+
+    @staticmethod
+    def build(user_model, snapshot: dict):
+        """
+        Turn the snapshot into a model instance.
+        Fields missing from the snapshot are deferred.
+        """
+        return user_model.from_db(
+            router.db_for_read(user_model),
+            list(snapshot.keys()),
+            list(snapshot.values()),
+        )
+
+    def invalidate(self, user_id) -> None:
+        """
+        Drop the snapshot of the user from both tiers.
+        If called inside a transaction, the snapshot is dropped
+        again on commit, so a concurrent request can not
+        re-populate the cache with the pre-commit state.
+        """
+        key = self.make_key(user_id)
+        self._evict(key)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._evict(key))
+
+    def _evict(self, key: str) -> None:
+        self.local.delete(key)
+        try:
+            self.shared.delete(key)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not evict %s from the shared cache", key, exc_info=True)
+
+    def _shared_get(self, key: str):
+        # The shared tier is an optimization only,
+        # an unavailable cache must not break authentication.
+        try:
+            return self.shared.get(key)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not read %s from the shared cache", key, exc_info=True)
+            return None
+
+    def _shared_set(self, key: str, snapshot: dict) -> None:
+        try:
+            self.shared.set(key, snapshot, timeout=self.shared_ttl)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not write %s to the shared cache", key, exc_info=True)
+
+    async def _ashared_get(self, key: str):
+        try:
+            return await self.shared.aget(key)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not read %s from the shared cache", key, exc_info=True)
+            return None
+
+    async def _ashared_set(self, key: str, snapshot: dict) -> None:
+        try:
+            await self.shared.aset(key, snapshot, timeout=self.shared_ttl)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not write %s to the shared cache", key, exc_info=True)
+
+
+user_snapshot_cache = UserSnapshotCache.from_settings()
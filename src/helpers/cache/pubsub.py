@@ -0,0 +1,137 @@
+"""
+This file is part of the Yoona.ai project.
+It contains a redis pub/sub bus used to invalidate
+the in-process caches of all the running processes.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Message delivered to the handlers when the subscription is (re)established.
+# Messages published while a process was disconnected are lost,
+# so the handlers have to drop everything they cached.
+RESET_MESSAGE = {"reset": True}
+
+
+class InvalidationBus:
+    """
+    Broadcasts json messages to every process subscribed to a channel.
+    Each process listens on a daemon thread which is started lazily
+    (and again after a fork) by `ensure_subscribed`.
+    Redis being unavailable never raises in the callers: publishing
+    is best effort and the listener keeps reconnecting in the background,
+    so the caches have to keep a TTL as a safety net.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        channel: str,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        """
+        :param redis_url: Url of the redis server
+        :param channel: Name of the pub/sub channel
+        :param retry_delay: Seconds to wait before reconnecting the listener,
+            doubled after every failed attempt
+        :param max_retry_delay: Upper bound of the reconnection delay
+        """
+        self.redis_url = redis_url
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._handlers: list[Callable[[dict], None]] = []
+        self._client: Optional[redis.Redis] = None
+        self._client_pid: Optional[int] = None
+        self._listener_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> redis.Redis:
+        # redis connections must not be shared with a forked child
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = redis.Redis.from_url(self.redis_url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def add_handler(self, handler: Callable[[dict], None]) -> None:
+        """
+        Register a callable called with every message received on the channel.
+        """
+        self._handlers.append(handler)
+
+    def publish(self, message: dict) -> None:
+        """
+        Send the message to all the subscribed processes.
+        """
+        try:
+            self.client.publish(self.channel, json.dumps(message))
+        except redis.RedisError:
+            logger.warning("Could not publish on %s", self.channel, exc_info=True)
+
+    def ensure_subscribed(self) -> None:
+        """
+        Start the listener thread of the current process if it is not running.
+        It is cheap enough to be called on every cache lookup.
+        """
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            thread = threading.Thread(
+                target=self._listen,
+                name=f"invalidation-bus:{self.channel}",
+                daemon=True,
+            )
+            thread.start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self) -> None:
+        delay = self.retry_delay
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis.Redis.from_url(self.redis_url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                delay = self.retry_delay
+                self._dispatch(RESET_MESSAGE)
+                for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    try:
+                        message = json.loads(item["data"])
+                    except ValueError:
+                        logger.warning("Invalid message on %s: %r", self.channel, item["data"])
+                        continue
+                    self._dispatch(message)
+            except redis.RedisError:
+                logger.warning(
+                    "Lost the subscription to %s, reconnecting", self.channel, exc_info=True
+                )
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis.RedisError:
+                        pass
+            # whatever was cached while disconnected may be stale
+            self._dispatch(RESET_MESSAGE)
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _dispatch(self, message: dict) -> None:
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Invalidation handler %r failed", handler)
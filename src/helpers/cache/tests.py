@@ -0,0 +1,45 @@
+import pytest
+
+from helpers.cache.lru import LRUCache
+
+
+@pytest.mark.unit
+class TestLRUCache:
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_entry_expires_after_its_ttl(self, mocker):
+        monotonic = mocker.patch("helpers.cache.lru.time.monotonic", return_value=100)
+        cache = LRUCache(ttl=10)
+        cache.set("default", 1)
+        cache.set("custom", 2, ttl=30)
+
+        monotonic.return_value = 115
+
+        assert cache.get("default") is None
+        assert cache.get("custom") == 2
+        assert len(cache) == 1
+
+    def test_non_positive_ttl_is_not_stored(self):
+        cache = LRUCache()
+        cache.set("key", 1, ttl=0)
+
+        assert cache.get("key") is None
+
+    def test_stats_count_hits_and_misses(self):
+        cache = LRUCache(maxsize=8)
+        cache.set("key", 1)
+        cache.get("key")
+        cache.get("key")
+        cache.get("missing")
+
+        assert cache.stats() == {"hits": 2, "misses": 1, "size": 1, "maxsize": 8}
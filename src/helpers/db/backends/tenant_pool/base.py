@@ -0,0 +1,172 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the `django_tenants` postgresql backend with connection pooling.
+
+Django closes the connection of a thread at the end of every request
+(`CONN_MAX_AGE = 0`), this backend gives it back to a process-wide pool
+instead, so the next request skips the TCP and authentication handshake.
+The search_path applied on each pooled connection is remembered,
+so `SET search_path` is only sent when the schema actually changes.
+
+Configuration (`DATABASES[<alias>]["POOL"]`):
+    MAX_SIZE: Maximum number of connections per process
+    TIMEOUT: Seconds to wait for a connection when all of them are in use
+    MAX_IDLE: Seconds after which an idle connection is closed
+    MAX_LIFETIME: Seconds after which a connection is closed when released
+    HEALTH_CHECK_AFTER: Idle seconds after which a connection is checked
+        with `SELECT 1` before being reused
+"""
+
+import time
+
+from django.db.utils import OperationalError
+from django_tenants.postgresql_backend.base import DatabaseWrapper as TenantDatabaseWrapper
+from django_tenants.utils import get_limit_set_calls
+from psycopg2 import extensions
+
+from helpers.db.backends.tenant_pool.creation import DatabaseCreation
+from helpers.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 10,
+    "MAX_IDLE": 300,
+    "MAX_LIFETIME": 3600,
+    "HEALTH_CHECK_AFTER": 30,
+}
+
+
+class DatabaseWrapper(TenantDatabaseWrapper):
+    """
+    `django_tenants` DatabaseWrapper which checks its connection out
+    of a `ConnectionPool` and gives it back when closed.
+    `TENANT_LIMIT_SET_CALLS` has to be enabled, otherwise
+    `django_tenants` sets the search_path on every cursor.
+    """
+
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        self.pooled = None
+        super().__init__(*args, **kwargs)
+        self.pool_settings = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+
+    @property
+    def pool(self) -> ConnectionPool:
+        # the test runner and `_nodb_cursor` point the same alias
+        # to other databases, they must not share the connections
+        key = ":".join(
+            str(self.settings_dict.get(name) or "")
+            for name in ("HOST", "PORT", "NAME", "USER")
+        )
+        return get_pool(
+            f"{self.alias}:{key}",
+            lambda: ConnectionPool(
+                alias=self.alias,
+                max_size=self.pool_settings["MAX_SIZE"],
+                timeout=self.pool_settings["TIMEOUT"],
+                max_idle=self.pool_settings["MAX_IDLE"],
+                max_lifetime=self.pool_settings["MAX_LIFETIME"],
+            ),
+        )
+
+    def get_new_connection(self, conn_params):
+        search_path = self._get_cursor_search_paths()
+        parent = super()
+
+        def connect():
+            return parent.get_new_connection(conn_params)
+
+        while True:
+            try:
+                pooled = self.pool.checkout(connect, search_path)
+            except PoolTimeout as exc:
+                raise OperationalError(str(exc)) from exc
+            if "isolation_level" not in pooled.state:
+                # new connection, set up by the parent
+                pooled.state["isolation_level"] = self.isolation_level
+                break
+            if self._is_reusable(pooled):
+                self.isolation_level = pooled.state["isolation_level"]
+                break
+            self.pool.checkin(pooled, discard=True)
+
+        self.pooled = pooled
+        return pooled.raw
+
+    def _is_reusable(self, pooled) -> bool:
+        if pooled.raw.closed:
+            return False
+        if time.monotonic() - pooled.released_at < self.pool_settings["HEALTH_CHECK_AFTER"]:
+            return True
+        try:
+            with pooled.raw.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except self.Database.Error:
+            return False
+        return True
+
+    def _cursor(self, name=None):
+        # The checks of the parent are run first, so the connection
+        # the search_path is compared with is the one the cursor will use.
+        self.close_if_health_check_failed()
+        self.ensure_connection()
+        if get_limit_set_calls() and self.pooled is not None:
+            applied = self.pooled.search_path
+            # `django_tenants` skips the SET when this is set
+            self.search_path_set_schemas = (
+                applied if applied and applied == self._get_cursor_search_paths() else None
+            )
+        cursor = super()._cursor(name=name)
+        if self.pooled is not None:
+            self.pooled.search_path = self.search_path_set_schemas
+        return cursor
+
+    def _rollback(self):
+        # SET is transactional, a rollback may revert the search_path
+        self._forget_search_path()
+        return super()._rollback()
+
+    def _savepoint_rollback(self, sid):
+        self._forget_search_path()
+        return super()._savepoint_rollback(sid)
+
+    def _forget_search_path(self):
+        self.search_path_set_schemas = None
+        if self.pooled is not None:
+            self.pooled.search_path = None
+
+    def _close(self):
+        pooled, self.pooled = self.pooled, None
+        if pooled is None:
+            return super()._close()
+        # Closed inside an atomic block, Django keeps a reference
+        # to the connection until the block exits: it can not be shared.
+        discard = self.in_atomic_block or not self._reset_session(pooled)
+        self.pool.checkin(pooled, discard=discard)
+        return None
+
+    def _reset_session(self, pooled) -> bool:
+        """
+        Leave the session idle before it is given back to the pool.
+        Returns False if the connection can not be reused.
+        """
+        raw = pooled.raw
+        if raw.closed or self.errors_occurred:
+            return False
+        status = raw.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_INERROR,
+        ):
+            try:
+                raw.rollback()
+            except self.Database.Error:
+                return False
+            # the rollback may have reverted a SET search_path
+            pooled.search_path = None
+            return True
+        # unknown or active (a query is still running)
+        return False
@@ -0,0 +1,20 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the test database creation of the pooled backend.
+"""
+
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    """
+    Closes the pooled connections of the test database before dropping it,
+    postgres refuses to drop a database with open sessions.
+    """
+
+    def destroy_test_db(self, *args, **kwargs):
+        # the connection is given back to the pool of the test database,
+        # whose settings are only replaced by the original ones afterwards
+        self.connection.close()
+        self.connection.pool.close_idle()
+        return super().destroy_test_db(*args, **kwargs)
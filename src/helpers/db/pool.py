@@ -0,0 +1,246 @@
+"""
+This file is part of the Yoona.ai project.
+It contains a process-wide pool of database connections
+which keeps the connections open between requests and
+remembers the search_path applied on each of them.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# saturation: db_pool_in_use / db_pool_max_size
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Open connections of the pool (idle and in use).",
+    ["alias"],
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_in_use",
+    "Connections of the pool currently checked out.",
+    ["alias"],
+)
+DB_POOL_MAX_SIZE = Gauge(
+    "db_pool_max_size",
+    "Maximum number of connections of the pool.",
+    ["alias"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection of the pool.",
+    ["alias"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts which gave up waiting for a connection of the pool.",
+    ["alias"],
+)
+# result is one of "hit" (same search_path), "reused" or "new"
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts",
+    "Connections checked out of the pool.",
+    ["alias", "result"],
+)
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection became available within the timeout.
+    """
+
+
+class PooledConnection:
+    """
+    A raw DB-API connection owned by the pool, with the
+    session state the pool has to remember between checkouts.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+        # search_path currently applied on the session, None if unknown
+        self.search_path: Optional[list[str]] = None
+        # any backend specific state (e.g. the isolation level)
+        self.state: dict = {}
+
+
+class ConnectionPool:
+    """
+    Bounded pool of connections.
+    A checkout prefers an idle connection whose search_path already
+    is the requested one (schema affinity), then the most recently
+    released one. When all the connections are in use, it blocks
+    until one is released or the timeout expires.
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        max_size: int,
+        timeout: float,
+        max_idle: float,
+        max_lifetime: float,
+    ):
+        """
+        :param alias: Alias of the database, used as the metrics label
+        :param max_size: Maximum number of open connections
+        :param timeout: Seconds to wait for a connection before raising `PoolTimeout`
+        :param max_idle: Seconds after which an idle connection is closed
+        :param max_lifetime: Seconds after which a connection is closed when released
+        """
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._idle: list[PooledConnection] = []
+        self._size = 0
+        self._condition = threading.Condition()
+        DB_POOL_MAX_SIZE.labels(alias=alias).set(max_size)
+        DB_POOL_SIZE.labels(alias=alias).set(0)
+        DB_POOL_IN_USE.labels(alias=alias).set(0)
+
+    def checkout(self, connect: Callable, search_path: Optional[list[str]] = None) -> PooledConnection:
+        """
+        Return a connection of the pool, opening a new one with `connect`
+        if none is idle and the pool is not full.
+
+        :param connect: Callable returning a new raw connection
+        :param search_path: search_path the caller is about to use
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.timeout
+        expired = []
+        with self._condition:
+            while True:
+                expired.extend(self._pop_expired())
+                pooled = self._pop_idle(search_path)
+                if pooled is not None or self._size < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    DB_POOL_CHECKOUT_TIMEOUTS.labels(alias=self.alias).inc()
+                    raise PoolTimeout(
+                        f"No connection of the {self.alias!r} pool "
+                        f"available after {self.timeout}s ({self.max_size} in use)"
+                    )
+            if pooled is None:
+                # reserve the slot, the connection is opened outside the lock
+                self._size += 1
+        DB_POOL_CHECKOUT_WAIT.labels(alias=self.alias).observe(time.monotonic() - started_at)
+        for stale in expired:
+            self._close_raw(stale)
+
+        if pooled is None:
+            try:
+                pooled = PooledConnection(connect())
+            except Exception:
+                self._release_slot()
+                raise
+            result = "new"
+        elif search_path is not None and pooled.search_path == search_path:
+            result = "hit"
+        else:
+            result = "reused"
+        DB_POOL_CHECKOUTS.labels(alias=self.alias, result=result).inc()
+        self._update_gauges()
+        return pooled
+
+    def checkin(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """
+        Give the connection back to the pool.
+        It is closed instead if `discard` is set or it outlived `max_lifetime`.
+        The caller is responsible for leaving the session idle
+        (no open transaction).
+        """
+        now = time.monotonic()
+        if discard or now - pooled.created_at >= self.max_lifetime:
+            self._close_raw(pooled)
+            self._release_slot()
+            return
+        pooled.released_at = now
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+        self._update_gauges()
+
+    def close_idle(self) -> None:
+        """
+        Close all the idle connections.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify(len(idle))
+        for pooled in idle:
+            self._close_raw(pooled)
+        self._update_gauges()
+
+    def _pop_idle(self, search_path) -> Optional[PooledConnection]:
+        if not self._idle:
+            return None
+        if search_path is not None:
+            # most recently released first, they are the warmest
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index].search_path == search_path:
+                    return self._idle.pop(index)
+        return self._idle.pop()
+
+    def _pop_expired(self) -> list[PooledConnection]:
+        now = time.monotonic()
+        expired = [
+            pooled for pooled in self._idle
+            if now - pooled.released_at >= self.max_idle or pooled.raw.closed
+        ]
+        if expired:
+            self._idle = [pooled for pooled in self._idle if pooled not in expired]
+            self._size -= len(expired)
+        return expired
+
+    def _release_slot(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        size = self._size
+        DB_POOL_SIZE.labels(alias=self.alias).set(size)
+        DB_POOL_IN_USE.labels(alias=self.alias).set(size - len(self._idle))
+
+    @staticmethod
+    def _close_raw(pooled: PooledConnection) -> None:
+        try:
+            pooled.raw.close()
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Could not close a pooled connection", exc_info=True)
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_pid: Optional[int] = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+    """
+    Return the pool of the database alias, building it with `factory`
+    on first use. The pools are per process: connections must not
+    be shared with a forked child, so they are dropped after a fork.
+    """
+    global _pools_pid  # pylint: disable=global-statement
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = factory()
+        return pool
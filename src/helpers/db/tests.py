@@ -0,0 +1,174 @@
+import threading
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from psycopg2 import extensions
+
+from helpers.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**options) -> ConnectionPool:
+    return ConnectionPool(
+        **{"alias": "test", "max_size": 2, "timeout": 0.1, "max_idle": 60, "max_lifetime": 3600, **options}
+    )
+
+
+@pytest.mark.unit
+class TestConnectionPool:
+    def test_released_connection_is_reused(self):
+        pool = make_pool()
+        pooled = pool.checkout(FakeConnection)
+        pool.checkin(pooled)
+
+        assert pool.checkout(FakeConnection) is pooled
+
+    def test_checkout_prefers_the_same_search_path(self):
+        pool = make_pool()
+        public, country = pool.checkout(FakeConnection), pool.checkout(FakeConnection)
+        public.search_path, country.search_path = ["public"], ["uz", "public"]
+        pool.checkin(country)
+        pool.checkin(public)
+
+        assert pool.checkout(FakeConnection, ["uz", "public"]) is country
+
+    def test_full_pool_times_out(self):
+        pool = make_pool()
+        pool.checkout(FakeConnection)
+        pool.checkout(FakeConnection)
+
+        with pytest.raises(PoolTimeout):
+            pool.checkout(FakeConnection)
+
+    def test_full_pool_waits_for_a_release(self):
+        pool = make_pool(max_size=1, timeout=5)
+        pooled = pool.checkout(FakeConnection)
+        threading.Timer(0.05, pool.checkin, [pooled]).start()
+
+        assert pool.checkout(FakeConnection) is pooled
+
+    def test_failed_connect_releases_its_slot(self):
+        pool = make_pool(max_size=1)
+
+        def connect():
+            raise ConnectionError
+
+        with pytest.raises(ConnectionError):
+            pool.checkout(connect)
+        assert pool.checkout(FakeConnection) is not None
+
+    def test_discarded_and_expired_connections_are_closed(self):
+        pool = make_pool(max_lifetime=0)
+        discarded, expired = pool.checkout(FakeConnection), pool.checkout(FakeConnection)
+
+        pool.checkin(discarded, discard=True)
+        pool.checkin(expired)
+
+        assert discarded.raw.closed and expired.raw.closed
+        assert pool.checkout(FakeConnection) not in (discarded, expired)
+
+    def test_idle_connections_expire(self):
+        pool = make_pool(max_idle=0)
+        pooled = pool.checkout(FakeConnection)
+        pool.checkin(pooled)
+
+        assert pool.checkout(FakeConnection) is not pooled
+        assert pooled.raw.closed
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestPooledBackend:
+    def test_closed_connection_goes_back_to_the_pool(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+
+        connection.ensure_connection()
+        assert connection.connection is raw
+
+    def test_open_transaction_is_rolled_back_before_reuse(self):
+        connection.set_autocommit(False)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        raw = connection.connection
+        assert raw.get_transaction_status() == extensions.TRANSACTION_STATUS_INTRANS
+        connection.close()
+
+        connection.ensure_connection()
+        assert connection.connection is raw
+        assert raw.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        assert connection.get_autocommit()
+
+
+def count_set_search_path(queries: CaptureQueriesContext) -> int:
+    return sum(query["sql"].startswith("SET search_path") for query in queries.captured_queries)
+
+
+def run_query() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestPooledSearchPath:
+    def setup_method(self):
+        connection.set_schema_to_public()
+        run_query()
+
+    def teardown_method(self):
+        connection.set_schema_to_public()
+
+    def test_search_path_is_not_set_again_on_a_reused_connection(self):
+        raw = connection.connection
+        connection.close()
+
+        with CaptureQueriesContext(connection) as queries:
+            run_query()
+
+        assert connection.connection is raw
+        assert count_set_search_path(queries) == 0
+
+    def test_search_path_is_set_after_a_tenant_switch(self):
+        with CaptureQueriesContext(connection) as queries:
+            connection.set_schema("uz")
+            run_query()
+            run_query()
+            connection.close()
+            connection.set_schema_to_public()
+            run_query()
+
+        # once for "uz", once back to public on the pooled connection
+        assert count_set_search_path(queries) == 2
+
+    def test_search_path_is_set_after_a_rollback(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                connection.set_schema("uz")
+                run_query()
+                transaction.set_rollback(True)
+            connection.set_schema_to_public()
+            run_query()
+            run_query()
+
+        assert count_set_search_path(queries) == 2
+
+    def test_search_path_is_set_after_a_connection_reset(self):
+        connection.set_autocommit(False)
+        run_query()
+        # rolled back when given back to the pool
+        connection.close()
+
+        with CaptureQueriesContext(connection) as queries:
+            run_query()
+
+        assert count_set_search_path(queries) == 1
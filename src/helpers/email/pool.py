@@ -0,0 +1,285 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the per-process pool of persistent SMTP connections,
+so the (TLS) SMTP session is not set up again for every email.
+"""
+
+import atexit
+import logging
+import os
+import smtplib
+import socket
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail import get_connection
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+SMTP_CONNECTIONS_OPENED = Counter(
+    "smtp_connections_opened",
+    "SMTP sessions opened by the pool.",
+    ["reason"],  # "new", "stale" or "reconnect"
+)
+SMTP_MESSAGES_SENT = Counter(
+    "smtp_messages_sent",
+    "Messages sent through the SMTP pool.",
+    ["result"],
+)
+
+
+def is_transient_smtp_error(error: Exception) -> bool:
+    """
+    Whether sending the email again later may succeed: the connection
+    failed or the server answered with a temporary (4xx) error.
+    A permanent (5xx) error, e.g. an unknown mailbox, fails the same way every time.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # the socket errors (refused, reset, timed out)
+    return isinstance(error, OSError)
+
+
+class PooledSMTPConnection:
+    """
+    An open Django SMTP backend with its usage counters.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.messages = 0
+        self.released_at = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of open SMTP connections (Django SMTP backends).
+    1. An idle connection is checked with NOOP before being reused
+       if it was idle for more than `noop_after` seconds.
+    2. A connection is closed after `max_messages` messages,
+       or when it was idle for more than `max_idle` seconds.
+    3. A message failing because the server dropped the connection
+       is sent again once on a new connection.
+    4. At most `max_per_host` connections to the SMTP server are in use
+       at the same time, the other senders (threads) wait for one.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_messages: int,
+        noop_after: float,
+        max_idle: float,
+        max_per_host: int = 100,
+    ):
+        """
+        :param max_connections: Maximum number of idle connections kept open
+        :param max_messages: Number of messages after which a connection is recycled
+        :param noop_after: Idle seconds after which a connection is checked with NOOP
+        :param max_idle: Idle seconds after which a connection is closed
+        :param max_per_host: Number of connections in use at the same time
+            per SMTP server, it bounds the sends of a threaded worker
+        """
+        self.max_connections = max_connections
+        self.max_messages = max_messages
+        self.noop_after = noop_after
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self._semaphores: dict[tuple, threading.BoundedSemaphore] = {}
+        self._idle: list[PooledSMTPConnection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Build the pool from `settings.EMAIL_POOL`.
+        """
+        config = getattr(settings, "EMAIL_POOL", {})
+        return cls(
+            max_connections=config.get("MAX_CONNECTIONS", 1),
+            max_messages=config.get("MAX_MESSAGES", 100),
+            noop_after=config.get("NOOP_AFTER", 30),
+            max_idle=config.get("MAX_IDLE", 240),
+            max_per_host=config.get("MAX_PER_HOST", 100),
+        )
+
+    def send(self, message) -> int:
+        """
+        Send the message on a pooled connection.
+        Raises the SMTP errors, like `message.send(fail_silently=False)`.
+        """
+        with self.get_semaphore():
+            return self._send_one(message)
+
+    def send_many(self, messages) -> list[Optional[Exception]]:
+        """
+        Send the messages one after another on a single pooled connection.
+        A failing message does not stop the others: the error of each
+        message is returned (None if it was sent), in the same order,
+        so the caller can retry the failed messages only.
+        """
+        with self.get_semaphore():
+            return self._send_many(messages)
+
+    def get_semaphore(self) -> threading.BoundedSemaphore:
+        """
+        Return the semaphore bounding the connections in use
+        to the SMTP server of the settings.
+        """
+        self._check_pid()
+        host = (settings.EMAIL_HOST, str(settings.EMAIL_PORT))
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(
+                    host, threading.BoundedSemaphore(self.max_per_host)
+                )
+        return semaphore
+
+    def checkout(self) -> PooledSMTPConnection:
+        """
+        Return a healthy open connection.
+        """
+        self._check_pid()
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._open("new")
+            idle = time.monotonic() - connection.released_at
+            if idle >= self.max_idle:
+                self._close(connection)
+                return self._open("stale")
+            if idle < self.noop_after or self._is_alive(connection):
+                return connection
+            self._close(connection)
+
+    def checkin(self, connection: PooledSMTPConnection) -> None:
+        """
+        Give the connection back, closing it if it sent `max_messages`
+        messages or the pool already keeps `max_connections` connections.
+        """
+        if connection.messages >= self.max_messages:
+            self._close(connection)
+            return
+        connection.released_at = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.max_connections:
+                self._idle.append(connection)
+                return
+        self._close(connection)
+
+    def close_all(self) -> None:
+        """
+        Close all the idle connections (QUIT).
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def _send_one(self, message) -> int:
+        connection = self.checkout()
+        try:
+            try:
+                sent = self._send(connection, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # the server closed the session (e.g. idle timeout): retry once
+                self._close(connection)
+                connection = self._open("reconnect")
+                sent = self._send(connection, message)
+        except Exception:
+            SMTP_MESSAGES_SENT.labels(result="failed").inc()
+            self._close(connection)
+            raise
+        SMTP_MESSAGES_SENT.labels(result="sent").inc()
+        self.checkin(connection)
+        return sent
+
+    def _send_many(self, messages) -> list[Optional[Exception]]:
+        errors = []
+        connection = None
+        for message in messages:
+            try:
+                if connection is None:
+                    connection = self.checkout()
+                elif connection.messages >= self.max_messages:
+                    self._close(connection)
+                    connection = None
+                    connection = self._open("new")
+                try:
+                    self._send(connection, message)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._close(connection)
+                    connection = None
+                    connection = self._open("reconnect")
+                    self._send(connection, message)
+            except Exception as error:  # pylint: disable=broad-except
+                SMTP_MESSAGES_SENT.labels(result="failed").inc()
+                errors.append(error)
+                # the session is still usable after a refused recipient,
+                # after any other error its state is unknown
+                if connection is not None and not isinstance(error, smtplib.SMTPRecipientsRefused):
+                    self._close(connection)
+                    connection = None
+                continue
+            SMTP_MESSAGES_SENT.labels(result="sent").inc()
+            errors.append(None)
+        if connection is not None:
+            self.checkin(connection)
+        return errors
+
+    def _send(self, connection: PooledSMTPConnection, message) -> int:
+        message.connection = connection.backend
+        sent = connection.backend.send_messages([message])
+        connection.messages += 1
+        return sent
+
+    @staticmethod
+    def _open(reason: str) -> PooledSMTPConnection:
+        backend = get_connection(fail_silently=False)
+        backend.open()
+        # let the OS detect dead peers of the idle sessions
+        sock = getattr(backend.connection, "sock", None)
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        SMTP_CONNECTIONS_OPENED.labels(reason=reason).inc()
+        return PooledSMTPConnection(backend)
+
+    @staticmethod
+    def _is_alive(connection: PooledSMTPConnection) -> bool:
+        try:
+            status, _ = connection.backend.connection.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return status == 250
+
+    @staticmethod
+    def _close(connection: PooledSMTPConnection) -> None:
+        # the backend swallows the errors of QUIT on a dead session
+        try:
+            connection.backend.close()
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Could not close an SMTP connection", exc_info=True)
+
+    def _check_pid(self) -> None:
+        # sessions must not be shared with a forked child (celery prefork)
+        if self._pid != os.getpid():
+            with self._lock:
+                self._idle = []
+                self._semaphores = {}
+                self._pid = os.getpid()
+
+
+smtp_pool = SMTPConnectionPool.from_settings()
+atexit.register(smtp_pool.close_all)
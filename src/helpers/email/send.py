@@ -5,27 +5,69 @@ It contains the utility functions for sending
 different types of emails.
 """
 
+from typing import Optional
+
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import get_template
 
+from helpers.email.pool import smtp_pool
+from helpers.email.templates import template_cache
 
-def send_email(
+
+def make_email(
     subject: str, email_to: str, html_alternative: str, text_alternative: str
-) -> None:
+) -> EmailMultiAlternatives:
     """
-    Send email to the given email address
+    Build the email with its text and HTML versions
     :param subject: Subject of the email
     :param email_to: Email address to send the email to
     :param html_alternative: HTML version of the email
     :param text_alternative: Text version of the email
-    :return: None
+    :return: the email message
     """
     msg = EmailMultiAlternatives(
         subject, text_alternative, settings.EMAIL_FROM, [email_to]
     )
     msg.attach_alternative(html_alternative, "text/html")
-    msg.send(fail_silently=False)
+    return msg
+
+
+def send_email(
+    subject: str, email_to: str, html_alternative: str, text_alternative: str
+) -> None:
+    """
+    Send email to the given email address
+    The email is sent on a pooled SMTP connection of the process
+    :param subject: Subject of the email
+    :param email_to: Email address to send the email to
+    :param html_alternative: HTML version of the email
+    :param text_alternative: Text version of the email
+    :return: None
+    """
+    smtp_pool.send(make_email(subject, email_to, html_alternative, text_alternative))
+
+
+def make_templated_email(
+    data: dict,
+    html_template_path: str,
+    text_template_path: str,
+    subject: str,
+    recipient: str,
+) -> EmailMultiAlternatives:
+    """
+    Render the templates with the data and build the email
+    The templates are compiled once per process (`template_cache`)
+    :param data: data used in the templates
+    :param html_template_path: path to html template
+    :param text_template_path: path to text template
+    :param subject: email subject
+    :param recipient: email address of recipient
+    :return: the email message
+    """
+
+    html_alternative = template_cache.render(html_template_path, data)
+    text_alternative = template_cache.render(text_template_path, data)
+    return make_email(subject, recipient, html_alternative, text_alternative)
 
 
 def send_templated_email(
@@ -43,10 +85,32 @@ def send_templated_email(
     :param subject: email subject
     :param recipient: email address of recipient
     """
+    smtp_pool.send(
+        make_templated_email(
+            data=data,
+            html_template_path=html_template_path,
+            text_template_path=text_template_path,
+            subject=subject,
+            recipient=recipient,
+        )
+    )
 
-    html_template = get_template(html_template_path)
-    text_template = get_template(text_template_path)
 
-    html_alternative = html_template.render(data)
-    text_alternative = text_template.render(data)
-    send_email(subject, recipient, html_alternative, text_alternative)
+def send_templated_emails(payloads: list[dict]) -> list[Optional[Exception]]:
+    """
+    Send many templated emails over a single SMTP connection
+    :param payloads: keyword arguments of `send_templated_email`, one per email
+    :return: the error of each email (None if it was sent), in the same order
+    """
+    errors: list[Optional[Exception]] = [None] * len(payloads)
+    messages, indexes = [], []
+    for index, payload in enumerate(payloads):
+        try:
+            messages.append(make_templated_email(**payload))
+        except Exception as error:  # pylint: disable=broad-except
+            errors[index] = error
+            continue
+        indexes.append(index)
+    for index, error in zip(indexes, smtp_pool.send_many(messages)):
+        errors[index] = error
+    return errors
@@ -0,0 +1,120 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the per-process cache of the compiled email templates,
+warmed when a worker starts so no email pays for loading its templates.
+"""
+
+import copy
+import threading
+import time
+from typing import Iterable
+
+from django.template import Context, engines
+from django.template.base import NodeList, TextNode
+from django.template.defaulttags import LoadNode
+from django.template.loader_tags import IncludeNode
+from prometheus_client import Histogram
+
+EMAIL_TEMPLATE_RENDER_SECONDS = Histogram(
+    "email_template_render_seconds",
+    "Seconds spent rendering an email template.",
+    ["template"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+def is_static(nodelist) -> bool:
+    """
+    Whether the nodes always render the same text (no variable, no tag
+    other than `{% load %}` which renders nothing).
+    """
+    return all(isinstance(node, (TextNode, LoadNode)) for node in nodelist)
+
+
+def inline_static_includes(template):
+    """
+    Return a copy of the compiled template where the `{% include %}`
+    of a constant path to a static template (e.g. the layout header
+    and footer) is replaced by the text of the included template,
+    so it is neither looked up nor rendered again on every render.
+
+    :param template: Compiled template (`django.template.base.Template`)
+    """
+    nodes = []
+    for node in template.nodelist:
+        if (
+            isinstance(node, IncludeNode)
+            and isinstance(node.template.var, str)
+            and not node.template.filters
+            and not node.extra_context
+        ):
+            included = template.engine.get_template(node.template.var)
+            if is_static(included.nodelist):
+                nodes.append(TextNode(included.render(Context())))
+                continue
+        nodes.append(node)
+    # the loaders share the compiled template, it is not changed in place
+    inlined = copy.copy(template)
+    inlined.nodelist = NodeList(nodes)
+    return inlined
+
+
+class CompiledTemplateCache:
+    """
+    Compiled templates of the process, keyed by path.
+    The templates are compiled once, when the process starts (`warm`)
+    or on their first render, and are never reloaded:
+    changing a template needs a restart of the process.
+    """
+
+    def __init__(self, using: str = "django"):
+        """
+        :param using: Alias of the template engine in `settings.TEMPLATES`
+        """
+        self.using = using
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        """
+        Return the compiled template of the path, compiling it on a miss.
+        """
+        template = self._templates.get(path)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(path)
+                if template is None:
+                    template = self.compile(path)
+                    self._templates[path] = template
+        return template
+
+    def compile(self, path: str):
+        engine = engines[self.using]
+        # `Engine.get_template` returns the compiled template itself,
+        # not the wrapper of the backend
+        return inline_static_includes(engine.engine.get_template(path))
+
+    def warm(self, paths: Iterable[str]) -> int:
+        """
+        Compile the templates of the paths which are not compiled yet.
+
+        :return: the number of templates of the paths
+        """
+        return len([self.get(path) for path in paths])
+
+    def render(self, path: str, data: dict) -> str:
+        """
+        Render the template of the path with the data.
+        """
+        template = self.get(path)
+        start = time.perf_counter()
+        content = template.render(Context(data, autoescape=template.engine.autoescape))
+        EMAIL_TEMPLATE_RENDER_SECONDS.labels(template=path).observe(time.perf_counter() - start)
+        return content
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates = {}
+
+
+template_cache = CompiledTemplateCache()
@@ -0,0 +1,298 @@
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.template import engines
+from django.template.loader import render_to_string
+from django.template.loader_tags import IncludeNode
+
+from helpers.email import pool
+from helpers.email.pool import SMTPConnectionPool, is_transient_smtp_error
+from helpers.email.templates import CompiledTemplateCache, inline_static_includes
+
+
+class FakeBackend:
+    """
+    Django SMTP backend sending the messages through `send`.
+    """
+
+    def __init__(self, send=None):
+        self.send = send or (lambda message: 1)
+        self.noop_status = 250
+        self.opened = False
+        self.closed = False
+        self.sent = []
+
+    def open(self):
+        self.opened = True
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def connection(self):
+        return self
+
+    def noop(self):
+        return self.noop_status, b""
+
+    def send_messages(self, messages):
+        (message,) = messages
+        sent = self.send(message)
+        self.sent.append(message)
+        return sent
+
+
+class FakeMessage:
+    connection = None
+
+
+@pytest.fixture
+def backends(mocker):
+    """
+    The backends opened by the pool, a test can queue the next ones.
+    """
+    opened, queued = [], []
+
+    def get_connection(**kwargs):  # pylint: disable=unused-argument
+        backend = queued.pop(0) if queued else FakeBackend()
+        opened.append(backend)
+        return backend
+
+    mocker.patch.object(pool, "get_connection", side_effect=get_connection)
+    return opened, queued
+
+
+@pytest.fixture
+def monotonic(mocker):
+    return mocker.patch("helpers.email.pool.time.monotonic", return_value=1000)
+
+
+def make_pool(**kwargs) -> SMTPConnectionPool:
+    options = {"max_connections": 1, "max_messages": 100, "noop_after": 30, "max_idle": 240}
+    return SMTPConnectionPool(**{**options, **kwargs})
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (smtplib.SMTPServerDisconnected(), True),
+        (smtplib.SMTPConnectError(421, b"busy"), True),
+        (smtplib.SMTPResponseException(451, b"try later"), True),
+        (smtplib.SMTPDataError(452, b"storage"), True),
+        (smtplib.SMTPResponseException(554, b"rejected"), False),
+        (smtplib.SMTPAuthenticationError(535, b"credentials"), False),
+        (smtplib.SMTPRecipientsRefused({"a@test.com": (450, b"greylisted")}), True),
+        (
+            smtplib.SMTPRecipientsRefused(
+                {"a@test.com": (450, b"greylisted"), "b@test.com": (550, b"unknown")}
+            ),
+            False,
+        ),
+        (smtplib.SMTPNotSupportedError(), False),
+        (ConnectionResetError(), True),
+        (TimeoutError(), True),
+        (ValueError(), False),
+    ],
+)
+def test_transient_smtp_errors(error, transient):
+    assert is_transient_smtp_error(error) is transient
+
+
+@pytest.mark.unit
+class TestSMTPConnectionPool:
+    def test_connection_is_reused(self, backends):
+        smtp_pool = make_pool()
+
+        smtp_pool.send(FakeMessage())
+        smtp_pool.send(FakeMessage())
+
+        opened, _ = backends
+        assert len(opened) == 1
+        assert len(opened[0].sent) == 2
+
+    def test_connection_is_recycled_after_max_messages(self, backends):
+        smtp_pool = make_pool(max_messages=2)
+
+        for _ in range(3):
+            smtp_pool.send(FakeMessage())
+
+        opened, _ = backends
+        assert [len(backend.sent) for backend in opened] == [2, 1]
+        assert opened[0].closed
+
+    def test_idle_connection_is_checked_with_noop(self, backends, monotonic):
+        smtp_pool = make_pool()
+        smtp_pool.send(FakeMessage())
+        opened, _ = backends
+        opened[0].noop_status = 421
+
+        monotonic.return_value += 60
+        smtp_pool.send(FakeMessage())
+
+        assert len(opened) == 2
+        assert opened[0].closed
+
+    def test_healthy_idle_connection_is_reused(self, backends, monotonic):
+        smtp_pool = make_pool()
+        smtp_pool.send(FakeMessage())
+        opened, _ = backends
+
+        monotonic.return_value += 60
+        smtp_pool.send(FakeMessage())
+
+        assert len(opened) == 1
+
+    def test_stale_connection_is_closed(self, backends, monotonic):
+        smtp_pool = make_pool()
+        smtp_pool.send(FakeMessage())
+
+        monotonic.return_value += 300
+        smtp_pool.send(FakeMessage())
+
+        opened, _ = backends
+        assert len(opened) == 2
+        assert opened[0].closed
+
+    def test_message_is_sent_again_after_a_disconnection(self, backends):
+        smtp_pool = make_pool()
+        opened, queued = backends
+
+        def disconnect(message):
+            raise smtplib.SMTPServerDisconnected()
+
+        queued.append(FakeBackend(send=disconnect))
+        smtp_pool.send(FakeMessage())
+
+        assert opened[0].closed
+        assert len(opened[1].sent) == 1
+
+    def test_permanent_error_closes_the_connection(self, backends):
+        smtp_pool = make_pool()
+        opened, queued = backends
+
+        def reject(message):
+            raise smtplib.SMTPDataError(554, b"rejected")
+
+        queued.append(FakeBackend(send=reject))
+        with pytest.raises(smtplib.SMTPDataError):
+            smtp_pool.send(FakeMessage())
+
+        assert len(opened) == 1
+        assert opened[0].closed
+
+    def test_send_many_returns_the_error_of_each_message(self, backends):
+        smtp_pool = make_pool()
+        opened, queued = backends
+        messages = [FakeMessage() for _ in range(4)]
+        refused = smtplib.SMTPRecipientsRefused({"a@test.com": (550, b"unknown")})
+        rejected = smtplib.SMTPDataError(451, b"try later")
+
+        def send(message):
+            if message is messages[1]:
+                raise refused
+            if message is messages[2]:
+                raise rejected
+            return 1
+
+        queued.extend([FakeBackend(send=send), FakeBackend(send=send)])
+        errors = smtp_pool.send_many(messages)
+
+        assert errors == [None, refused, rejected, None]
+        # a refused recipient keeps the session, another error closes it
+        assert opened[0].sent == [messages[0]]
+        assert opened[0].closed
+        assert opened[1].sent == [messages[3]]
+
+    def test_forked_process_opens_its_own_connections(self, backends, mocker):
+        smtp_pool = make_pool()
+        smtp_pool.send(FakeMessage())
+
+        mocker.patch("helpers.email.pool.os.getpid", return_value=-1)
+        smtp_pool.send(FakeMessage())
+
+        opened, _ = backends
+        assert len(opened) == 2
+        assert not opened[0].closed
+
+
+@pytest.mark.unit
+class TestCompiledTemplateCache:
+    path = "security/user/activation/activation.html"
+    data = {"name": "<b>user</b>", "client_url": "https://app.test.com", "token": "token"}
+
+    def test_render_is_the_render_of_django(self):
+        cache = CompiledTemplateCache()
+
+        assert cache.render(self.path, self.data) == render_to_string(self.path, self.data)
+
+    def test_static_includes_are_inlined(self):
+        template = CompiledTemplateCache().get(self.path)
+
+        assert not any(isinstance(node, IncludeNode) for node in template.nodelist)
+        # the template shared by the loaders is left untouched
+        shared = engines["django"].engine.get_template(self.path)
+        assert any(isinstance(node, IncludeNode) for node in shared.nodelist)
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "{% include path %}",
+            '{% include "layout/header.html" with name=name %}',
+            '{% include "layout/header.html"|lower %}',
+        ],
+    )
+    def test_other_includes_are_kept(self, source):
+        template = engines["django"].engine.from_string(source)
+
+        assert isinstance(inline_static_includes(template).nodelist[0], IncludeNode)
+
+    def test_templates_are_compiled_once(self, mocker):
+        cache = CompiledTemplateCache()
+        compile_template = mocker.spy(cache, "compile")
+        paths = [self.path, self.path.replace(".html", ".txt")]
+
+        assert cache.warm(paths) == 2
+        assert cache.warm(paths) == 2
+        cache.render(self.path, self.data)
+
+        assert compile_template.call_count == 2
+
+
+@pytest.mark.unit
+class TestSMTPHostLimit:
+    def test_connections_in_use_are_bounded_per_host(self, backends):
+        smtp_pool = make_pool(max_connections=4, max_per_host=2)
+        _, queued = backends
+        lock = threading.Lock()
+        in_use = []
+        peak = []
+
+        def send(message):
+            with lock:
+                in_use.append(message)
+                peak.append(len(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.remove(message)
+            return 1
+
+        queued.extend(FakeBackend(send=send) for _ in range(8))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sent = list(executor.map(smtp_pool.send, [FakeMessage() for _ in range(8)]))
+
+        assert sent == [1] * 8
+        assert max(peak) == 2
+
+    def test_each_host_has_its_own_limit(self, settings):
+        smtp_pool = make_pool(max_per_host=2)
+        settings.EMAIL_HOST, settings.EMAIL_PORT = "first.test.com", 25
+        first = smtp_pool.get_semaphore()
+        settings.EMAIL_HOST = "second.test.com"
+
+        assert smtp_pool.get_semaphore() is not first
+        settings.EMAIL_HOST = "first.test.com"
+        assert smtp_pool.get_semaphore() is first
@@ -10,26 +10,57 @@ class PermissionPolicyMixin:
     PermissionPolicyMixin is a mixin that allows you to specify different
     permission classes for different methods on a view.
     Make sure that the view has a `permission_classes_by_action` attribute
+
+    The permission classes of an action are compiled once per view class
+    into a tuple of permission instances, which is then shared by
+    all the requests. Permission classes must therefore be stateless.
     """
 
-    # pylint: disable=unresolved-reference
-    def check_permissions(self, request):
+    def get_permission_policy_key(self):
+        """
+        Key of the current request in `permission_classes_by_action`:
+        the name of the handler `APIView.dispatch` picks for the method,
+        i.e. the action for viewsets and "options" for OPTIONS.
+        The request may be a clone with another method, e.g. when the
+        metadata of an OPTIONS request checks the allowed methods.
+        """
+        request = getattr(self, "request", None)
+        if request is None:
+            # e.g. the views instantiated by the schema generators
+            return None
+        handler = getattr(self, request.method.lower(), None)
+        return getattr(handler, "__name__", None)
+
+    @classmethod
+    def get_permission_policy_table(cls) -> dict:
+        """
+        Return the policy table of the view class.
+        It is stored on the class itself, so subclasses do not share it.
+        """
+        table = cls.__dict__.get("_permission_policy_table")
+        if table is None:
+            table = {}
+            cls._permission_policy_table = table
+        return table
+
+    def get_permissions(self):
+        # The default classes depend on the route as well: `permission_classes`
+        # may be overridden per action (e.g. `@action(permission_classes=[])`),
+        # so the instances are compiled per tuple of classes.
+        key = self.get_permission_policy_key()
+        permission_classes = tuple(
+            (
+                self.permission_classes_by_action  # noqa: unresolved reference
+                and self.permission_classes_by_action.get(key)  # noqa: unresolved reference
+            )
+            or self.permission_classes  # noqa: unresolved reference
+        )
+        table = self.get_permission_policy_table()
         try:
-            # This line is heavily inspired from `APIView.dispatch`.
-            # It returns the method associated with an endpoint.
-            handler = getattr(self, request.method.lower())
-        except AttributeError:
-            handler = None
-
-        if (
-            handler
-            and self.permission_classes_by_action  # noqa: unresolved reference
-            and self.permission_classes_by_action.get(
-                handler.__name__
-            )  # noqa: unresolved reference
-        ):
-            self.permission_classes = self.permission_classes_by_action.get(
-                handler.__name__
-            )  # noqa
-
-        super().check_permissions(request)  # noqa: unresolved reference
+            return table[permission_classes]
+        except KeyError:
+            pass
+
+        permissions = tuple(permission() for permission in permission_classes)
+        table[permission_classes] = permissions
+        return permissions
@@ -0,0 +1,66 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the authentication backend answering the
+permission checks from the per-user permission cache.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.contenttypes.models import ContentType
+
+from helpers.permissions.cache import permission_cache
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    Replaces both `django.contrib.auth.backends.ModelBackend`
+    and `guardian.backends.ObjectPermissionBackend`.
+    Authentication is left to `ModelBackend`, while the model and
+    object permission checks are answered from `permission_cache`.
+    The permissions are loaded once per request (user instance).
+    """
+
+    def _get_permissions(self, user_obj) -> dict:
+        # pylint: disable=protected-access
+        if not hasattr(user_obj, "_cached_permissions"):
+            user_obj._cached_permissions = permission_cache.get(user_obj)
+        return user_obj._cached_permissions
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return set()
+        if obj is None:
+            if user_obj.is_superuser:
+                return super().get_all_permissions(user_obj)
+            return self._get_permissions(user_obj)["model"]
+
+        content_type = ContentType.objects.get_for_model(obj)
+        if user_obj.is_superuser:
+            return set(
+                content_type.permission_set.values_list("codename", flat=True)
+            )
+        object_pk = str(obj.pk)
+        return {
+            codename
+            for app_label, model, codename, pk in self._get_permissions(user_obj)["object"]
+            if (app_label, model, pk) == (content_type.app_label, content_type.model, object_pk)
+        }
+
+    def has_perm(self, user_obj, perm, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return False
+        if user_obj.is_superuser:
+            return True
+        if obj is None:
+            return perm in self._get_permissions(user_obj)["model"]
+
+        # object level permission (guardian)
+        app_label, _, codename = perm.rpartition(".")
+        content_type = ContentType.objects.get_for_model(obj)
+        if app_label and app_label != content_type.app_label:
+            return False
+        return (
+            content_type.app_label,
+            content_type.model,
+            codename,
+            str(obj.pk),
+        ) in self._get_permissions(user_obj)["object"]
@@ -0,0 +1,152 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the per-user cache of the model (django.contrib.auth)
+and object (guardian) permissions.
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import CharField, Value
+from guardian.models import GroupObjectPermission, UserObjectPermission
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# hit ratio: rate(permission_cache_requests_total{result="hit"}[5m])
+#            / rate(permission_cache_requests_total[5m])
+PERMISSION_CACHE_REQUESTS = Counter(
+    "permission_cache_requests",
+    "Lookups of the per-user permission cache.",
+    ["result"],
+)
+
+
+class PermissionCache:
+    """
+    Cache of the permissions of a user, stored in the shared cache.
+    The permissions are loaded with a single query (UNION ALL of
+    the user, group, user-object and group-object permissions)
+    and stored as:
+    {
+        "model": {"<app_label>.<codename>", ...},
+        "object": {("<app_label>", "<model>", "<codename>", "<object_pk>"), ...},
+    }
+    """
+
+    def __init__(self, timeout: int, cache_alias: str, key_prefix: str = "permissions"):
+        """
+        :param timeout: TTL of the entries in seconds
+        :param cache_alias: Alias of the shared cache in `settings.CACHES`
+        :param key_prefix: Prefix of the cache keys
+        """
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Build the cache from `settings.PERMISSION_CACHE`.
+        """
+        config = getattr(settings, "PERMISSION_CACHE", {})
+        return cls(
+            timeout=config.get("TIMEOUT", 300),
+            cache_alias=config.get("CACHE_ALIAS", "default"),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, user_id) -> str:
+        """
+        Permissions live in the tenant schemas,
+        so the schema name is a part of the key.
+        """
+        schema_name = getattr(connection, "schema_name", "public")
+        return f"{self.key_prefix}:{schema_name}:{user_id}"
+
+    def get(self, user) -> dict:
+        """
+        Return the permissions of the user.
+        """
+        key = self.make_key(user.pk)
+        try:
+            permissions = self.shared.get(key)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not read %s from the shared cache", key, exc_info=True)
+            permissions = None
+
+        if permissions is not None:
+            PERMISSION_CACHE_REQUESTS.labels("hit").inc()
+            return permissions
+
+        PERMISSION_CACHE_REQUESTS.labels("miss").inc()
+        permissions = self.load(user)
+        try:
+            self.shared.set(key, permissions, timeout=self.timeout)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not write %s to the shared cache", key, exc_info=True)
+        return permissions
+
+    @staticmethod
+    def load(user) -> dict:
+        """
+        Load the permissions of the user in one round trip.
+        Model level rows have no object pk.
+        """
+        no_object = Value(None, output_field=CharField())
+        model_fields = ("content_type__app_label", "content_type__model", "codename")
+        object_fields = (
+            "content_type__app_label",
+            "content_type__model",
+            "permission__codename",
+            "object_pk",
+        )
+        querysets = [
+            Permission.objects.filter(user=user).values_list(*model_fields, no_object),
+            Permission.objects.filter(group__user=user).values_list(
+                *model_fields, no_object
+            ),
+            UserObjectPermission.objects.filter(user=user).values_list(*object_fields),
+            GroupObjectPermission.objects.filter(group__user=user).values_list(
+                *object_fields
+            ),
+        ]
+        # the default ordering of the models is useless here
+        querysets = [queryset.order_by() for queryset in querysets]
+        rows = querysets[0].union(*querysets[1:], all=True)
+
+        permissions = {"model": set(), "object": set()}
+        for app_label, model, codename, object_pk in rows:
+            if object_pk is None:
+                permissions["model"].add(f"{app_label}.{codename}")
+            else:
+                permissions["object"].add((app_label, model, codename, object_pk))
+        return permissions
+
+    def invalidate(self, user_ids) -> None:
+        """
+        Drop the permissions of the given users.
+        If called inside a transaction, they are dropped
+        again on commit (see `UserSnapshotCache.invalidate`).
+        """
+        keys = [self.make_key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        self._evict(keys)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._evict(keys))
+
+    def _evict(self, keys: list[str]) -> None:
+        try:
+            self.shared.delete_many(keys)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not evict %s from the shared cache", keys, exc_info=True)
+
+
+permission_cache = PermissionCache.from_settings()
@@ -6,10 +6,13 @@ class ModelPermissions(permissions.DjangoModelPermissions):
     This class is used to override the default DjangoModelPermissions class
     to restrict the permissions of GET, OPTIONS and HEAD requests,
     which are not protected by default.
+    The map is defined on the class, so instances are stateless
+    and the map of DjangoModelPermissions is left untouched.
     """
 
-    def __init__(self):
-        self.perms_map["GET"] = ["%(app_label)s.view_%(model_name)s"]
-        self.perms_map["OPTIONS"] = ["%(app_label)s.view_%(model_name)s"]
-        self.perms_map["HEAD"] = ["%(app_label)s.view_%(model_name)s"]
-        super().__init__()
+    perms_map = {
+        **permissions.DjangoModelPermissions.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "OPTIONS": ["%(app_label)s.view_%(model_name)s"],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OrganizationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "services.country"
+
+    def ready(self):
+        import services.country.signals.tenant_cache  # noqa: F401 pylint: disable=unused-import
@@ -0,0 +1,195 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the command migrating the country schemas in parallel.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django_tenants.utils import get_public_schema_name, schema_exists
+
+from services.country.models import Country
+from services.country.utils.migrations import init_worker, migrate_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Migrate the public schema, then all the country schemas "
+        "in a pool of processes, each with its own database connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of schemas migrated at the same time (default: number of cores)",
+        )
+        parser.add_argument(
+            "--retries",
+            type=int,
+            default=1,
+            help="Number of times a failed schema is migrated again (default: 1)",
+        )
+        parser.add_argument(
+            "--schema",
+            dest="schemas",
+            action="append",
+            help="Only migrate this schema, can be repeated",
+        )
+        parser.add_argument(
+            "--skip-public",
+            action="store_true",
+            help="Do not migrate the public schema first",
+        )
+        parser.add_argument(
+            "--with-template",
+            action="store_true",
+            help="Also migrate the template schema the countries are cloned from",
+        )
+        parser.add_argument(
+            "--fake",
+            action="store_true",
+            help="Mark the migrations as run without running them",
+        )
+        parser.add_argument(
+            "--report",
+            help="Write the summary report as json to this file",
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        verbosity = options["verbosity"]
+
+        if not options["skip_public"]:
+            self.stdout.write("Migrating the public schema...")
+            call_command(
+                "migrate_schemas", shared=True, interactive=False, verbosity=verbosity
+            )
+
+        schemas = self.get_schemas(options)
+        migrate_options = {"verbosity": verbosity, "fake": options["fake"]}
+        processes = max(1, min(options["processes"], len(schemas) or 1))
+        self.stdout.write(f"Migrating {len(schemas)} schemas with {processes} processes...")
+
+        # the children open their own connections
+        connections.close_all()
+        attempts = {}
+        results = {}
+        pending = schemas
+        for attempt in range(options["retries"] + 1):
+            if not pending:
+                break
+            if attempt:
+                self.stdout.write(f"Retrying {len(pending)} failed schemas...")
+            # a pool whose worker died is broken for good, each round gets a new one
+            with self.make_pool(processes) as pool:
+                pending = self.run_round(pool, pending, migrate_options, results, attempts)
+
+        report = self.make_report(schemas, results, attempts, time.perf_counter() - started_at)
+        self.write_summary(report)
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+        if report["failed"]:
+            raise CommandError(f"{len(report['failed'])} schemas failed to migrate")
+
+    def get_schemas(self, options) -> list[str]:
+        if options["schemas"]:
+            schemas = list(dict.fromkeys(options["schemas"]))
+        else:
+            schemas = list(
+                Country.objects.exclude(schema_name=get_public_schema_name())
+                .order_by("schema_name")
+                .values_list("schema_name", flat=True)
+            )
+        template_schema = settings.TENANT_TEMPLATE_SCHEMA
+        if (
+            options["with_template"]
+            and template_schema not in schemas
+            and schema_exists(template_schema)
+        ):
+            schemas.append(template_schema)
+        return schemas
+
+    @staticmethod
+    def make_pool(processes: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+
+    def run_round(self, pool, schemas, migrate_options, results, attempts) -> list[str]:
+        """
+        Migrate the schemas, streaming the progress as they complete.
+        Returns the schemas which failed.
+        """
+        futures = {
+            pool.submit(migrate_schema, schema_name, migrate_options): schema_name
+            for schema_name in schemas
+        }
+        failed = []
+        for done, future in enumerate(as_completed(futures), start=1):
+            schema_name = futures[future]
+            attempts[schema_name] = attempts.get(schema_name, 0) + 1
+            try:
+                result = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                # the worker process died
+                result = {"schema_name": schema_name, "ok": False, "seconds": 0, "error": repr(exc)}
+            results[schema_name] = result
+            progress = f"[{done}/{len(futures)}] {schema_name}"
+            if result["ok"]:
+                self.stdout.write(f"{progress} migrated in {result['seconds']:.2f}s")
+                if migrate_options["verbosity"] > 1 and result.get("output"):
+                    self.stdout.write(result["output"])
+            else:
+                failed.append(schema_name)
+                self.stderr.write(f"{progress} failed after {result['seconds']:.2f}s")
+                self.stderr.write(result["error"])
+        return failed
+
+    @staticmethod
+    def make_report(schemas, results, attempts, elapsed: float) -> dict:
+        timings = sorted(
+            ((result["seconds"], name) for name, result in results.items() if result["ok"]),
+            reverse=True,
+        )
+        return {
+            "schemas": len(schemas),
+            "migrated": len(timings),
+            "retried": sorted(name for name, count in attempts.items() if count > 1),
+            "failed": {
+                name: result["error"] for name, result in results.items() if not result["ok"]
+            },
+            "elapsed_seconds": round(elapsed, 3),
+            "total_schema_seconds": round(sum(seconds for seconds, _ in timings), 3),
+            "slowest": [
+                {"schema_name": name, "seconds": round(seconds, 3)} for seconds, name in timings[:10]
+            ],
+        }
+
+    def write_summary(self, report: dict) -> None:
+        self.stdout.write(
+            f"\n{report['migrated']}/{report['schemas']} schemas migrated "
+            f"in {report['elapsed_seconds']:.2f}s "
+            f"({report['total_schema_seconds']:.2f}s of migrations)"
+        )
+        if report["retried"]:
+            self.stdout.write(f"Retried: {', '.join(report['retried'])}")
+        if report["slowest"]:
+            self.stdout.write("Slowest schemas:")
+            for item in report["slowest"]:
+                self.stdout.write(f"  {item['schema_name']}: {item['seconds']:.2f}s")
+        if report["failed"]:
+            self.stderr.write(f"Failed: {', '.join(sorted(report['failed']))}")
+        else:
+            self.stdout.write(self.style.SUCCESS("All the schemas are migrated."))
@@ -0,0 +1,26 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the command refreshing the template schema
+the countries are cloned from.
+"""
+
+from django.core.management.base import BaseCommand
+
+from services.country.utils import template
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the template schema of the countries if it does not exist "
+        "and apply the missing migrations on it. Run it after every deploy."
+    )
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+        missing = template.get_missing_migrations()
+        if not missing:
+            self.stdout.write("The template schema is up-to-date.")
+            return
+        self.stdout.write(f"Applying {len(missing)} migrations on the template schema...")
+        template.refresh_template(verbosity=verbosity)
+        self.stdout.write(self.style.SUCCESS("The template schema is up-to-date."))
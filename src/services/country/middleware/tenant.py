@@ -0,0 +1,19 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the middleware selecting the schema of the request's tenant.
+"""
+
+from django_tenants.middleware.main import TenantMainMiddleware
+
+from services.country.utils.tenant_cache import tenant_cache
+
+
+class CachedTenantMiddleware(TenantMainMiddleware):
+    """
+    TenantMainMiddleware resolving the tenant from `tenant_cache`
+    instead of querying the domain of the request on every request.
+    The cache is invalidated by the signals of `Domain` and `Country`.
+    """
+
+    def get_tenant(self, domain_model, hostname):
+        return tenant_cache.get(domain_model, hostname)
@@ -1,2 +1,3 @@
 from .country import Country
 from .domain import Domain
+from .onboarding import OnboardingItem, OnboardingJob
@@ -3,13 +3,19 @@ Country entities
 Each country is a tenant in the system
 """
 
+import logging
 import uuid
 
-from django.db import models
+from django.conf import settings
+from django.db import connections, models
 from django_tenants.models import TenantMixin
-from rest_framework.exceptions import ValidationError
+from django_tenants.postgresql_backend.base import _check_schema_name
+from django_tenants.utils import get_tenant_database_alias, schema_exists
 
 from services.country.serializers.domain import DomainSerializer
+from services.country.utils import template
+
+logger = logging.getLogger(__name__)
 
 
 class Country(TenantMixin):
@@ -32,6 +38,33 @@ class Country(TenantMixin):
         """
         return str(self.name)
 
+    def create_schema(self, check_if_exists=False, sync_schema=True, verbosity=1):
+        """
+        Create the schema of the country.
+        With the "clone" provisioning mode, the schema is cloned from
+        the template schema, unless the template misses migrations.
+        Otherwise, all the migrations are run on the new schema.
+        """
+        if not sync_schema or settings.TENANT_PROVISIONING != "clone":
+            return super().create_schema(check_if_exists, sync_schema, verbosity)
+
+        missing = template.get_missing_migrations()
+        if missing:
+            logger.warning(
+                "The template schema misses %d migrations, migrating %s instead. "
+                "Run `manage.py refresh_tenant_template` to refresh it.",
+                len(missing),
+                self.schema_name,
+            )
+            return super().create_schema(check_if_exists, sync_schema, verbosity)
+
+        _check_schema_name(self.schema_name)
+        if check_if_exists and schema_exists(self.schema_name):
+            return False
+        template.clone_template(self.schema_name)
+        connections[get_tenant_database_alias()].set_schema_to_public()
+        return True
+
     def _set_domain(self, domain_url: str, is_primary: bool = False):
         """
         Set the domain for the company
@@ -54,15 +87,11 @@ class Country(TenantMixin):
         """
         Set the primary domain for the company
         The following steps are performed:
-        1. Check if the primary domain for this company already exists
-            1.1. If the primary domain exists, raise an error
-            1.2. If the primary domain does not exist, set the primary domain using the _set_domain method
+        1. Set the primary domain using the _set_domain method
+        2. If the company already has a primary domain, the database
+           rejects it and `Domain.save` raises a validation error
         This method calls the _set_domain method to make sure
         that the required validations are performed
         """
-        if self.domains.filter(
-                is_primary=True
-        ).exists():  # noqa  # pylint: disable=no-member
-            raise ValidationError("Primary domain already exists")
         domain = self._set_domain(domain_url, is_primary=True)
         return domain
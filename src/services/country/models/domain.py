@@ -4,7 +4,7 @@ Domain is an identifier for a country
 """
 import uuid
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django_tenants.models import DomainMixin
 from rest_framework.exceptions import ValidationError
 
@@ -23,21 +23,38 @@ class Domain(DomainMixin):
         """
         return str(self.domain)
 
-    def validate_unique(self, exclude=None):
-        """
-        Validate that the domain is unique
-        """
-        if self.is_primary:
-            primary_domain = Domain.objects.filter(is_primary=True, tenant=self.tenant)
-            if primary_domain.exists() and primary_domain.first().id != self.id:
-                raise ValidationError(
-                    f"There is already a primary domain for {self.tenant.name}"
-                )
-        return super().validate_unique(exclude)
+    class Meta:
+        constraints = [
+            # a country has at most one primary domain
+            models.UniqueConstraint(
+                fields=["tenant"],
+                condition=models.Q(is_primary=True),
+                name="country_domain_single_primary",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         """
         Save the domain
+        The first domain of a country is its primary domain.
+        The primary domain uniqueness is enforced by the database,
+        the violation is reported as a validation error
+        (the existing primary domain is not demoted like `DomainMixin.save` does).
+        The savepoint keeps the outer transaction usable.
         """
-        self.validate_unique()
-        return super().save(*args, **kwargs)
+        if not self.is_primary:
+            self.is_primary = (
+                not Domain.objects.filter(tenant=self.tenant, is_primary=True)
+                .exclude(pk=self.pk)
+                .exists()
+            )
+        try:
+            with transaction.atomic():
+                return super(DomainMixin, self).save(*args, **kwargs)
+        except IntegrityError as exc:
+            diag = getattr(exc.__cause__, "diag", None)
+            if getattr(diag, "constraint_name", None) == "country_domain_single_primary":
+                raise ValidationError(
+                    f"There is already a primary domain for {self.tenant.name}"
+                ) from exc
+            raise
@@ -0,0 +1,56 @@
+"""
+Onboarding entities
+An onboarding job provisions a list of countries in the background
+"""
+
+import uuid
+
+from django.db import models
+
+
+class OnboardingJob(models.Model):
+    """
+    A bulk onboarding request.
+    Its status is derived from the status of its items.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
+class OnboardingItem(models.Model):
+    """
+    A country to provision as part of an onboarding job.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job = models.ForeignKey(OnboardingJob, on_delete=models.CASCADE, related_name="items")
+    name = models.CharField(max_length=200, help_text="Name of the country")
+    primary_domain = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    error = models.TextField(blank=True, default="")
+    country = models.ForeignKey(
+        "country.Country",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.status})"
@@ -2,6 +2,7 @@ from abc import ABC
 from collections import defaultdict
 
 from django.conf import settings
+from django.db.models import Count
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -25,26 +26,19 @@ class UniquenessListSerializer(serializers.ListSerializer, ABC):
         2. Only single primary domain object is allowed for the company
         """
 
-        # pylint: disable=protected-access
         # check if the company already had a primary domain
         # and if the new domain is also primary raise an error
-        tenant_db_table = self.child.Meta.model._meta.get_field(  # noqa
-            "tenant"
-        ).related_model._meta.db_table
-        model_db_table = self.child.Meta.model._meta.db_table
-        sql = f"""
-            SELECT {model_db_table}.*, {tenant_db_table}.name
-            FROM {model_db_table}
-            JOIN {tenant_db_table}
-                ON {model_db_table}.tenant_id = {tenant_db_table}.id
-            WHERE {tenant_db_table}.name in %s
-        """
+        # (a single aggregate query, whatever the number of companies)
         primary_domains: dict[str, int] = defaultdict(lambda: 0)
-        for domain in Domain.objects.raw(
-            sql, [tuple(domain["tenant"].name for domain in self.initial_data)]
-        ):
-            if domain.is_primary:
-                primary_domains[domain.tenant.name] += 1
+        primary_domains.update(
+            Domain.objects.filter(
+                tenant__name__in={domain["tenant"].name for domain in self.initial_data},
+                is_primary=True,
+            )
+            .values("tenant__name")
+            .annotate(primaries=Count("id"))
+            .values_list("tenant__name", "primaries")
+        )
         for domain in self.initial_data:
             primary_domains[domain["tenant"].name] += int(domain["is_primary"])
         for company, counter in primary_domains.items():
@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django_tenants.postgresql_backend.base import is_valid_schema_name
+from rest_framework import serializers
+
+from helpers.validators.domain import DomainFormatValidator
+from helpers.validators.list_unique import ListUniqueValidator
+from services.country.models import Country, Domain, OnboardingItem, OnboardingJob
+from services.country.tasks.onboarding import start_onboarding
+
+ACTIVE_STATUSES = (OnboardingItem.Status.PENDING, OnboardingItem.Status.RUNNING)
+
+
+class OnboardingListSerializer(serializers.ListSerializer):
+    """
+    List serializer that checks for uniqueness of the names and domains
+    """
+
+    validators = [ListUniqueValidator(unique_field_names=["name", "primary_domain"])]
+
+
+class OnboardingCountrySerializer(serializers.Serializer):
+    """
+    Serializer for a country of an onboarding request.
+    The uniqueness against the database is checked for
+    the whole list at once by `CountryOnboardingSerializer`.
+    """
+
+    name = serializers.CharField(max_length=200)
+    primary_domain = serializers.CharField(max_length=200)
+
+    class Meta:
+        list_serializer_class = OnboardingListSerializer
+
+    def validate_name(self, value):  # noqa
+        """
+        The name is used as the schema name of the country
+        """
+        if not is_valid_schema_name(value):
+            raise serializers.ValidationError("Invalid name, it is used as the schema name")
+        return value
+
+    def validate_primary_domain(self, value):  # noqa
+        """
+        Validate that the domain is given in the correct format
+        """
+        DomainFormatValidator(
+            regex=settings.VALID_DOMAINS_REGEX,
+            message="Invalid domain format",
+        )(value)
+        return value
+
+
+class CountryOnboardingSerializer(serializers.Serializer):
+    """
+    Serializer for the bulk onboarding endpoint
+    """
+
+    countries = OnboardingCountrySerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.COUNTRY_ONBOARDING_MAX_COUNTRIES,
+    )
+
+    def validate_countries(self, countries):  # noqa
+        """
+        Check that the names and domains are not taken
+        by a country or by an item of an onboarding in progress.
+        A single query is run per table, whatever the number of countries.
+        """
+        names = [country["name"] for country in countries]
+        domains = [country["primary_domain"] for country in countries]
+
+        taken_names = set()
+        for name, schema_name in Country.objects.filter(
+            Q(name__in=names) | Q(schema_name__in=names)
+        ).values_list("name", "schema_name"):
+            taken_names.update((name, schema_name))
+        taken_domains = set(
+            Domain.objects.filter(domain__in=domains).values_list("domain", flat=True)
+        )
+        for name, domain in OnboardingItem.objects.filter(
+            Q(name__in=names) | Q(primary_domain__in=domains),
+            status__in=ACTIVE_STATUSES,
+        ).values_list("name", "primary_domain"):
+            taken_names.add(name)
+            taken_domains.add(domain)
+
+        errors = []
+        for country in countries:
+            error = {}
+            if country["name"] in taken_names:
+                error["name"] = "A country with this name already exists or is being onboarded"
+            if country["primary_domain"] in taken_domains:
+                error["primary_domain"] = "This domain is already taken"
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return countries
+
+    def create(self, validated_data):
+        """
+        Create the job and its items, then enqueue the provisioning
+        once they are committed (the workers have to see them).
+        """
+        with transaction.atomic():
+            job = OnboardingJob.objects.create()
+            items = OnboardingItem.objects.bulk_create(
+                OnboardingItem(job=job, **country) for country in validated_data["countries"]
+            )
+            item_ids = [item.id for item in items]
+            transaction.on_commit(lambda: start_onboarding(item_ids))
+        return job
+
+
+class OnboardingItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the status of a country of an onboarding job
+    """
+
+    class Meta:
+        model = OnboardingItem
+        fields = (
+            "id",
+            "name",
+            "primary_domain",
+            "status",
+            "error",
+            "country",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
+class OnboardingJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the status of an onboarding job.
+    The job is "pending" until an item starts, "running" until
+    all the items are finished, then "done" or "failed"
+    if any of the countries could not be provisioned.
+    """
+
+    status = serializers.SerializerMethodField()
+    counts = serializers.SerializerMethodField()
+    items = OnboardingItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = OnboardingJob
+        fields = ("id", "created_at", "status", "counts", "items")
+        read_only_fields = fields
+
+    @staticmethod
+    def get_counts(job) -> dict:
+        counts = {status: 0 for status in OnboardingItem.Status.values}
+        for item in job.items.all():
+            counts[item.status] += 1
+        return counts
+
+    def get_status(self, job) -> str:
+        counts = self.get_counts(job)
+        if counts[OnboardingItem.Status.PENDING] == sum(counts.values()):
+            return OnboardingItem.Status.PENDING
+        if counts[OnboardingItem.Status.PENDING] or counts[OnboardingItem.Status.RUNNING]:
+            return OnboardingItem.Status.RUNNING
+        if counts[OnboardingItem.Status.FAILED]:
+            return OnboardingItem.Status.FAILED
+        return OnboardingItem.Status.DONE
@@ -0,0 +1,69 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the signals invalidating the hostname to tenant cache
+which is used by `CachedTenantMiddleware`.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from services.country.models import Country, Domain
+from services.country.utils.tenant_cache import tenant_cache
+
+
+@receiver(pre_save, sender=Domain)
+def remember_previous_domain(
+        sender: Domain,  # noqa: F841 pylint: disable=unused-argument
+        instance: Domain,
+        **kwargs
+):
+    """
+    This signal is triggered before a domain is saved.
+    It remembers the hostname stored in the database,
+    so it is invalidated as well if the domain is renamed.
+    """
+    instance._previous_domain = (  # pylint: disable=protected-access
+        Domain.objects.filter(pk=instance.pk).values_list("domain", flat=True).first()
+        if instance.pk is not None
+        else None
+    )
+
+
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def invalidate_domain(
+        sender: Domain,  # noqa: F841 pylint: disable=unused-argument
+        instance: Domain,
+        **kwargs
+):
+    """
+    This signal is triggered when a domain is saved or deleted.
+    It drops the cached tenant of its current and previous hostname
+    and the cached primary domain of its country.
+    """
+    tenant_cache.invalidate(
+        hostnames=[instance.domain, getattr(instance, "_previous_domain", None)],
+        country_ids=[instance.tenant_id],
+    )
+
+
+@receiver(post_save, sender=Country)
+@receiver(pre_delete, sender=Country)
+def invalidate_country(
+        sender: Country,  # noqa: F841 pylint: disable=unused-argument
+        instance: Country,
+        **kwargs
+):
+    """
+    This signal is triggered when a country is saved or about to be deleted
+    (its domains are gone once it is deleted).
+    It drops the cached tenant of all the hostnames of the country
+    and its cached primary domain.
+    """
+    if kwargs.get("created"):
+        # a new country has no domain yet
+        return
+    tenant_cache.invalidate(
+        hostnames=instance.domains.values_list("domain", flat=True),  # noqa pylint: disable=no-member
+        country_ids=[instance.pk],
+    )
@@ -0,0 +1,116 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the tasks provisioning the countries of an onboarding job.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from celery import chain
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.celery import app
+from services.country.models import Country, OnboardingItem
+
+logger = logging.getLogger(__name__)
+
+
+@app.task
+def provision_country(item_id: str):
+    """
+    Create the country of the onboarding item, its schema and its primary domain.
+    Failures are recorded on the item instead of being raised,
+    so the next items of the lane are still provisioned.
+    If the worker dies while provisioning, the item stays running
+    until `reap_stale_onboarding_items` picks it up.
+
+    :param item_id: id of the onboarding item
+    """
+    # claim the item, a redelivered task must not provision it twice
+    claimed = OnboardingItem.objects.filter(
+        id=item_id, status=OnboardingItem.Status.PENDING
+    ).update(status=OnboardingItem.Status.RUNNING, started_at=timezone.now())
+    if not claimed:
+        return
+    item = OnboardingItem.objects.only("name", "primary_domain").get(id=item_id)
+
+    try:
+        with transaction.atomic():
+            country = Country.objects.create(name=item.name, schema_name=item.name)
+            country.set_primary_domain(item.primary_domain)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Could not provision the country %s", item.name)
+        OnboardingItem.objects.filter(id=item_id).update(
+            status=OnboardingItem.Status.FAILED,
+            error=str(exc),
+            finished_at=timezone.now(),
+        )
+        return
+    OnboardingItem.objects.filter(id=item_id).update(
+        status=OnboardingItem.Status.DONE,
+        country=country,
+        finished_at=timezone.now(),
+    )
+
+
+def start_onboarding(item_ids: list[str], concurrency: int = None) -> None:
+    """
+    Enqueue the provisioning of the items.
+    They are spread over `concurrency` lanes, each lane being a chain,
+    so at most `concurrency` schemas of the job are created at the same time.
+
+    :param item_ids: ids of the onboarding items
+    :param concurrency: number of lanes, defaults to `settings.COUNTRY_ONBOARDING_CONCURRENCY`
+    """
+    concurrency = max(1, concurrency or settings.COUNTRY_ONBOARDING_CONCURRENCY)
+    for lane in range(min(concurrency, len(item_ids))):
+        chain(
+            provision_country.si(str(item_id)) for item_id in item_ids[lane::concurrency]
+        ).apply_async()
+
+
+@app.task(ignore_result=True)
+def reap_stale_onboarding_items():
+    """
+    Settle the items running for longer than `settings.COUNTRY_ONBOARDING_TIMEOUT`
+    (their worker died, the chain of their lane stopped with it):
+    - the item is done if its country was committed, failed otherwise
+      (the country and its schema are created in one transaction);
+    - a chain of the pending items of the job is started in place of each
+      stopped lane. The items still queued in the other lanes are claimed
+      by whichever chain comes first, none is provisioned twice.
+    Run by celery beat.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.COUNTRY_ONBOARDING_TIMEOUT)
+    stopped_lanes = Counter()
+    stale = OnboardingItem.objects.filter(
+        status=OnboardingItem.Status.RUNNING, started_at__lt=cutoff
+    ).only("id", "job_id", "name")
+    for item in stale:
+        country = Country.objects.filter(schema_name=item.name).first()
+        if country is not None:
+            changes = {"status": OnboardingItem.Status.DONE, "country": country}
+        else:
+            changes = {
+                "status": OnboardingItem.Status.FAILED,
+                "error": "The worker provisioning the country was lost",
+            }
+        # the worker may have finished in the meantime
+        settled = OnboardingItem.objects.filter(
+            id=item.id, status=OnboardingItem.Status.RUNNING
+        ).update(finished_at=timezone.now(), **changes)
+        if settled:
+            logger.warning("Settled the stale onboarding item %s as %s", item.name, changes["status"])
+            stopped_lanes[item.job_id] += 1
+
+    for job_id, lanes in stopped_lanes.items():
+        pending_ids = list(
+            OnboardingItem.objects.filter(job_id=job_id, status=OnboardingItem.Status.PENDING)
+            .order_by("created_at")
+            .values_list("id", flat=True)
+        )
+        if pending_ids:
+            start_onboarding(pending_ids, concurrency=lanes)
@@ -0,0 +1,91 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Count
+
+from services.country.models import Country
+from services.country.utils.cross_schema import (
+    compile_cross_schema,
+    get_country_schemas,
+    get_tenant_tables,
+    iterate_cross_schema,
+    qualify_query,
+)
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase
+
+
+@pytest.mark.integration
+class CrossSchemaTests(UserTenantTestCase):
+    def setUp(self):
+        # a user has a country of its own, without a schema here
+        countries = [self.tenant] + Country.objects.bulk_create(
+            [Country(name=f"other{index}", schema_name=f"other{index}") for index in range(2)]
+        )
+        for index, country in enumerate(countries):
+            User.objects.create_user(
+                email=f"user{index}@example.com",
+                username=f"user{index}",
+                password="password",
+                country=country,
+                is_active=index > 0,
+            )
+        self.queryset = (
+            User.objects.values("is_active").annotate(count=Count("id")).order_by()
+        )
+
+    def test_tables_of_the_tenant_apps_are_qualified(self):
+        sql, _ = qualify_query(
+            self.queryset.query, "test", get_tenant_tables()
+        ).sql_with_params()
+
+        self.assertIn('FROM "test"."user_user"', sql)
+        # the query of the queryset is left untouched
+        self.assertNotIn('"test".', str(self.queryset.query))
+
+    def test_quotes_of_the_schema_name_are_escaped(self):
+        sql, _ = qualify_query(
+            self.queryset.query, 'test"; DROP', get_tenant_tables()
+        ).sql_with_params()
+
+        self.assertIn('FROM "test""; DROP"."user_user"', sql)
+
+    def test_invalid_schema_name(self):
+        with self.assertRaises(ValidationError):
+            qualify_query(self.queryset.query, "pg_catalog", get_tenant_tables())
+
+    def test_rows_are_tagged_with_their_schema(self):
+        schema_name = self.tenant.schema_name
+
+        rows = list(iterate_cross_schema(self.queryset, schemas=[schema_name, schema_name]))
+
+        self.assertEqual(
+            sorted((row["schema_name"], row["is_active"], row["count"]) for row in rows),
+            [
+                (schema_name, False, 1),
+                (schema_name, False, 1),
+                (schema_name, True, 2),
+                (schema_name, True, 2),
+            ],
+        )
+
+    def test_schema_of_the_caller_is_restored(self):
+        schemas = []
+        rows = iterate_cross_schema(
+            self.queryset, schemas=[self.tenant.schema_name], chunk_size=1
+        )
+        for _ in rows:
+            schemas.append(connection.schema_name)
+
+        self.assertEqual(schemas, [self.tenant.schema_name] * 2)
+
+    def test_one_statement_for_all_the_schemas(self):
+        sql, params = compile_cross_schema(self.queryset, schemas=["first", "second"])
+
+        self.assertEqual(sql.count("UNION ALL"), 1)
+        self.assertEqual(params, ["first", "second"])
+
+    def test_country_schemas(self):
+        self.assertIn(self.tenant.schema_name, get_country_schemas())
+        with self.assertRaises(ValueError):
+            compile_cross_schema(self.queryset, schemas=[])
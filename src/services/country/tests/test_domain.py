@@ -0,0 +1,61 @@
+import pytest
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+
+from services.country.models import Country, Domain
+
+
+@pytest.mark.integration
+@pytest.mark.django_models
+class SinglePrimaryDomainTests(TestCase):
+    def setUp(self):
+        # the countries are not migrated, no schema is needed here
+        self.country, self.other_country = Country.objects.bulk_create(
+            [
+                Country(name="first", schema_name="first"),
+                Country(name="second", schema_name="second"),
+            ]
+        )
+        Domain.objects.create(domain="first.test.com", tenant=self.country, is_primary=True)
+
+    def test_second_primary_domain_is_a_validation_error(self):
+        # e.g. a concurrent request, which passed the serializer checks
+        domain = Domain(domain="other.test.com", tenant=self.country, is_primary=True)
+
+        with self.assertRaisesMessage(
+            ValidationError, "There is already a primary domain for first"
+        ):
+            domain.save()
+
+        # the savepoint keeps the transaction usable
+        self.assertEqual(
+            list(Domain.objects.filter(tenant=self.country).values_list("domain", "is_primary")),
+            [("first.test.com", True)],
+        )
+
+    def test_set_primary_domain_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.country.set_primary_domain("other.test.com")
+
+        self.assertFalse(Domain.objects.filter(domain="other.test.com").exists())
+
+    def test_first_domain_is_the_primary_domain(self):
+        domain = Domain.objects.create(domain="second.test.com", tenant=self.other_country)
+
+        self.assertTrue(domain.is_primary)
+
+    def test_secondary_and_other_country_domains_are_allowed(self):
+        Domain.objects.create(domain="alias.test.com", tenant=self.country, is_primary=False)
+        self.other_country.set_primary_domain("second.test.com")
+
+        self.assertEqual(
+            set(Domain.objects.filter(is_primary=True).values_list("domain", flat=True)),
+            {"first.test.com", "second.test.com"},
+        )
+
+    def test_other_integrity_errors_are_raised(self):
+        domain = Domain(domain="first.test.com", tenant=self.other_country, is_primary=False)
+
+        with self.assertRaises(IntegrityError):
+            domain.save()
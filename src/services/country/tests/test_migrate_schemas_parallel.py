@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+from services.country.management.commands import migrate_schemas_parallel
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+
+def crash_first_worker(schema_name: str, options: dict) -> dict:
+    """
+    `migrate_schema` of a worker which dies on its first migration,
+    run in the spawned workers (it has to be importable).
+    """
+    marker = Path(os.environ["CRASH_MARKER"])
+    if not marker.exists():
+        marker.touch()
+        os._exit(1)  # pylint: disable=protected-access
+    return {
+        "schema_name": schema_name,
+        "ok": True,
+        "seconds": 0,
+        "pid": os.getpid(),
+        "output": "",
+        "error": None,
+    }
+
+
+def test_schemas_of_a_dead_worker_are_retried_in_a_new_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRASH_MARKER", str(tmp_path / "crashed"))
+    monkeypatch.setattr(migrate_schemas_parallel, "migrate_schema", crash_first_worker)
+    report = tmp_path / "report.json"
+
+    call_command(
+        "migrate_schemas_parallel",
+        schemas=["first", "second"],
+        skip_public=True,
+        processes=1,
+        retries=1,
+        report=str(report),
+    )
+
+    report = json.loads(report.read_text(encoding="utf-8"))
+    assert report["migrated"] == 2
+    assert report["failed"] == {}
+    assert report["retried"] == ["first", "second"]
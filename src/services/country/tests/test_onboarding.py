@@ -0,0 +1,194 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from services.country.models import Country, Domain, OnboardingItem, OnboardingJob
+from services.country.tasks import onboarding
+from services.country.views.country import CountryViewSet
+
+
+class StaffUser:
+    """
+    Authenticated user with all the permissions.
+    """
+
+    is_active = True
+    is_authenticated = True
+
+    @staticmethod
+    def has_perms(perms) -> bool:  # pylint: disable=unused-argument
+        return True
+
+
+@pytest.mark.integration
+@pytest.mark.django_views
+class OnboardingViewTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.start_onboarding = self.enterContext(
+            mock.patch("services.country.serializers.onboarding.start_onboarding")
+        )
+
+    def onboard(self, countries: list[dict]):
+        request = self.factory.post(
+            "/countries/onboarding/", {"countries": countries}, format="json"
+        )
+        force_authenticate(request, user=StaffUser())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.as_view("post", "onboarding")(request)
+
+    def get_status(self, job_id):
+        request = self.factory.get(f"/countries/onboarding/{job_id}/")
+        force_authenticate(request, user=StaffUser())
+        return self.as_view("get", "onboarding_status")(request, job_id=str(job_id))
+
+    @staticmethod
+    def as_view(method: str, action: str):
+        # with the serializer class of the action, like the router
+        return CountryViewSet.as_view(
+            {method: action}, **getattr(CountryViewSet, action).kwargs
+        )
+
+    def test_onboarding_is_accepted_and_enqueued(self):
+        response = self.onboard(
+            [
+                {"name": "first", "primary_domain": "first.test.com"},
+                {"name": "second", "primary_domain": "second.test.com"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], OnboardingItem.Status.PENDING)
+        self.assertEqual(response.data["counts"][OnboardingItem.Status.PENDING], 2)
+        job = OnboardingJob.objects.get(pk=response.data["id"])
+        (item_ids,), _ = self.start_onboarding.call_args
+        self.assertEqual(
+            item_ids, list(job.items.order_by("created_at").values_list("id", flat=True))
+        )
+
+    def test_taken_and_duplicated_names_are_rejected(self):
+        (country,) = Country.objects.bulk_create([Country(name="first", schema_name="first")])
+        Domain.objects.create(domain="first.test.com", tenant=country)
+
+        response = self.onboard(
+            [
+                {"name": "first", "primary_domain": "first.test.com"},
+                {"name": "second", "primary_domain": "second.test.com"},
+            ]
+        )
+        duplicated = self.onboard(
+            [
+                {"name": "second", "primary_domain": "second.test.com"},
+                {"name": "second", "primary_domain": "other.test.com"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["attr"], "countries")
+        self.assertIn("This domain is already taken", response.data["detail"])
+        self.assertEqual(duplicated.status_code, 400)
+        self.assertFalse(OnboardingJob.objects.exists())
+        self.start_onboarding.assert_not_called()
+
+    def test_status_of_the_job_and_its_items(self):
+        job = self.onboard(
+            [
+                {"name": "first", "primary_domain": "first.test.com"},
+                {"name": "second", "primary_domain": "second.test.com"},
+            ]
+        ).data["id"]
+        first, second = OnboardingItem.objects.filter(job_id=job).order_by("name")
+
+        first.status = OnboardingItem.Status.RUNNING
+        first.save()
+        self.assertEqual(self.get_status(job).data["status"], OnboardingItem.Status.RUNNING)
+
+        OnboardingItem.objects.filter(pk=first.pk).update(status=OnboardingItem.Status.DONE)
+        OnboardingItem.objects.filter(pk=second.pk).update(
+            status=OnboardingItem.Status.FAILED, error="boom"
+        )
+        response = self.get_status(job)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], OnboardingItem.Status.FAILED)
+        self.assertEqual(response.data["counts"]["done"], 1)
+        self.assertEqual(
+            [(item["name"], item["error"]) for item in response.data["items"]],
+            [("first", ""), ("second", "boom")],
+        )
+
+    def test_status_of_an_unknown_job(self):
+        response = self.get_status("00000000-0000-0000-0000-000000000000")
+
+        self.assertEqual(response.status_code, 404)
+
+
+@pytest.mark.integration
+class OnboardingTaskTests(TestCase):
+    def setUp(self):
+        job = OnboardingJob.objects.create()
+        self.items = OnboardingItem.objects.bulk_create(
+            OnboardingItem(job=job, name=f"country{index}", primary_domain=f"{index}.test.com")
+            for index in range(5)
+        )
+        self.item = self.items[0]
+
+    def test_failure_is_recorded_on_the_item(self):
+        with mock.patch.object(
+            Country.objects, "create", side_effect=RuntimeError("no schema")
+        ):
+            onboarding.provision_country(str(self.item.id))
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, OnboardingItem.Status.FAILED)
+        self.assertEqual(self.item.error, "no schema")
+        self.assertIsNotNone(self.item.finished_at)
+
+    def test_claimed_item_is_not_provisioned_twice(self):
+        OnboardingItem.objects.filter(pk=self.item.pk).update(
+            status=OnboardingItem.Status.RUNNING
+        )
+
+        with mock.patch.object(Country.objects, "create") as create:
+            onboarding.provision_country(str(self.item.id))
+
+        create.assert_not_called()
+
+    def test_items_are_spread_over_the_lanes(self):
+        item_ids = [str(item.id) for item in self.items]
+
+        with mock.patch.object(onboarding, "chain") as chain:
+            onboarding.start_onboarding(item_ids, concurrency=2)
+
+        lanes = [
+            [task.args[0] for task in call.args[0]] for call in chain.call_args_list
+        ]
+        self.assertEqual(lanes, [item_ids[0::2], item_ids[1::2]])
+
+    @override_settings(COUNTRY_ONBOARDING_TIMEOUT=60)
+    def test_stale_items_are_settled_and_their_lanes_restarted(self):
+        started_at = timezone.now() - timedelta(minutes=5)
+        lost, committed = self.items[:2]
+        OnboardingItem.objects.filter(pk__in=[lost.pk, committed.pk]).update(
+            status=OnboardingItem.Status.RUNNING, started_at=started_at
+        )
+        (country,) = Country.objects.bulk_create(
+            [Country(name=committed.name, schema_name=committed.name)]
+        )
+
+        with mock.patch.object(onboarding, "start_onboarding") as start_onboarding:
+            onboarding.reap_stale_onboarding_items()
+
+        lost.refresh_from_db()
+        committed.refresh_from_db()
+        self.assertEqual(lost.status, OnboardingItem.Status.FAILED)
+        self.assertEqual(
+            (committed.status, committed.country_id), (OnboardingItem.Status.DONE, country.pk)
+        )
+        start_onboarding.assert_called_once_with(
+            [item.id for item in self.items[2:]], concurrency=2
+        )
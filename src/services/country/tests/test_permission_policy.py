@@ -0,0 +1,94 @@
+import pytest
+from rest_framework.permissions import AllowAny, DjangoObjectPermissions
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from helpers.permissions.model import ModelPermissions
+from services.country.views.country import CountryViewSet
+from services.user.views.user import UserViewSet
+
+pytestmark = pytest.mark.unit
+
+
+class ViewPermissionUser:
+    """
+    Authenticated user with the view permission of the countries only.
+    """
+
+    is_active = True
+    is_authenticated = True
+
+    @staticmethod
+    def has_perms(perms) -> bool:
+        return set(perms) <= {"country.view_country"}
+
+
+def get_permission_classes(view_class, action: str, method: str) -> list:
+    request = Request(APIRequestFactory().generic(method, "/"))
+    view = view_class(action=action, format_kwarg=None, request=request)
+    # bind the handler like `ViewSetMixin.as_view` does
+    setattr(view, method, getattr(view, action))
+    return [type(permission) for permission in view.get_permissions()]
+
+
+@pytest.mark.parametrize(
+    "action, method",
+    [("create", "post"), ("retrieve", "get")],
+)
+def test_allow_any_actions(action, method):
+    assert get_permission_classes(CountryViewSet, action, method) == [AllowAny]
+
+
+@pytest.mark.parametrize(
+    "action, method",
+    [("list", "get"), ("update", "put"), ("destroy", "delete"), ("onboarding", "post")],
+)
+def test_other_actions_use_the_default_classes(action, method):
+    assert get_permission_classes(CountryViewSet, action, method) == [
+        ModelPermissions,
+        DjangoObjectPermissions,
+    ]
+
+
+def test_permission_instances_are_compiled_once():
+    request = Request(APIRequestFactory().post("/"))
+    first = CountryViewSet(action="create", request=request)
+    first.post = first.create
+    second = CountryViewSet(action="create", request=request)
+    second.post = second.create
+
+    assert first.get_permissions() is second.get_permissions()
+
+
+def test_route_permission_classes_are_not_shared():
+    # `reset_password` is routed with `permission_classes=[]`
+    request = Request(APIRequestFactory().options("/"))
+    reset_password = UserViewSet(
+        action="metadata", request=request, permission_classes=[]
+    )
+    default = UserViewSet(action="metadata", request=request)
+
+    assert reset_password.get_permissions() == ()
+    assert [type(permission) for permission in default.get_permissions()] == [
+        ModelPermissions,
+        DjangoObjectPermissions,
+    ]
+
+
+def test_options_needs_the_view_permission():
+    request = APIRequestFactory().options("/countries/")
+
+    response = CountryViewSet.as_view({"get": "list", "post": "create"})(request)
+
+    assert response.status_code == 401
+
+
+def test_options_lists_the_methods_allowed_by_their_action():
+    request = APIRequestFactory().options("/countries/")
+    force_authenticate(request, user=ViewPermissionUser())
+
+    response = CountryViewSet.as_view({"get": "list", "post": "create"})(request)
+
+    assert response.status_code == 200
+    # `create` allows anyone, although the user can not add countries
+    assert "POST" in response.data["actions"]
@@ -0,0 +1,55 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from services.country.models import Country
+from services.country.utils import template
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+
+# the schemas are created in the transaction of the test, and rolled back
+@override_settings(TENANT_TEMPLATE_SCHEMA="test_template")
+class TemplateSchemaTests(TestCase):
+    def count_permissions(self, schema_name: str) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{schema_name}".auth_permission')
+            return cursor.fetchone()[0]
+
+    def test_missing_template_misses_all_the_migrations(self):
+        self.assertFalse(template.is_template_current())
+        self.assertEqual(
+            template.get_missing_migrations(), set(template.get_disk_migrations())
+        )
+
+    def test_clone_of_the_refreshed_template(self):
+        template.refresh_template(verbosity=0)
+        self.assertTrue(template.is_template_current())
+
+        template.clone_template("test_clone")
+
+        self.assertEqual(template.get_missing_migrations("test_clone"), set())
+        self.assertEqual(
+            self.count_permissions("test_clone"), self.count_permissions("test_template")
+        )
+        self.assertGreater(self.count_permissions("test_clone"), 0)
+
+    def test_country_is_cloned_from_the_current_template(self):
+        template.refresh_template(verbosity=0)
+
+        with mock.patch.object(
+            template, "clone_template", wraps=template.clone_template
+        ) as clone_template:
+            Country(name="cloned", schema_name="cloned").save(verbosity=0)
+
+        clone_template.assert_called_once_with("cloned")
+        self.assertEqual(template.get_missing_migrations("cloned"), set())
+
+    def test_country_is_migrated_without_template(self):
+        with mock.patch.object(template, "clone_template") as clone_template:
+            Country(name="migrated", schema_name="migrated").save(verbosity=0)
+
+        clone_template.assert_not_called()
+        self.assertEqual(template.get_missing_migrations("migrated"), set())
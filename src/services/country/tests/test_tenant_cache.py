@@ -0,0 +1,167 @@
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+
+from services.country.middleware.tenant import CachedTenantMiddleware
+from services.country.models import Country, Domain
+from services.country.utils.tenant_cache import tenant_cache
+from services.mailer.utils.security import get_client_url
+
+LOCAL_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "shared")
+}
+
+
+@pytest.mark.integration
+@pytest.mark.django_signals
+@override_settings(CACHES=LOCAL_CACHES)
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        self.bus = self.enterContext(mock.patch.object(tenant_cache, "bus"))
+        self.addCleanup(tenant_cache.local.clear)
+        self.addCleanup(tenant_cache.shared.clear)
+        # the countries are not migrated, no schema is needed here
+        (self.country,) = Country.objects.bulk_create(
+            [Country(name="first", schema_name="first")]
+        )
+        self.domain = Domain.objects.create(
+            domain="first.test.com", tenant=self.country, is_primary=True
+        )
+
+    def get(self, hostname: str = "first.test.com") -> Country:
+        return tenant_cache.get(Domain, hostname)
+
+    def assertCached(self, hostname: str, cached: bool = True):
+        key = tenant_cache.make_key(hostname)
+        self.assertEqual(tenant_cache.local.get(key) is not None, cached)
+        self.assertEqual(tenant_cache.shared.get(key) is not None, cached)
+
+    def test_get_caches_the_tenant_in_both_tiers(self):
+        self.assertEqual(self.get(), self.country)
+
+        self.assertCached("first.test.com")
+        with self.assertNumQueries(0):
+            tenant = self.get()
+        self.assertEqual((tenant.pk, tenant.schema_name), (self.country.pk, "first"))
+
+    def test_shared_tier_is_used_by_the_other_processes(self):
+        self.get()
+        tenant_cache.local.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), self.country)
+
+    def test_unknown_hostname_is_cached_until_a_domain_is_created(self):
+        with self.assertRaises(Domain.DoesNotExist):
+            self.get("other.test.com")
+        with self.assertNumQueries(0), self.assertRaises(Domain.DoesNotExist):
+            self.get("other.test.com")
+
+        Domain.objects.create(domain="other.test.com", tenant=self.country, is_primary=False)
+
+        self.assertEqual(self.get("other.test.com"), self.country)
+
+    def test_renamed_domain_evicts_both_hostnames(self):
+        self.get()
+
+        self.domain.domain = "renamed.test.com"
+        self.domain.save()
+
+        self.assertCached("first.test.com", False)
+        with self.assertRaises(Domain.DoesNotExist):
+            self.get()
+        self.assertEqual(self.get("renamed.test.com"), self.country)
+
+    def test_deleted_domain_is_evicted(self):
+        self.get()
+
+        self.domain.delete()
+
+        with self.assertRaises(Domain.DoesNotExist):
+            self.get()
+
+    def test_saved_country_evicts_its_hostnames(self):
+        self.get()
+
+        self.country.name = "renamed"
+        self.country.save()
+
+        self.assertCached("first.test.com", False)
+        self.assertEqual(self.get().name, "renamed")
+
+    def test_invalidation_is_published_and_repeated_on_commit(self):
+        self.get()
+        self.bus.publish.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.domain.save()
+            # read by a concurrent request before the commit
+            self.get()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertCached("first.test.com", False)
+        self.bus.publish.assert_called_with(
+            {"hostnames": ["first.test.com"], "countries": [str(self.country.pk)]}
+        )
+        self.assertEqual(self.bus.publish.call_count, 2)
+
+    def test_messages_of_the_other_processes_evict_the_local_tier(self):
+        self.get()
+        tenant_cache.local.set("other", "value")
+
+        tenant_cache.handle_message({"hostnames": ["first.test.com"]})
+
+        self.assertIsNone(tenant_cache.local.get(tenant_cache.make_key("first.test.com")))
+        self.assertEqual(tenant_cache.local.get("other"), "value")
+        tenant_cache.handle_message({"reset": True})
+        self.assertIsNone(tenant_cache.local.get("other"))
+
+    def test_middleware_resolves_the_tenant_from_the_cache(self):
+        middleware = CachedTenantMiddleware(get_response=mock.Mock())
+        self.get()
+
+        with self.assertNumQueries(0):
+            tenant = middleware.get_tenant(Domain, "first.test.com")
+
+        self.assertEqual(tenant, self.country)
+
+
+@pytest.mark.integration
+@pytest.mark.django_signals
+@override_settings(CACHES=LOCAL_CACHES, CLIENT_URL="https://app.test.com/login")
+class PrimaryDomainCacheTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(tenant_cache, "bus"))
+        self.addCleanup(tenant_cache.local.clear)
+        self.addCleanup(tenant_cache.shared.clear)
+        (self.country,) = Country.objects.bulk_create(
+            [Country(name="first", schema_name="first")]
+        )
+
+    def test_client_url_has_the_subdomain_of_the_primary_domain(self):
+        Domain.objects.create(domain="first.test.com", tenant=self.country, is_primary=True)
+        Domain.objects.create(domain="alias.test.com", tenant=self.country, is_primary=False)
+
+        self.assertEqual(get_client_url(self.country.pk), "https://first.app.test.com/login")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_client_url(self.country.pk), "https://first.app.test.com/login")
+
+    def test_country_without_domain_uses_the_client_url(self):
+        self.assertEqual(get_client_url(self.country.pk), "https://app.test.com/login")
+        with self.assertNumQueries(0):
+            get_client_url(self.country.pk)
+
+        Domain.objects.create(domain="first.test.com", tenant=self.country)
+
+        self.assertEqual(get_client_url(self.country.pk), "https://first.app.test.com/login")
+
+    def test_renamed_primary_domain_is_evicted(self):
+        domain = Domain.objects.create(domain="first.test.com", tenant=self.country)
+        get_client_url(self.country.pk)
+
+        domain.domain = "renamed.test.com"
+        domain.save()
+
+        self.assertEqual(get_client_url(self.country.pk), "https://renamed.app.test.com/login")
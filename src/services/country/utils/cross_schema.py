@@ -0,0 +1,147 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the helpers running a queryset of a tenant app model
+over many country schemas in a single statement, instead of
+switching the schema and querying every country one after another.
+
+    >>> queryset = User.objects.values("is_active", "is_verified").annotate(count=Count("id"))
+    >>> for row in iterate_cross_schema(queryset):
+    ...     row  # {"schema_name": "uz", "is_active": True, "is_verified": False, "count": 12}
+"""
+
+import copy
+import functools
+from typing import Iterable, Iterator, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django_tenants.postgresql_backend.base import _check_schema_name
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from services.country.models import Country
+
+SCHEMA_NAME_COLUMN = "schema_name"
+
+
+@functools.lru_cache(maxsize=None)
+def get_tenant_tables() -> frozenset:
+    """
+    Return the tables which only exist in the country schemas
+    (models of the TENANT_APPS which are not SHARED_APPS, m2m tables included).
+    The other tables are left unqualified and resolved in the public schema.
+    """
+    tenant_apps = set(settings.TENANT_APPS) - set(settings.SHARED_APPS)
+    return frozenset(
+        model._meta.db_table  # pylint: disable=protected-access
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.app_config.name in tenant_apps  # pylint: disable=protected-access
+    )
+
+
+def qualify_query(query, schema_name: str, tables: frozenset):
+    """
+    Return a copy of the query reading the given tables in the schema.
+    The tables of the FROM / JOIN clauses are renamed to `"<schema>"."<table>"`
+    (Django does not quote a name which is already quoted), their aliases
+    are kept, so the columns still refer to them.
+    The subqueries are not qualified: a tenant table of a subquery is resolved
+    in the public schema, where it does not exist, and the query fails.
+    """
+    _check_schema_name(schema_name)
+    # any character is valid in a schema name, the quotes are escaped
+    quoted_schema_name = schema_name.replace('"', '""')
+    query = query.clone()
+    for alias, table in list(query.alias_map.items()):
+        if table.table_name in tables:
+            table = copy.copy(table)
+            table.table_name = f'"{quoted_schema_name}"."{table.table_name}"'
+            query.alias_map[alias] = table
+    return query
+
+
+def get_country_schemas() -> list[str]:
+    """
+    Return the schema names of all the countries.
+    """
+    return list(
+        Country.objects.exclude(schema_name=get_public_schema_name())
+        .order_by("schema_name")
+        .values_list("schema_name", flat=True)
+    )
+
+
+def compile_cross_schema(
+    queryset,
+    schemas: Optional[Iterable[str]] = None,
+    tables: Optional[Iterable[str]] = None,
+) -> tuple[str, list]:
+    """
+    Compile the queryset into a single `UNION ALL` statement over the schemas.
+    Every row is tagged with its schema name, in the `schema_name` column.
+    Use querysets returning plain values (`values`, `values_list`, `annotate`),
+    the rows are not turned into model instances.
+
+    :param queryset: Queryset of a tenant app model
+    :param schemas: Names of the schemas, defaults to all the countries
+    :param tables: Tables of the queryset read in each schema,
+        defaults to all the tenant tables (`get_tenant_tables`)
+    :return: the sql and its parameters
+    """
+    schemas = list(get_country_schemas() if schemas is None else schemas)
+    if not schemas:
+        raise ValueError("No schema to query")
+    tables = get_tenant_tables() if tables is None else frozenset(tables)
+
+    parts = []
+    all_params = []
+    for schema_name in schemas:
+        sql, params = qualify_query(queryset.query, schema_name, tables).sql_with_params()
+        parts.append(
+            f'SELECT %s AS "{SCHEMA_NAME_COLUMN}", "cross_schema".* '
+            f'FROM ({sql}) AS "cross_schema"'
+        )
+        all_params.append(schema_name)
+        all_params.extend(params)
+    return "\nUNION ALL\n".join(parts), all_params
+
+
+def iterate_cross_schema(
+    queryset,
+    schemas: Optional[Iterable[str]] = None,
+    chunk_size: int = 2000,
+    tables: Optional[Iterable[str]] = None,
+) -> Iterator[dict]:
+    """
+    Run the queryset over the schemas in a single statement and
+    stream the rows as dicts, using a server side cursor.
+    The rows of a schema are contiguous, but the schemas are not ordered.
+    The statement runs in the public schema, the schema of the caller
+    is restored before the rows are yielded.
+
+    :param queryset: Queryset of a tenant app model
+    :param schemas: Names of the schemas, defaults to all the countries
+    :param chunk_size: Number of rows fetched at a time
+    :param tables: Tables of the queryset read in each schema,
+        defaults to all the tenant tables
+    """
+    sql, params = compile_cross_schema(queryset, schemas, tables)
+    connection = connections[queryset.db]
+    # the shared tables are resolved in the public schema: the search path is
+    # set when the cursor is opened, the fetches of the server side cursor
+    # then read the result of the statement whatever the current schema is
+    with schema_context(get_public_schema_name()):
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(sql, params)
+        except Exception:
+            cursor.close()
+            raise
+    with cursor:
+        rows = cursor.fetchmany(chunk_size)
+        # the description of a server side cursor is only set by the first fetch
+        columns = [column[0] for column in cursor.description or ()]
+        while rows:
+            for row in rows:
+                yield dict(zip(columns, row))
+            rows = cursor.fetchmany(chunk_size)
@@ -0,0 +1,60 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the worker side of `migrate_schemas_parallel`:
+each process of the pool migrates one schema at a time
+on its own database connection.
+"""
+
+import io
+import os
+import time
+import traceback
+
+import django
+
+
+def init_worker():
+    """
+    Pool processes are spawned, so Django has to be set up again in each of them.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+def migrate_schema(schema_name: str, options: dict) -> dict:
+    """
+    Run the tenant migrations on the schema.
+    Never raises, the outcome is returned as a dict:
+    {"schema_name", "ok", "seconds", "pid", "output", "error"}
+
+    :param schema_name: Name of the schema to migrate
+    :param options: Extra options given to `migrate_schemas`
+    """
+    # imported here, the module is imported before `django.setup`
+    # pylint: disable=import-outside-toplevel
+    from django.core.management import call_command
+    from django.db import connections
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    result = {"schema_name": schema_name, "pid": os.getpid(), "error": None}
+    try:
+        call_command(
+            "migrate_schemas",
+            tenant=True,
+            schema_name=schema_name,
+            interactive=False,
+            stdout=output,
+            stderr=output,
+            **options,
+        )
+        result["ok"] = True
+    except Exception:  # pylint: disable=broad-except
+        result["ok"] = False
+        result["error"] = traceback.format_exc(limit=5)
+    finally:
+        # a failed migration may leave the connection in a broken state
+        connections.close_all()
+    result["seconds"] = time.perf_counter() - start
+    result["output"] = output.getvalue()
+    return result
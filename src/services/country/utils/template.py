@@ -0,0 +1,112 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the template schema the countries are cloned from.
+The template is a schema migrated like a country schema, but no country
+uses it. Cloning it copies the tables and the rows created by the
+migrations (e.g. the permissions) in a single statement, instead of
+running the whole migration history of the tenant apps.
+"""
+
+import functools
+import logging
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django_tenants.clone import CloneSchema
+from django_tenants.utils import get_tenant_database_alias, schema_exists
+
+logger = logging.getLogger(__name__)
+
+
+def get_template_schema_name() -> str:
+    return settings.TENANT_TEMPLATE_SCHEMA
+
+
+@functools.lru_cache(maxsize=None)
+def get_disk_migrations() -> frozenset:
+    """
+    Return the (app_label, name) of all the migrations on disk.
+    They do not change while the process runs, so they are loaded once.
+    """
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    return frozenset(loader.disk_migrations)
+
+
+def get_applied_migrations(schema_name: str) -> set:
+    """
+    Return the (app_label, name) of the migrations applied on the schema.
+    """
+    connection = connections[get_tenant_database_alias()]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass(%s)",
+            [f'"{schema_name}".django_migrations'],
+        )
+        if cursor.fetchone()[0] is None:
+            return set()
+        cursor.execute(f'SELECT app, name FROM "{schema_name}".django_migrations')
+        return set(cursor.fetchall())
+
+
+def get_missing_migrations(schema_name: str = None) -> set:
+    """
+    Return the migrations on disk which are not applied on the template.
+    """
+    schema_name = schema_name or get_template_schema_name()
+    if not schema_exists(schema_name):
+        return set(get_disk_migrations())
+    return set(get_disk_migrations()) - get_applied_migrations(schema_name)
+
+
+def is_template_current() -> bool:
+    """
+    The template can be cloned if all the migrations on disk are applied on it.
+    """
+    return not get_missing_migrations()
+
+
+def ensure_clone_function() -> None:
+    """
+    Create the `clone_schema` postgres function if it does not exist.
+    `CloneSchema` probes it with a cast which fails (and aborts the
+    current transaction) when the function is missing, while the
+    countries are created inside a transaction.
+    """
+    connection = connections[get_tenant_database_alias()]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regproc('clone_schema')")
+        exists = cursor.fetchone()[0] is not None
+    if not exists:
+        CloneSchema()._create_clone_schema_function()  # pylint: disable=protected-access
+
+
+def clone_template(schema_name: str) -> None:
+    """
+    Create the schema as a copy of the template, tables and rows included.
+    """
+    ensure_clone_function()
+    CloneSchema().clone_schema(get_template_schema_name(), schema_name)
+
+
+def refresh_template(verbosity: int = 1) -> None:
+    """
+    Create the template schema if it does not exist
+    and apply the missing migrations on it.
+    """
+    schema_name = get_template_schema_name()
+    connection = connections[get_tenant_database_alias()]
+    connection.set_schema_to_public()
+    if not schema_exists(schema_name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA "{schema_name}"')
+    call_command(
+        "migrate_schemas",
+        tenant=True,
+        schema_name=schema_name,
+        interactive=False,
+        verbosity=verbosity,
+    )
+    ensure_clone_function()
+    connection.set_schema_to_public()
@@ -0,0 +1,246 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the two-tier cache resolving a hostname to its tenant
+which is used by `CachedTenantMiddleware` to set the schema
+of a request without querying the `Domain` table.
+It also caches the primary domain of each country,
+which the security emails use to build their links.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, router, transaction
+from prometheus_client import Counter
+
+from helpers.cache.lru import LRUCache
+from helpers.cache.pubsub import InvalidationBus
+
+logger = logging.getLogger(__name__)
+
+# result is one of "local", "shared" or "database"
+TENANT_CACHE_REQUESTS = Counter(
+    "tenant_cache_requests",
+    "Lookups of the hostname to tenant cache.",
+    ["result"],
+)
+
+# Cached when no domain matches the hostname, so unknown hosts
+# (e.g. the public schema fallback) do not hit the database either.
+NOT_FOUND = False
+
+
+class TenantCache:
+    """
+    Two-tier cache of tenant snapshots keyed by hostname.
+    1. A per-process LRU cache, invalidated through redis pub/sub.
+    2. A shared (redis) cache.
+    A snapshot is a dict of the concrete field values of the country
+    and is turned back into a model instance using `Model.from_db`.
+    The primary domain of a country is cached the same way, by country id.
+    """
+
+    def __init__(
+        self,
+        local_maxsize: int,
+        local_ttl: float,
+        shared_ttl: int,
+        not_found_ttl: int,
+        cache_alias: str,
+        bus: InvalidationBus,
+        key_prefix: str = "tenant-domain",
+    ):
+        """
+        :param local_maxsize: Maximum number of hostnames kept per process
+        :param local_ttl: TTL of the per-process tier in seconds.
+            It bounds the staleness if an invalidation message is lost.
+        :param shared_ttl: TTL of the shared tier in seconds
+        :param not_found_ttl: TTL of the unknown hostnames in both tiers
+        :param cache_alias: Alias of the shared cache in `settings.CACHES`
+        :param bus: Bus broadcasting the invalidations to the other processes
+        :param key_prefix: Prefix of the cache keys
+        """
+        self.local = LRUCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.shared_ttl = shared_ttl
+        self.not_found_ttl = not_found_ttl
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.bus = bus
+        self.bus.add_handler(self.handle_message)
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Build the cache from `settings.TENANT_CACHE`.
+        """
+        config = getattr(settings, "TENANT_CACHE", {})
+        return cls(
+            local_maxsize=config.get("LOCAL_MAXSIZE", 1024),
+            local_ttl=config.get("LOCAL_TTL", 300),
+            shared_ttl=config.get("SHARED_TTL", 3600),
+            not_found_ttl=config.get("NOT_FOUND_TTL", 30),
+            cache_alias=config.get("CACHE_ALIAS", "default"),
+            bus=InvalidationBus(
+                redis_url=config.get("PUBSUB_URL"),
+                channel=config.get("PUBSUB_CHANNEL", "tenant-cache"),
+            ),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, hostname: str) -> str:
+        return f"{self.key_prefix}:{hostname}"
+
+    def make_primary_domain_key(self, country_id) -> str:
+        return f"{self.key_prefix}-primary:{country_id}"
+
+    @staticmethod
+    def snapshot_fields(tenant_model) -> list[str]:
+        # pylint: disable=protected-access
+        return [field.attname for field in tenant_model._meta.concrete_fields]
+
+    def get(self, domain_model, hostname: str):
+        """
+        Return the tenant of the hostname.
+        Raises `domain_model.DoesNotExist` if no domain matches it.
+
+        :param domain_model: Domain model class
+        :param hostname: Hostname of the request
+        """
+        self.bus.ensure_subscribed()
+        tenant_model = domain_model.tenant.field.related_model
+        key = self.make_key(hostname)
+
+        snapshot = self.local.get(key)
+        if snapshot is not None:
+            TENANT_CACHE_REQUESTS.labels(result="local").inc()
+        else:
+            snapshot = self._shared_get(key)
+            if snapshot is not None:
+                TENANT_CACHE_REQUESTS.labels(result="shared").inc()
+            else:
+                TENANT_CACHE_REQUESTS.labels(result="database").inc()
+                snapshot = self.load(domain_model, tenant_model, hostname)
+                self._shared_set(key, snapshot)
+            self.local.set(key, snapshot, ttl=None if snapshot else self.not_found_ttl)
+
+        if snapshot is NOT_FOUND:
+            raise domain_model.DoesNotExist(f"No domain matches {hostname}")
+        return self.build(tenant_model, snapshot)
+
+    def get_primary_domain(self, domain_model, country_id):
+        """
+        Return the primary domain name of the country
+        (any of its domains if none is primary), None if it has no domain.
+
+        :param domain_model: Domain model class
+        :param country_id: Primary key of the country
+        """
+        self.bus.ensure_subscribed()
+        key = self.make_primary_domain_key(country_id)
+        domain = self.local.get(key)
+        if domain is None:
+            domain = self._shared_get(key)
+            if domain is None:
+                domain = (
+                    domain_model.objects.filter(tenant_id=country_id)
+                    .order_by("-is_primary", "pk")
+                    .values_list("domain", flat=True)
+                    .first()
+                ) or NOT_FOUND
+                self._shared_set(key, domain)
+            self.local.set(key, domain, ttl=None if domain else self.not_found_ttl)
+        return domain or None
+
+    def load(self, domain_model, tenant_model, hostname: str):
+        """
+        Load the snapshot of the tenant of the hostname from the database.
+        Returns `NOT_FOUND` if no domain matches the hostname.
+        """
+        fields = self.snapshot_fields(tenant_model)
+        values = (
+            domain_model.objects.filter(domain=hostname)
+            .values_list(*(f"tenant__{field}" for field in fields))
+            .first()
+        )
+        if values is None:
+            return NOT_FOUND
+        return dict(zip(fields, values))
+
+    @staticmethod
+    def build(tenant_model, snapshot: dict):
+        """
+        Turn the snapshot into a model instance.
+        A new instance is built on every call, because the middleware
+        sets request specific attributes (`domain_url`) on it.
+        """
+        return tenant_model.from_db(
+            router.db_for_read(tenant_model),
+            list(snapshot.keys()),
+            list(snapshot.values()),
+        )
+
+    def invalidate(self, hostnames=(), country_ids=()) -> None:
+        """
+        Drop the hostnames and the primary domains of the countries
+        from the shared tier and from the per-process tier of every process.
+        If called inside a transaction, they are dropped
+        again on commit, so a concurrent request can not
+        re-populate the cache with the pre-commit state.
+        """
+        message = {
+            "hostnames": sorted({hostname for hostname in hostnames if hostname}),
+            "countries": sorted({str(country_id) for country_id in country_ids if country_id}),
+        }
+        if not message["hostnames"] and not message["countries"]:
+            return
+        self._evict(message)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._evict(message))
+
+    def handle_message(self, message: dict) -> None:
+        """
+        Apply an invalidation message received from the bus.
+        """
+        if message.get("reset"):
+            self.local.clear()
+            return
+        for key in self._message_keys(message):
+            self.local.delete(key)
+
+    def _message_keys(self, message: dict) -> list[str]:
+        return [self.make_key(hostname) for hostname in message.get("hostnames", ())] + [
+            self.make_primary_domain_key(country_id) for country_id in message.get("countries", ())
+        ]
+
+    def _evict(self, message: dict) -> None:
+        keys = self._message_keys(message)
+        for key in keys:
+            self.local.delete(key)
+        try:
+            self.shared.delete_many(keys)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not evict %s from the shared cache", keys, exc_info=True)
+        self.bus.publish(message)
+
+    def _shared_get(self, key: str):
+        # The shared tier is an optimization only,
+        # an unavailable cache must not break the tenant resolution.
+        try:
+            return self.shared.get(key)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not read %s from the shared cache", key, exc_info=True)
+            return None
+
+    def _shared_set(self, key: str, snapshot) -> None:
+        timeout = self.shared_ttl if snapshot else self.not_found_ttl
+        try:
+            self.shared.set(key, snapshot, timeout=timeout)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not write %s to the shared cache", key, exc_info=True)
+
+
+tenant_cache = TenantCache.from_settings()
@@ -2,11 +2,14 @@
 This module contains the viewsets for the Country model.
 """
 
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, mixins
+from rest_framework import status, viewsets, mixins
+from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, DjangoObjectPermissions
+from rest_framework.response import Response
 
 from helpers.auth.custom_jwt import JWTAuth
 from helpers.mixins.permissions.policy import (
@@ -17,9 +20,14 @@ from services.country.filters.country import (
     CountryFilterSet,
 )
 from services.country.models.country import Country
+from services.country.models.onboarding import OnboardingJob
 from services.country.serializers.country import (
     CountrySerializer,
 )
+from services.country.serializers.onboarding import (
+    CountryOnboardingSerializer,
+    OnboardingJobSerializer,
+)
 
 
 class CountryViewSet(
@@ -52,3 +60,41 @@ class CountryViewSet(
     filterset_class = CountryFilterSet
     filter_backends = (SearchFilter, DjangoFilterBackend, OrderingFilter)
     search_fields = ("domains__name", "name")
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        serializer_class=CountryOnboardingSerializer,
+        url_path="onboarding",
+        url_name="onboarding",
+    )
+    def onboarding(self, request, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Onboard a list of countries in the background.
+        The following steps are performed:
+        1. Validate all the countries at once
+        2. Create the onboarding job
+        3. Enqueue the provisioning of the countries (background tasks)
+        4. Return the job, to be polled on `onboarding/<job id>/`
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        return Response(
+            data=OnboardingJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        serializer_class=OnboardingJobSerializer,
+        url_path=r"onboarding/(?P<job_id>[0-9a-f-]{36})",
+        url_name="onboarding-status",
+    )
+    def onboarding_status(self, request, job_id=None, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Return the status of an onboarding job and of each of its countries.
+        """
+        job = get_object_or_404(OnboardingJob.objects.prefetch_related("items"), pk=job_id)
+        return Response(data=self.get_serializer(job).data, status=status.HTTP_200_OK)
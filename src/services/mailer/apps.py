@@ -6,4 +6,7 @@ class MailerConfig(AppConfig):
     name = "services.mailer"
 
     def ready(self):
-        from services.mailer.signals import security  # noqa: 401
+        from services.mailer.signals import partitions, security  # noqa: 401
+        from services.mailer.utils.metrics import register_email_queue_collector
+
+        register_email_queue_collector()
@@ -0,0 +1,18 @@
+from django_filters import FilterSet
+
+from services.mailer.models import Mail
+
+
+class MailFilterSet(FilterSet):
+    """
+    FilterSet for Mail model.
+    """
+
+    class Meta:
+        model = Mail
+        fields = {
+            "subject": ["exact"],
+            "sender": ["exact"],
+            "recipients": ["exact"],
+            "created_at": ["lt", "lte", "gt", "gte"],
+        }
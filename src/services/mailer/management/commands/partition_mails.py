@@ -0,0 +1,72 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the command partitioning the mail log of the countries by month.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from services.country.utils.cross_schema import get_country_schemas
+from services.mailer.utils.partitions import check_archive_dir, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Partition the mail table of the countries by month of creation, "
+        "create the partitions of the next months and archive the old ones. "
+        "It also runs every day as the `maintain_mail_partitions` task."
+    )
+
+    def add_arguments(self, parser):
+        config = settings.MAIL_PARTITIONS
+        parser.add_argument(
+            "--schema",
+            dest="schemas",
+            action="append",
+            help="Only partition this schema, can be repeated",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=config["MONTHS_AHEAD"],
+            help=f"Months to create the partitions of in advance (default: {config['MONTHS_AHEAD']})",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=config["RETENTION_MONTHS"],
+            help="Archive the partitions older than this number of months "
+            f"(default: {config['RETENTION_MONTHS']})",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Do not archive any partition",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=config["ARCHIVE_DIR"],
+            help="Existing, persistent directory of the archived partitions "
+            "(gzip compressed csv), defaults to MAIL_ARCHIVE_DIR",
+        )
+
+    def handle(self, *args, **options):
+        if not options["no_archive"]:
+            try:
+                check_archive_dir(options["archive_dir"])
+            except ImproperlyConfigured as error:
+                raise CommandError(f"{error}, set it or pass --no-archive") from error
+        for schema_name in options["schemas"] or get_country_schemas():
+            report = maintain_partitions(
+                schema_name,
+                months_ahead=options["months_ahead"],
+                retention_months=None if options["no_archive"] else options["retention_months"],
+                archive_dir=options["archive_dir"],
+            )
+            self.stdout.write(
+                f"{schema_name}: {'converted, ' if report['converted'] else ''}"
+                f"{report['created']} partitions created, {len(report['archived'])} archived"
+            )
+            for path in report["archived"]:
+                self.stdout.write(f"  {path}")
@@ -1 +1 @@
-from .mail import Mail
+from .mail import Mail, MailRecipient
@@ -8,14 +8,36 @@ class Mail(models.Model):
 
     sender = models.CharField(max_length=150)
     subject = models.CharField(max_length=150)
-    recipients = models.ManyToManyField("user.User", related_name="mails", blank=True)
+    recipients = models.ManyToManyField(
+        "user.User", through="MailRecipient", related_name="mails", blank=True
+    )
     # TODO: should be encrypted
     message = models.TextField()
     created_at = models.DateTimeField(auto_now=False, auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, auto_now_add=False)
 
+    class Meta:
+        # the mail log is read newest first, by cursor (`MailViewSet`)
+        indexes = [models.Index(fields=["-created_at", "-id"], name="mailer_mail_created_idx")]
+
     def __str__(self):
         """
         String representation of the dataset
         """
         return str(self.subject)
+
+
+class MailRecipient(models.Model):
+    """
+    Recipient of a mail (the m2m table of `Mail.recipients`).
+    The mail table may be partitioned by month (`partition_mails`),
+    a foreign key can not reference it then.
+    """
+
+    mail = models.ForeignKey(Mail, on_delete=models.CASCADE, db_constraint=False)
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE)
+
+    class Meta:
+        # the name of the table Django creates for an implicit m2m
+        db_table = "mailer_mail_recipients"
+        unique_together = ("mail", "user")
@@ -0,0 +1,36 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the logic for partitioning the mail log of the new countries.
+"""
+
+import logging
+
+from django.conf import settings
+from django.dispatch import receiver
+from django_tenants.models import TenantMixin
+from django_tenants.signals import post_schema_sync
+
+from services.mailer.utils.partitions import maintain_partitions
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_schema_sync, sender=TenantMixin)
+def partition_country_mails(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        tenant: TenantMixin,
+        **kwargs
+):
+    """
+    This signal is triggered once the schema of a new country is created,
+    migrated or cloned from the template (whose mail table is not partitioned).
+    The mail table is partitioned right away instead of on the next
+    `maintain_mail_partitions`, which retries it if this fails.
+    """
+    try:
+        maintain_partitions(
+            tenant.schema_name,
+            months_ahead=settings.MAIL_PARTITIONS["MONTHS_AHEAD"],
+        )
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not partition the mails of %s", tenant.schema_name)
@@ -1,4 +1,5 @@
 from helpers.auth.token import PasswordResetToken
+from helpers.auth.token.base import tokens_generated
 from helpers.auth.token.password_reset import password_reset_token_generated
 from helpers.auth.token.verification import (
     VerificationToken,
@@ -6,18 +7,49 @@ from helpers.auth.token.verification import (
 )
 from helpers.auth.token.activation import ActivationToken, activation_token_generated
 
-from services.mailer.tasks.security import send_email
-from services.mailer.utils.security import make_security_email_payload
+from services.mailer.tasks.security import queue_security_emails
+from services.mailer.utils.security import make_security_email_message
+from services.outbox.utils.outbox import publish, register_handler
+
+SECURITY_EMAIL_TOPIC = "security_email"
 
 
 def send_security_email(sender, token, **kwargs):
     """
     This signal is triggered when a verification token is generated.
-    It sends the verification token to the user.
+    It writes the email of the token to the outbox, in the current
+    transaction: it is only sent if the transaction commits.
+    The email is built by the worker, so no query but the outbox
+    insert runs here (e.g. inside the `post_save` of a new user).
+    """
+    publish(SECURITY_EMAIL_TOPIC, [make_security_email_message(token)])
+
+
+def send_security_emails(sender, tokens, **kwargs):
+    """
+    This signal is triggered when a batch of tokens is generated.
+    It writes all the emails to the outbox at once,
+    they are sent with the lowest priority.
     """
-    send_email.delay(**make_security_email_payload(token))
+    publish(
+        SECURITY_EMAIL_TOPIC,
+        [make_security_email_message(token, bulk=True) for token in tokens],
+    )
+
+
+@register_handler(SECURITY_EMAIL_TOPIC)
+def relay_security_emails(messages):
+    """
+    Outbox handler of the security emails.
+    It queues the committed emails for the next batch.
+    """
+    queue_security_emails(messages)
 
 
 activation_token_generated.connect(send_security_email, sender=ActivationToken)
 verification_token_generated.connect(send_security_email, sender=VerificationToken)
 password_reset_token_generated.connect(send_security_email, sender=PasswordResetToken)
+
+tokens_generated.connect(send_security_emails, sender=ActivationToken)
+tokens_generated.connect(send_security_emails, sender=VerificationToken)
+tokens_generated.connect(send_security_emails, sender=PasswordResetToken)
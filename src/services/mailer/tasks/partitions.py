@@ -0,0 +1,43 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the periodic task maintaining the monthly partitions
+of the mail log of every country.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from core.celery import app
+from services.country.utils.cross_schema import get_country_schemas
+from services.mailer.utils.partitions import check_archive_dir, maintain_partitions
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(ignore_result=True)
+def maintain_mail_partitions():
+    """
+    Partition the mail table of the new countries, create the partitions
+    of the next months and archive the old ones (`MAIL_PARTITIONS`).
+    A failing country is logged and does not stop the others.
+    Without a usable `MAIL_ARCHIVE_DIR`, nothing is archived (nor dropped).
+    """
+    config = settings.MAIL_PARTITIONS
+    retention_months = config["RETENTION_MONTHS"]
+    try:
+        check_archive_dir(config["ARCHIVE_DIR"])
+    except ImproperlyConfigured:
+        logger.exception("The old mail partitions are not archived")
+        retention_months = None
+    for schema_name in get_country_schemas():
+        try:
+            maintain_partitions(
+                schema_name,
+                months_ahead=config["MONTHS_AHEAD"],
+                retention_months=retention_months,
+                archive_dir=config["ARCHIVE_DIR"],
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not maintain the mail partitions of %s", schema_name)
@@ -1,15 +1,58 @@
+import logging
+import smtplib
+import time
+from collections import defaultdict
+
+import redis
+from celery.signals import worker_init, worker_process_init
+from celery.utils.time import get_exponential_backoff_interval
+from django_tenants.utils import schema_context
+
 from core.celery import app
 
-from helpers.email.send import send_templated_email
+from helpers.email.pool import is_transient_smtp_error
+from helpers.email.send import send_templated_email, send_templated_emails
+from helpers.email.templates import template_cache
+from services.mailer.utils.batch import (
+    SECURITY_EMAIL_BATCH_SIZE,
+    SECURITY_EMAIL_FLUSH_LATENCY,
+    SECURITY_EMAIL_RETRIES,
+    security_email_batches,
+)
+from services.mailer.utils.log import try_log_mails
+from services.mailer.utils.queues import BULK_LANE, get_security_email_lane
+from services.mailer.utils.security import (
+    get_security_template_paths,
+    group_security_email_messages,
+    make_security_email_payloads,
+    make_security_mail_log,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@worker_init.connect
+@worker_process_init.connect
+def warm_security_templates(**kwargs):
+    """
+    Compile the security email templates when the worker starts
+    (the prefork children inherit them, `worker_process_init` covers
+    the pools which do not fork), so the first emails do not load them.
+    """
+    count = template_cache.warm(get_security_template_paths())
+    logger.info("Compiled %s security email templates", count)
 
 
-@app.task
+@app.task(bind=True, max_retries=5)
 def send_email(
+    self,
     data: dict,
     html_template_path,
     text_template_path,
     subject,
     recipient,
+    schema=None,
+    lane=BULK_LANE,
 ):
     """
     Send email to the given email address
@@ -21,12 +64,123 @@ def send_email(
     :param text_template_path: path to text template
     :param subject: email subject
     :param recipient: email address of recipient
+    :param schema: schema to log the security email in, once sent
+    :param lane: lane of the security email, it routes the task to its queue
     Make sure that the data is convertable to dict.
+    Only the transient SMTP errors are retried (with an exponential backoff),
+    a permanent error (e.g. a refused recipient) fails the task right away.
+    """
+    payload = {
+        "data": data,
+        "html_template_path": html_template_path,
+        "text_template_path": text_template_path,
+        "subject": subject,
+        "recipient": recipient,
+    }
+    try:
+        send_templated_email(**payload)
+    except (smtplib.SMTPException, OSError) as error:
+        if not is_transient_smtp_error(error):
+            raise
+        raise self.retry(
+            exc=error,
+            countdown=get_exponential_backoff_interval(
+                factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+            ),
+        )
+    if schema is not None:
+        with schema_context(schema):
+            try_log_mails([make_security_mail_log(payload)])
+
+
+def queue_security_emails(messages: list[dict]) -> None:
+    """
+    Add the email messages to the pending batch of their lane and schedule
+    its flush: right away if the batch is full, after the batch delay otherwise.
+    Without redis, the messages of a lane are sent by a single task.
+
+    :param messages: messages built by `make_security_email_message`
+    """
+    by_lane = defaultdict(list)
+    for message in messages:
+        by_lane[get_security_email_lane(message)].append(message)
+
+    for lane, lane_messages in by_lane.items():
+        batch = security_email_batches[lane]
+        try:
+            length, timer_started = batch.push(lane_messages)
+        except redis.RedisError:
+            logger.warning("Could not queue %s security emails", len(lane_messages), exc_info=True)
+            send_security_email_messages.apply_async(kwargs={"messages": lane_messages, "lane": lane})
+            continue
+        if length >= batch.max_messages:
+            flush_security_emails.apply_async(kwargs={"lane": lane})
+        elif timer_started:
+            flush_security_emails.apply_async(kwargs={"lane": lane}, countdown=batch.max_delay)
+
+
+@app.task(ignore_result=True)
+def flush_security_emails(lane: str = BULK_LANE):
+    """
+    Send a batch of the pending security emails of the lane over one SMTP connection.
+    The batch is only removed from redis once sent: if the task dies before,
+    `requeue_stale_security_emails` queues it again.
+    """
+    batch = security_email_batches[lane]
+    claim, messages, queued_at, remaining = batch.pop()
+    # the rest of the list is flushed by another task (in parallel if it is full)
+    if remaining >= batch.max_messages:
+        flush_security_emails.apply_async(kwargs={"lane": lane})
+    elif remaining:
+        flush_security_emails.apply_async(kwargs={"lane": lane}, countdown=batch.max_delay)
+    if claim is None:
+        return
+
+    SECURITY_EMAIL_BATCH_SIZE.labels(lane=lane).observe(len(messages))
+    SECURITY_EMAIL_FLUSH_LATENCY.labels(lane=lane).observe(max(time.time() - queued_at, 0))
+    send_security_email_messages(messages, lane=lane)
+    batch.ack(claim)
+
+
+@app.task(ignore_result=True)
+def requeue_stale_security_emails(lane: str = BULK_LANE):
+    """
+    Queue again the security emails of the lane taken by a flush which never
+    finished (`EmailBatch.claim_timeout`), and flush them. Run by celery beat.
+    """
+    batch = security_email_batches[lane]
+    requeued = batch.requeue_stale()
+    if requeued:
+        logger.warning("Queued again %s security emails of a lost %s flush", requeued, lane)
+        flush_security_emails.apply_async(kwargs={"lane": lane})
+
+
+@app.task(ignore_result=True)
+def send_security_email_messages(messages: list[dict], lane: str = BULK_LANE):
+    """
+    Build the emails of the messages (recipient, client url)
+    and send them over one SMTP connection.
+    The sent emails are logged (`Mail`) in the schema of their country,
+    the emails which failed with a transient error are retried individually
+    by `send_email`, the others are dropped.
+
+    :param messages: messages built by `make_security_email_message`
+    :param lane: lane of the messages, it routes the task to its queue
     """
-    send_templated_email(
-        data=data,
-        html_template_path=html_template_path,
-        text_template_path=text_template_path,
-        subject=subject,
-        recipient=recipient,
-    )
+    for schema_name, schema_messages in group_security_email_messages(messages).items():
+        with schema_context(schema_name):
+            payloads = make_security_email_payloads(schema_messages)
+            errors = send_templated_emails(payloads)
+            sent = [payload for payload, error in zip(payloads, errors) if error is None]
+            try_log_mails([make_security_mail_log(payload) for payload in sent])
+        for payload, error in zip(payloads, errors):
+            if error is None:
+                continue
+            if not is_transient_smtp_error(error):
+                logger.error("Could not send a security email to %s: %r", payload["recipient"], error)
+                continue
+            logger.warning("Could not send a security email to %s: %r", payload["recipient"], error)
+            SECURITY_EMAIL_RETRIES.labels(lane=lane).inc()
+            send_email.apply_async(
+                kwargs={**payload, "schema": schema_name, "lane": lane}, countdown=1
+            )
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import datetime
+import gzip
+import hashlib
+import os
+import smtplib
+import tempfile
+from unittest import mock
+from uuid import uuid4
 
-# Create your tests here.
+import pytest
+import redis
+from celery.exceptions import Retry
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from django_tenants.models import TenantMixin
+from django_tenants.signals import post_schema_sync
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.celery import app
+from helpers.auth.token import BaseToken
+from services.country.models import Country
+from services.country.utils.tenant_cache import tenant_cache
+from services.mailer.models import Mail, MailRecipient
+from services.mailer.signals.security import SECURITY_EMAIL_TOPIC
+from services.mailer.tasks import security
+from services.mailer.utils import partitions
+from services.mailer.utils.batch import EmailBatch
+from services.mailer.utils.log import log_mails
+from services.mailer.utils.queues import (
+    BULK_LANE,
+    get_security_email_lane,
+    route_email_task,
+)
+from services.mailer.utils.security import (
+    get_subdomain,
+    make_security_email_message,
+    make_security_email_payloads,
+)
+from services.mailer.views.mail import MailViewSet
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase
+
+LOCAL_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "shared")
+}
+
+
+@pytest.fixture
+def batch():
+    """
+    Batch of a key of its own on the redis server of the settings.
+    """
+    batch = EmailBatch(
+        redis_url=settings.SECURITY_EMAIL_BATCH["REDIS_URL"],
+        key=f"test-security-emails:{uuid4().hex}",
+        max_messages=3,
+        max_delay=60,
+        claim_timeout=60,
+    )
+    try:
+        batch.client.ping()
+    except redis.RedisError:
+        pytest.skip("redis is not available")
+    yield batch
+    keys = batch.client.keys(f"{batch.key}*")
+    if keys:
+        batch.client.delete(*keys)
+
+
+@pytest.mark.integration
+class TestEmailBatch:
+    def test_push_starts_the_timer_once(self, batch):
+        assert batch.push([{"index": 0}, {"index": 1}]) == (2, True)
+        assert batch.push([{"index": 2}]) == (3, False)
+
+    def test_pop_takes_the_oldest_messages(self, batch):
+        batch.push([{"index": index} for index in range(5)])
+
+        claim, messages, queued_at, remaining = batch.pop()
+
+        assert claim is not None
+        assert messages == [{"index": 0}, {"index": 1}, {"index": 2}]
+        assert queued_at is not None
+        assert remaining == 2
+        assert batch.pop()[1] == [{"index": 3}, {"index": 4}]
+
+    def test_pop_of_an_empty_batch(self, batch):
+        assert batch.pop() == (None, [], None, 0)
+
+    def test_popped_messages_stay_in_redis_until_acknowledged(self, batch):
+        batch.push([{"index": 0}, {"index": 1}])
+
+        claim, _, _, _ = batch.pop()
+
+        assert batch.client.llen(claim) == 2
+        batch.ack(claim)
+        assert not batch.client.exists(claim)
+        assert batch.client.zcard(batch.claims_key) == 0
+
+    def test_requeue_stale_puts_back_the_messages_in_order(self, batch):
+        batch.push([{"index": index} for index in range(5)])
+        batch.pop()
+        batch.pop()
+        # the claims are not stale yet
+        assert batch.requeue_stale() == 0
+
+        batch.claim_timeout = 0
+        assert batch.requeue_stale() == 5
+
+        assert batch.pop()[1] == [{"index": 0}, {"index": 1}, {"index": 2}]
+
+    def test_flush_acknowledges_the_sent_messages(self, batch, mocker):
+        mocker.patch.dict(security.security_email_batches, {"bulk": batch})
+        send = mocker.patch.object(security, "send_security_email_messages")
+        batch.push([{"index": 0}])
+
+        security.flush_security_emails(lane="bulk")
+
+        send.assert_called_once_with([{"index": 0}], lane="bulk")
+        assert batch.client.zcard(batch.claims_key) == 0
+
+    def test_flush_keeps_the_messages_of_a_failed_send(self, batch, mocker):
+        mocker.patch.dict(security.security_email_batches, {"bulk": batch})
+        mocker.patch.object(security, "send_security_email_messages", side_effect=RuntimeError)
+        batch.push([{"index": 0}])
+
+        with pytest.raises(RuntimeError):
+            security.flush_security_emails(lane="bulk")
+
+        batch.claim_timeout = 0
+        assert batch.requeue_stale() == 1
+        assert batch.pop()[1] == [{"index": 0}]
+
+
+@pytest.mark.unit
+class TestEmailQueues:
+    @pytest.mark.parametrize(
+        "message, lane",
+        [
+            ({"token_type": "password_reset"}, "password_reset"),
+            ({"token_type": "activation", "bulk": False}, "activation"),
+            ({"token_type": "password_reset", "bulk": True}, "bulk"),
+        ],
+    )
+    def test_lane_of_the_messages(self, message, lane):
+        assert get_security_email_lane(message) == lane
+
+    @pytest.mark.parametrize(
+        "kwargs, queue",
+        [
+            ({"lane": "password_reset"}, "emails.password_reset"),
+            ({"lane": "verification"}, "emails.verification"),
+            ({"lane": None}, "emails.bulk"),
+            ({}, "emails.bulk"),
+            (None, "emails.bulk"),
+        ],
+    )
+    def test_email_tasks_are_routed_by_lane(self, kwargs, queue):
+        route = route_email_task(security.flush_security_emails.name, (), kwargs, {})
+
+        assert route == {"queue": queue}
+
+    def test_other_tasks_are_not_routed(self):
+        name = "services.country.tasks.onboarding.provision_country"
+
+        assert route_email_task(name, (), {}, {}) is None
+
+    def test_celery_routes_the_email_tasks(self):
+        route = app.amqp.router.route(
+            {}, security.send_email.name, (), {"lane": "activation"}
+        )
+
+        assert route["queue"].name == "emails.activation"
+
+
+@pytest.mark.unit
+def test_tokens_minted_in_bulk_are_published_at_once(mocker):
+    publish = mocker.patch("services.mailer.signals.security.publish")
+    users = [mocker.Mock(id=index) for index in range(3)]
+
+    tokens = BaseToken.for_users(users, purpose="activation")
+
+    (topic, messages), _ = publish.call_args
+    assert publish.call_count == 1
+    assert topic == SECURITY_EMAIL_TOPIC
+    assert [message["token"] for message in messages] == [str(token) for token in tokens]
+    assert {get_security_email_lane(message) for message in messages} == {BULK_LANE}
+
+
+@pytest.mark.unit
+class TestSendEmail:
+    payload = {
+        "data": {},
+        "html_template_path": "email.html",
+        "text_template_path": "email.txt",
+        "subject": "subject",
+        "recipient": "user@example.com",
+    }
+
+    def test_transient_error_is_retried(self, mocker):
+        error = smtplib.SMTPServerDisconnected()
+        mocker.patch.object(security, "send_templated_email", side_effect=error)
+        retry = mocker.patch.object(security.send_email, "retry", return_value=Retry())
+
+        with pytest.raises(Retry):
+            security.send_email(**self.payload)
+
+        assert retry.call_args.kwargs["exc"] is error
+
+    def test_permanent_error_is_raised(self, mocker):
+        error = smtplib.SMTPRecipientsRefused({"user@example.com": (550, b"unknown")})
+        mocker.patch.object(security, "send_templated_email", side_effect=error)
+        retry = mocker.patch.object(security.send_email, "retry")
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            security.send_email(**self.payload)
+
+        retry.assert_not_called()
+
+
+@pytest.mark.integration
+@pytest.mark.django_views
+class MailViewSetTests(UserTenantTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = MailViewSet.as_view({"get": "list"})
+        self.user = User.objects.create_superuser(
+            email="admin@example.com", username="admin", password="password", country=self.tenant
+        )
+        # a user has a country of its own, without a schema here
+        (other_country,) = Country.objects.bulk_create([Country(name="other", schema_name="other")])
+        self.recipient = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="password",
+            country=other_country,
+            is_active=True,
+        )
+
+    def list(self, user, **params):
+        request = self.factory.get("/mails/", params)
+        force_authenticate(request, user=user)
+        return self.view(request)
+
+    @override_settings(EMAIL_FROM="noreply@example.com")
+    def test_list_newest_first_by_cursor(self):
+        log_mails(
+            [
+                {"subject": f"subject {index}", "message": "body", "recipient_ids": [self.recipient.pk]}
+                for index in range(3)
+            ]
+        )
+
+        response = self.list(self.user, page_size=2)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(len(results), 2)
+        self.assertGreaterEqual(results[0]["created_at"], results[1]["created_at"])
+        self.assertEqual(results[0]["recipients"], [self.recipient.pk])
+        self.assertIsNotNone(response.data["next"])
+
+    def test_list_requires_the_view_permission(self):
+        response = self.list(self.recipient)
+
+        self.assertEqual(response.status_code, 403)
+
+
+@pytest.mark.integration
+class MailPartitionTests(UserTenantTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the test schema keeps the unpartitioned table of the migrations
+        with mock.patch("services.mailer.signals.partitions.maintain_partitions"):
+            super().setUpClass()
+
+    def setUp(self):
+        self.schema_name = self.tenant.schema_name
+        self.archive_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="password",
+            country=self.tenant,
+        )
+        self.old_month = partitions.add_months(
+            partitions.month_start(timezone.now()), -14
+        )
+        with override_settings(EMAIL_FROM="noreply@example.com"):
+            self.old_mail, *_ = log_mails(
+                [
+                    {
+                        "subject": f"subject {index}",
+                        "message": "body",
+                        "recipient_ids": [self.user.pk],
+                    }
+                    for index in range(3)
+                ]
+            )
+        Mail.objects.filter(pk=self.old_mail.pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=430)
+        )
+
+    def maintain(self, **options) -> dict:
+        return partitions.maintain_partitions(
+            self.schema_name, months_ahead=2, **options
+        )
+
+    def get_partitions(self) -> list[datetime.date]:
+        with connection.cursor() as cursor:
+            return partitions.get_partitions(cursor, self.schema_name)
+
+    def is_partitioned(self) -> bool:
+        with connection.cursor() as cursor:
+            return partitions.is_partitioned(cursor, self.schema_name)
+
+    def test_new_country_mails_are_partitioned(self):
+        self.assertFalse(self.is_partitioned())
+
+        post_schema_sync.send(sender=TenantMixin, tenant=self.tenant)
+
+        self.assertTrue(self.is_partitioned())
+
+    def test_convert_keeps_the_rows_and_the_ids(self):
+        report = self.maintain()
+
+        self.assertTrue(report["converted"])
+        self.assertTrue(self.is_partitioned())
+        current = partitions.month_start(timezone.now())
+        self.assertEqual(self.get_partitions()[0], self.old_month)
+        self.assertEqual(self.get_partitions()[-1], partitions.add_months(current, 2))
+        self.assertEqual(Mail.objects.count(), 3)
+        self.assertEqual(MailRecipient.objects.count(), 3)
+        with override_settings(EMAIL_FROM="noreply@example.com"):
+            (mail,) = log_mails(
+                [{"subject": "new", "message": "body", "recipient_ids": []}]
+            )
+        self.assertEqual(
+            mail.pk,
+            max(Mail.objects.exclude(pk=mail.pk).values_list("pk", flat=True)) + 1,
+        )
+
+    def test_maintain_is_idempotent(self):
+        self.maintain()
+
+        report = self.maintain()
+
+        self.assertEqual(
+            report,
+            {
+                "schema": self.schema_name,
+                "converted": False,
+                "created": 0,
+                "archived": [],
+            },
+        )
+
+    def test_archive_requires_an_existing_directory(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.maintain(retention_months=12)
+        with self.assertRaises(ImproperlyConfigured):
+            self.maintain(
+                retention_months=12,
+                archive_dir=os.path.join(self.archive_dir, "missing"),
+            )
+
+    def test_old_partitions_are_dumped_then_dropped(self):
+        report = self.maintain(retention_months=12, archive_dir=self.archive_dir)
+
+        path = os.path.join(
+            self.archive_dir,
+            self.schema_name,
+            f"{partitions.get_partition_name(self.old_month)}.csv.gz",
+        )
+        self.assertIn(path, report["archived"])
+        self.assertNotIn(self.old_month, self.get_partitions())
+        self.assertFalse(Mail.objects.filter(pk=self.old_mail.pk).exists())
+        self.assertFalse(
+            MailRecipient.objects.filter(mail_id=self.old_mail.pk).exists()
+        )
+        self.assertEqual(Mail.objects.count(), 2)
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            self.assertEqual(len(file.read().splitlines()), 2)  # header and the mail
+        with open(path, "rb") as file:
+            checksum = hashlib.sha256(file.read()).hexdigest()
+        with open(f"{path}.sha256", encoding="utf-8") as file:
+            self.assertEqual(file.read(), f"{checksum}  {os.path.basename(path)}\n")
+        recipients = os.path.join(
+            os.path.dirname(path),
+            os.path.basename(path).replace("mailer_mail", "mailer_mail_recipients"),
+        )
+        self.assertTrue(os.path.exists(f"{recipients}.sha256"))
+
+    def test_partition_is_kept_if_the_dump_can_not_be_verified(self):
+        self.maintain()
+
+        with mock.patch.object(
+            partitions, "verify_dump", side_effect=OSError("bad dump")
+        ):
+            with self.assertRaises(OSError):
+                self.maintain(retention_months=12, archive_dir=self.archive_dir)
+
+        self.assertIn(self.old_month, self.get_partitions())
+        self.assertTrue(Mail.objects.filter(pk=self.old_mail.pk).exists())
+        self.assertEqual(
+            MailRecipient.objects.filter(mail_id=self.old_mail.pk).count(), 1
+        )
+
+
+@pytest.mark.integration
+class SecurityEmailPayloadTests(UserTenantTestCase):
+    def setUp(self):
+        self.enterContext(
+            override_settings(CACHES=LOCAL_CACHES, CLIENT_URL="https://app.test.com/login")
+        )
+        self.enterContext(mock.patch.object(tenant_cache, "bus"))
+        tenant_cache.local.clear()
+        tenant_cache.shared.clear()
+        # a user has a country of its own, without a schema here
+        countries = [self.tenant] + Country.objects.bulk_create(
+            [Country(name=f"other{index}", schema_name=f"other{index}") for index in range(2)]
+        )
+        self.users = [
+            User.objects.create_user(
+                email=f"user{index}@example.com",
+                username=f"user{index}",
+                password="password",
+                country=country,
+            )
+            for index, country in enumerate(countries)
+        ]
+        self.tokens = BaseToken.for_users(
+            self.users, purpose="password_reset", should_signal=False
+        )
+        self.messages = [make_security_email_message(token) for token in self.tokens]
+
+    def test_message_holds_the_token_only(self):
+        message = self.messages[0]
+
+        assert message == {
+            "token": str(self.tokens[0]),
+            "token_type": "password_reset",
+            "intended_for": "user.User",
+            "id": str(self.users[0].pk),
+            "schema": self.tenant.schema_name,
+            "bulk": False,
+        }
+
+    def test_payloads_are_built_in_bulk(self):
+        # the recipients, then the primary domain of each country once
+        with self.assertNumQueries(1 + len(self.users)):
+            payloads = make_security_email_payloads(self.messages)
+        with self.assertNumQueries(1):
+            make_security_email_payloads(self.messages)
+
+        assert [payload["recipient"] for payload in payloads] == [
+            user.email for user in self.users
+        ]
+        assert [payload["data"]["token"] for payload in payloads] == [
+            str(token) for token in self.tokens
+        ]
+        # the other countries have no domain
+        assert [payload["data"]["client_url"] for payload in payloads] == [
+            f"https://{get_subdomain(self.domain.domain)}.app.test.com/login",
+            "https://app.test.com/login",
+            "https://app.test.com/login",
+        ]
+        assert {payload["subject"] for payload in payloads} == {"Reset your password"}
+
+    def test_deleted_recipients_are_skipped(self):
+        self.users[1].delete()
+
+        payloads = make_security_email_payloads(self.messages)
+
+        assert [payload["recipient"] for payload in payloads] == [
+            self.users[0].email,
+            self.users[2].email,
+        ]
@@ -0,0 +1,7 @@
+from rest_framework.routers import DefaultRouter
+from services.mailer.views.mail import MailViewSet
+
+router = DefaultRouter()
+router.register(r"", MailViewSet, basename="mails")
+
+urlpatterns = router.urls
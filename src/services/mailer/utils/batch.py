@@ -0,0 +1,198 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the redis lists (one per lane) collecting the pending security
+emails, which `flush_security_emails` sends in batches over one SMTP connection
+instead of opening a task (and a send) per email.
+"""
+
+import os
+import time
+import uuid
+from typing import Optional
+
+import redis
+from django.conf import settings
+from kombu.utils.json import dumps, loads
+from prometheus_client import Counter, Histogram
+
+from services.mailer.utils.queues import SECURITY_EMAIL_LANES
+
+SECURITY_EMAIL_BATCH_SIZE = Histogram(
+    "security_email_batch_size",
+    "Number of security emails sent by a flush.",
+    ["lane"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+SECURITY_EMAIL_FLUSH_LATENCY = Histogram(
+    "security_email_flush_latency_seconds",
+    "Seconds the oldest email of a batch waited before being sent.",
+    ["lane"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+SECURITY_EMAIL_RETRIES = Counter(
+    "security_email_retries",
+    "Security emails of a batch which failed and were retried individually.",
+    ["lane"],
+)
+
+
+class EmailBatch:
+    """
+    Redis list of pending email messages.
+    1. `push` appends messages and tells the caller whether a flush is due:
+       the batch is full (`max_messages`), or the first message
+       started the `max_delay` timer.
+    2. `pop` atomically moves up to `max_messages` messages to a processing
+       list of its own (the claim), so concurrent flushes never send
+       the same email twice.
+    3. `ack` deletes the claim once its messages are sent (and logged).
+       `requeue_stale` puts back the messages of the claims older than
+       `claim_timeout` (e.g. of a worker which died while sending them),
+       so an email is sent at least once.
+    The timer is a redis key expiring after `max_delay`, so it never blocks
+    a later flush. A flush task lost with a worker delays the pending messages
+    to the next push or the next periodic flush (celery beat), whichever comes first.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        key: str,
+        max_messages: int,
+        max_delay: float,
+        claim_timeout: float,
+    ):
+        """
+        :param redis_url: Url of the redis server
+        :param key: Key of the redis list
+        :param max_messages: Number of messages sent by a flush
+        :param max_delay: Seconds a message may wait for its batch to fill up
+        :param claim_timeout: Seconds after which the messages of a claim
+            which was not acknowledged are queued again. It must be longer
+            than a flush, or the messages of a slow flush are sent twice.
+        """
+        self.redis_url = redis_url
+        self.key = key
+        self.max_messages = max_messages
+        self.max_delay = max_delay
+        self.claim_timeout = claim_timeout
+        self._client: Optional[redis.Redis] = None
+        self._client_pid: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls, lane: str):
+        """
+        Build the batch of the lane from `settings.SECURITY_EMAIL_BATCH`.
+        """
+        config = getattr(settings, "SECURITY_EMAIL_BATCH", {})
+        config = {**config, **config.get("LANES", {}).get(lane, {})}
+        return cls(
+            redis_url=config.get("REDIS_URL"),
+            key=f'{config.get("KEY", "security-emails")}:{lane}',
+            max_messages=config.get("MAX_MESSAGES", 50),
+            max_delay=config.get("MAX_DELAY_MS", 200) / 1000,
+            claim_timeout=config.get("CLAIM_TIMEOUT", 300),
+        )
+
+    @property
+    def client(self) -> redis.Redis:
+        # redis connections must not be shared with a forked child
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = redis.Redis.from_url(self.redis_url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    @property
+    def timer_key(self) -> str:
+        return f"{self.key}:timer"
+
+    @property
+    def claims_key(self) -> str:
+        # sorted set of the claims, scored by the time they were taken at
+        return f"{self.key}:claims"
+
+    def push(self, messages: list[dict]) -> tuple[int, bool]:
+        """
+        Append the messages to the list.
+        Raises `redis.RedisError` if redis is unavailable.
+
+        :return: the length of the list and whether the messages started the timer
+        """
+        queued_at = time.time()
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.rpush(
+            self.key, *(dumps({"queued_at": queued_at, "message": message}) for message in messages)
+        )
+        pipeline.set(self.timer_key, 1, nx=True, px=max(int(self.max_delay * 1000), 1))
+        length, timer_started = pipeline.execute()
+        return length, bool(timer_started)
+
+    def pop(self) -> tuple[Optional[str], list[dict], Optional[float], int]:
+        """
+        Move the oldest `max_messages` messages to a new claim.
+        The messages stay in redis until the claim is acknowledged (`ack`).
+
+        :return: the key of the claim (None if the list was empty), the messages,
+            the time the oldest one was queued at (None if the list was empty)
+            and the number of messages left in the list
+        """
+        length = self.client.llen(self.key)
+        if not length:
+            return None, [], None, 0
+
+        claim = f"{self.key}:claim:{uuid.uuid4().hex}"
+        pipeline = self.client.pipeline(transaction=True)
+        # the list may have been shortened by another flush, LMOVE then returns None
+        for _ in range(min(length, self.max_messages)):
+            pipeline.lmove(self.key, claim, "LEFT", "RIGHT")
+        pipeline.zadd(self.claims_key, {claim: time.time()})
+        pipeline.llen(self.key)
+        *items, _, remaining = pipeline.execute()
+        entries = [loads(item) for item in items if item is not None]
+        if not entries:
+            self.client.zrem(self.claims_key, claim)
+            return None, [], None, remaining
+        queued_at = min(entry["queued_at"] for entry in entries)
+        return claim, [entry["message"] for entry in entries], queued_at, remaining
+
+    def ack(self, claim: str) -> None:
+        """
+        Delete the claim, its messages were sent.
+        """
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.delete(claim)
+        pipeline.zrem(self.claims_key, claim)
+        pipeline.execute()
+
+    def requeue_stale(self) -> int:
+        """
+        Put back the messages of the claims older than `claim_timeout`
+        at the head of the list, in their order.
+
+        :return: the number of messages queued again
+        """
+        # newest first, so the oldest claim ends up at the head of the list
+        claims = self.client.zrevrangebyscore(
+            self.claims_key, time.time() - self.claim_timeout, "-inf"
+        )
+        requeued = 0
+        for claim in claims:
+            # moved one at a time, a concurrent requeue of the same claim can not duplicate them
+            while self.client.lmove(claim, self.key, "RIGHT", "LEFT") is not None:
+                requeued += 1
+            self.client.zrem(self.claims_key, claim)
+        return requeued
+
+    def get_backlog(self) -> tuple[int, Optional[float]]:
+        """
+        Return the number of pending messages and the time the oldest one
+        was queued at (None if there is none).
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.llen(self.key)
+        pipeline.lindex(self.key, 0)
+        length, oldest = pipeline.execute()
+        return length, loads(oldest)["queued_at"] if oldest else None
+
+
+security_email_batches = {lane: EmailBatch.from_settings(lane) for lane in SECURITY_EMAIL_LANES}
@@ -0,0 +1,61 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the functions recording the delivered emails
+in the `Mail` table of the current schema.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from services.mailer.models import Mail
+
+logger = logging.getLogger(__name__)
+
+
+def log_mails(entries: list[dict]) -> list[Mail]:
+    """
+    Record the delivered emails with two inserts, whatever their number:
+    one for the mails and one for all their recipients (the m2m table).
+
+    :param entries: dicts with the `subject`, the `message`
+        and the `recipient_ids` (users) of each email
+    :return: the created mails
+    """
+    if not entries:
+        return []
+    with transaction.atomic():
+        return _log_mails(entries)
+
+
+def _log_mails(entries: list[dict]) -> list[Mail]:
+    mails = Mail.objects.bulk_create(
+        [
+            Mail(sender=settings.EMAIL_FROM, subject=entry["subject"], message=entry["message"])
+            for entry in entries
+        ]
+    )
+    through = Mail.recipients.through
+    through.objects.bulk_create(
+        [
+            through(mail_id=mail.pk, user_id=recipient_id)
+            for mail, entry in zip(mails, entries)
+            for recipient_id in entry["recipient_ids"]
+        ],
+        ignore_conflicts=True,
+    )
+    return mails
+
+
+def try_log_mails(entries: list[dict]) -> list[Mail]:
+    """
+    Same as `log_mails`, but a failure is logged instead of raised:
+    the emails are already sent, the log must not abort the sending
+    (or the retries) of the other emails.
+    """
+    try:
+        return log_mails(entries)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not log %s delivered emails", len(entries))
+        return []
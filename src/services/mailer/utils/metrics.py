@@ -0,0 +1,120 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the metrics of the email queues: the depth and the age
+of the oldest message of each Celery email queue and pending batch,
+read from redis when the metrics are scraped.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import redis
+from celery.signals import before_task_publish
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+from core.celery import app
+from services.mailer.utils.batch import security_email_batches
+from services.mailer.utils.queues import SECURITY_EMAIL_LANES, get_email_queue
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_AT_HEADER = "published_at"
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    """
+    Record the publication time of every task in its headers,
+    the age of the oldest message of a queue is computed from it.
+    """
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+class EmailQueueCollector:
+    """
+    Prometheus collector of the email queues:
+    - the Celery queue of each lane (a redis list of the broker),
+    - the pending batch of each lane (`security_email_batches`).
+    """
+
+    def __init__(self, broker_url: str):
+        self.broker_url = broker_url
+        self._client: Optional[redis.Redis] = None
+        self._client_pid: Optional[int] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        # redis connections must not be shared with a forked child
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = redis.Redis.from_url(self.broker_url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def get_queue_backlog(self, queue: str) -> tuple[int, Optional[float]]:
+        """
+        Return the number of messages of the queue and the time the oldest
+        one was published at (None if there is none or it is not stamped).
+        Kombu pushes on the left of the list and pops on the right.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.llen(queue)
+        pipeline.lindex(queue, -1)
+        length, oldest = pipeline.execute()
+        if not oldest:
+            return length, None
+        try:
+            return length, json.loads(oldest)["headers"][PUBLISHED_AT_HEADER]
+        except (ValueError, KeyError, TypeError):
+            return length, None
+
+    @staticmethod
+    def make_families() -> tuple[GaugeMetricFamily, GaugeMetricFamily]:
+        depth = GaugeMetricFamily(
+            "email_queue_depth", "Messages waiting in the email queue.", labels=["queue"]
+        )
+        age = GaugeMetricFamily(
+            "email_queue_oldest_age_seconds",
+            "Age of the oldest message waiting in the email queue.",
+            labels=["queue"],
+        )
+        return depth, age
+
+    def describe(self):
+        # without it, registering the collector would read redis
+        return list(self.make_families())
+
+    def collect(self):
+        depth, age = self.make_families()
+        now = time.time()
+        backlogs = {}
+        try:
+            for lane in SECURITY_EMAIL_LANES:
+                queue = get_email_queue(lane)
+                backlogs[queue] = self.get_queue_backlog(queue)
+                backlogs[f"{queue}.pending"] = security_email_batches[lane].get_backlog()
+        except redis.RedisError:
+            logger.warning("Could not read the email queues", exc_info=True)
+            return
+        for queue, (length, oldest) in backlogs.items():
+            depth.add_metric([queue], length)
+            age.add_metric([queue], max(now - oldest, 0) if oldest else 0)
+        yield depth
+        yield age
+
+
+_collector: Optional[EmailQueueCollector] = None
+
+
+def register_email_queue_collector() -> None:
+    """
+    Register the collector of the email queues once per process.
+    """
+    global _collector  # pylint: disable=global-statement
+    if _collector is None:
+        _collector = EmailQueueCollector(app.conf.broker_read_url or app.conf.broker_url)
+        REGISTRY.register(_collector)
@@ -0,0 +1,287 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the functions partitioning the `Mail` table of a country schema
+by month of `created_at` (postgres declarative range partitioning),
+creating the partitions ahead of time and archiving the old ones.
+
+The queries filtering or ordering on `created_at` (e.g. the cursor
+pagination of `MailViewSet`) only read the partitions of their range.
+The month boundaries are in UTC.
+"""
+
+import csv
+import datetime
+import gzip
+import hashlib
+import logging
+import os
+import re
+from typing import Optional
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.postgresql_backend.base import _check_schema_name
+
+from services.mailer.models import Mail, MailRecipient
+
+logger = logging.getLogger(__name__)
+
+MAIL_TABLE = Mail._meta.db_table  # pylint: disable=protected-access
+RECIPIENT_TABLE = MailRecipient._meta.db_table  # pylint: disable=protected-access
+LEGACY_TABLE = f"{MAIL_TABLE}_legacy"
+DEFAULT_PARTITION = f"{MAIL_TABLE}_default"
+PARTITION_PATTERN = re.compile(rf"^{MAIL_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value: datetime.datetime) -> datetime.date:
+    return value.astimezone(datetime.timezone.utc).date().replace(day=1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def get_partition_name(month: datetime.date) -> str:
+    return f"{MAIL_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(cursor, schema_name: str) -> bool:
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = %s AND c.relname = %s",
+        [schema_name, MAIL_TABLE],
+    )
+    row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def get_partitions(cursor, schema_name: str) -> list[datetime.date]:
+    """
+    Return the months of the partitions of the mail table, oldest first.
+    """
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "JOIN pg_namespace n ON n.oid = p.relnamespace "
+        "WHERE n.nspname = %s AND p.relname = %s",
+        [schema_name, MAIL_TABLE],
+    )
+    months = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partitions(cursor, schema_name: str, first: datetime.date, last: datetime.date) -> int:
+    """
+    Create the monthly partitions from the month `first` to the month `last`
+    (included) which do not exist yet.
+
+    :return: the number of created partitions
+    """
+    existing = set(get_partitions(cursor, schema_name))
+    created = 0
+    month = first
+    while month <= last:
+        if month not in existing:
+            cursor.execute(
+                f'CREATE TABLE "{schema_name}"."{get_partition_name(month)}" '
+                f'PARTITION OF "{schema_name}"."{MAIL_TABLE}" '
+                "FOR VALUES FROM (%s) TO (%s)",
+                [
+                    datetime.datetime.combine(month, datetime.time(), datetime.timezone.utc),
+                    datetime.datetime.combine(add_months(month, 1), datetime.time(), datetime.timezone.utc),
+                ],
+            )
+            created += 1
+        month = add_months(month, 1)
+    return created
+
+
+def convert_to_partitioned(cursor, schema_name: str, months_ahead: int) -> None:
+    """
+    Replace the mail table of the schema by a partitioned table with the same
+    columns and rows. The table is locked for the time of the copy.
+    Rows outside the monthly partitions end up in the default partition.
+    """
+    table = f'"{schema_name}"."{MAIL_TABLE}"'
+    legacy = f'"{schema_name}"."{LEGACY_TABLE}"'
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"ALTER TABLE {table} RENAME TO \"{LEGACY_TABLE}\"")
+    # the index names are unique per schema, the partitioned table reuses them
+    cursor.execute(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s",
+        [schema_name, LEGACY_TABLE],
+    )
+    for (index_name,) in cursor.fetchall():
+        cursor.execute(
+            f'ALTER INDEX "{schema_name}"."{index_name}" RENAME TO "{index_name[:50]}_legacy"'
+        )
+
+    # the identity / serial default belongs to the legacy table, it is replaced below
+    cursor.execute(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    )
+    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
+    # a unique constraint of a partitioned table must include the partition key
+    cursor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT "{MAIL_TABLE}_pkey" PRIMARY KEY (id, created_at)'
+    )
+    cursor.execute(
+        f'CREATE INDEX "mailer_mail_created_idx" ON {table} (created_at DESC, id DESC)'
+    )
+    cursor.execute(f'CREATE TABLE "{schema_name}"."{DEFAULT_PARTITION}" PARTITION OF {table} DEFAULT')
+
+    cursor.execute(f"SELECT min(created_at), max(id) FROM {legacy}")
+    oldest, max_id = cursor.fetchone()
+    now = timezone.now()
+    create_partitions(
+        cursor,
+        schema_name,
+        month_start(oldest or now),
+        add_months(month_start(now), months_ahead),
+    )
+    cursor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+
+    # the foreign keys (e.g. of the recipients) can not reference a partitioned table
+    cursor.execute(
+        "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+        "WHERE confrelid = %s::regclass",
+        [f"{schema_name}.{LEGACY_TABLE}"],
+    )
+    for constraint_name, relation in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {relation} DROP CONSTRAINT "{constraint_name}"')
+    cursor.execute(f"DROP TABLE {legacy}")
+
+    sequence = f'"{schema_name}"."{MAIL_TABLE}_id_seq"'
+    cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.id")
+    cursor.execute("SELECT setval(%s, %s, false)", [sequence, (max_id or 0) + 1])
+    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}'::regclass)")
+
+
+def dump_query(cursor, query: str, path: str) -> None:
+    """
+    Write the rows of the query to the path as a gzip compressed csv file
+    with a header, synced to the disk.
+    """
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as file:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", file)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def verify_dump(path: str, expected_rows: int) -> str:
+    """
+    Read the dump back (gzip checks its CRC) and compare its number of rows
+    with the number of rows of the table.
+    Raises `OSError` if they differ.
+
+    :return: the sha256 checksum of the dump
+    """
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+        rows = sum(1 for _ in csv.reader(file)) - 1  # header
+    if rows != expected_rows:
+        raise OSError(f"The dump {path} has {rows} rows instead of {expected_rows}")
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def archive_partition(cursor, schema_name: str, month: datetime.date, directory: str) -> str:
+    """
+    Dump the partition of the month and the recipients of its mails to gzip
+    compressed csv files, verify the dumps, then detach and drop the partition.
+    The checksum of each dump is written next to it (`<dump>.sha256`,
+    the format of `sha256sum`).
+    It runs in the transaction of the caller: the partition is only dropped
+    if the dumps were verified, and nothing is dropped if the transaction fails.
+
+    :return: the path of the dump of the mails
+    """
+    partition = f'"{schema_name}"."{get_partition_name(month)}"'
+    recipients = f'"{schema_name}"."{RECIPIENT_TABLE}"'
+    os.makedirs(os.path.join(directory, schema_name), exist_ok=True)
+    mails_path = os.path.join(directory, schema_name, f"{get_partition_name(month)}.csv.gz")
+    recipients_path = os.path.join(
+        directory, schema_name, f"{RECIPIENT_TABLE}_{month.year:04d}_{month.month:02d}.csv.gz"
+    )
+    recipients_query = f"SELECT r.* FROM {recipients} r JOIN {partition} m ON m.id = r.mail_id"
+
+    cursor.execute(f"LOCK TABLE {partition} IN SHARE MODE")
+    for query, path in ((f"SELECT * FROM {partition}", mails_path), (recipients_query, recipients_path)):
+        cursor.execute(f"SELECT count(*) FROM ({query}) AS rows")
+        (expected_rows,) = cursor.fetchone()
+        dump_query(cursor, query, path)
+        checksum = verify_dump(path, expected_rows)
+        with open(f"{path}.sha256", "w", encoding="utf-8") as file:
+            file.write(f"{checksum}  {os.path.basename(path)}\n")
+
+    cursor.execute(f"DELETE FROM {recipients} r USING {partition} m WHERE m.id = r.mail_id")
+    cursor.execute(f'ALTER TABLE "{schema_name}"."{MAIL_TABLE}" DETACH PARTITION {partition}')
+    cursor.execute(f"DROP TABLE {partition}")
+    return mails_path
+
+
+def check_archive_dir(archive_dir: Optional[str]) -> None:
+    """
+    Raise `ImproperlyConfigured` if the partitions can not be archived to the directory.
+    It is not created: a missing directory is likely a volume which is not mounted.
+    """
+    if not archive_dir:
+        raise ImproperlyConfigured("MAIL_ARCHIVE_DIR is required to archive the mail partitions")
+    if not os.path.isdir(archive_dir):
+        raise ImproperlyConfigured(f"The mail archive directory {archive_dir} does not exist")
+
+
+def maintain_partitions(
+    schema_name: str,
+    months_ahead: int,
+    retention_months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+) -> dict:
+    """
+    Partition the mail table of the schema if it is not yet,
+    create the partitions of the next months and archive the partitions
+    older than the retention. Every step is idempotent.
+
+    :param schema_name: Name of the country schema
+    :param months_ahead: Number of months after the current one to create partitions for
+    :param retention_months: Number of months before the current one to keep,
+        None to keep everything
+    :param archive_dir: Existing directory of the dumps of the archived partitions,
+        required to archive. It must be persistent and backed up: the archived
+        partitions are dropped from the database.
+    :return: what was done
+    """
+    _check_schema_name(schema_name)
+    if retention_months is not None:
+        check_archive_dir(archive_dir)
+    report = {"schema": schema_name, "converted": False, "created": 0, "archived": []}
+    current = month_start(timezone.now())
+    with connection.cursor() as cursor:
+        with transaction.atomic():
+            if not is_partitioned(cursor, schema_name):
+                convert_to_partitioned(cursor, schema_name, months_ahead)
+                report["converted"] = True
+            report["created"] = create_partitions(
+                cursor, schema_name, current, add_months(current, months_ahead)
+            )
+
+        if retention_months is None:
+            return report
+        oldest_kept = add_months(current, -retention_months)
+        for month in get_partitions(cursor, schema_name):
+            if month >= oldest_kept:
+                break
+            with transaction.atomic():
+                report["archived"].append(archive_partition(cursor, schema_name, month, archive_dir))
+            logger.info("Archived the mails of %s of %s", month.strftime("%Y-%m"), schema_name)
+    return report
@@ -0,0 +1,36 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the lanes of the security emails: each purpose has its own
+pending batch and Celery queue, so a bulk send can not delay
+the password reset email a user is waiting for.
+"""
+
+# in priority order, the email workers consume the queues in this order
+SECURITY_EMAIL_LANES = ("password_reset", "activation", "verification", "bulk")
+# tokens minted in bulk (`BaseToken.for_users`), whatever their purpose
+BULK_LANE = "bulk"
+EMAIL_TASKS_PREFIX = "services.mailer.tasks.security."
+
+
+def get_security_email_lane(message: dict) -> str:
+    """
+    Return the lane of a message built by `make_security_email_message`.
+    """
+    return BULK_LANE if message.get("bulk") else message["token_type"]
+
+
+def get_email_queue(lane: str) -> str:
+    """
+    Return the Celery queue of the lane.
+    """
+    return f"emails.{lane}"
+
+
+def route_email_task(name, args, kwargs, options, task=None, **kw):  # pylint: disable=unused-argument
+    """
+    Celery router (`task_routes`) sending the email tasks
+    to the queue of their `lane` keyword argument.
+    """
+    if not name.startswith(EMAIL_TASKS_PREFIX):
+        return None
+    return {"queue": get_email_queue((kwargs or {}).get("lane") or BULK_LANE)}
@@ -1,6 +1,12 @@
+import functools
+from collections import defaultdict
+
 from django.apps import apps
 from django.conf import settings
-from django_tenants.utils import tenant_context
+from django.db import connection
+
+from services.country.models import Domain
+from services.country.utils.tenant_cache import tenant_cache
 
 
 def get_subdomain(domain: str) -> str:
@@ -24,48 +30,121 @@ def append_subdomain(url: str, subdomain: str) -> str:
     return url
 
 
-def make_security_email_payload(
-        token,
-):
+def make_security_email_message(token, bulk: bool = False) -> dict:
     """
-    This signal is triggered when a verification token is generated.
-    It sends the verification token to the user.
+    Build the minimal message of a token's email, published instead of
+    the email payload so no query runs in the request which minted the token.
+    `make_security_email_payloads` turns it into the payload in the worker.
+
+    :param token: the token to send
+    :param bulk: whether the token was minted in bulk, its email
+        then goes through the lowest priority lane
     """
+    return {
+        "token": str(token),
+        "token_type": token["token_type"],
+        "intended_for": token["intended_for"],
+        # token claims hold the primary keys as strings (e.g. UUIDs)
+        "id": str(token["id"]),
+        # the recipients live in the schema of the country
+        "schema": connection.schema_name,
+        "bulk": bulk,
+    }
+
 
-    token_type = token["token_type"]
-    intended_for = token["intended_for"]
+def group_security_email_messages(messages) -> dict[str, list[dict]]:
+    """
+    Group the messages by the schema of the country they are for,
+    their payloads have to be built (and their mails logged) in that schema.
+    """
+    by_schema = defaultdict(list)
+    for message in messages:
+        by_schema[message["schema"]].append(message)
+    return by_schema
 
-    if model := apps.get_model(intended_for):
-        instance = model.objects.get(id=token["id"])
-        secret = str(token)
 
-        html_template_path = SECURITY_EMAIL_TEMPLATES[intended_for][token_type]["html"]
-        text_template_path = SECURITY_EMAIL_TEMPLATES[intended_for][token_type]["text"]
-        subject = SECURITY_EMAIL_SUBJECTS[intended_for][token_type]
-        recipient = instance.email
+def make_security_mail_log(payload: dict) -> dict:
+    """
+    Build the mail log entry (`services.mailer.utils.log.log_mails`)
+    of a sent security email. The body is not stored, since it holds
+    a valid token, only the template it was rendered from.
+    """
+    return {
+        "subject": payload["subject"],
+        "message": payload["text_template_path"],
+        "recipient_ids": [payload["data"]["id"]],
+    }
+
+
+def make_security_email_payloads(messages) -> list[dict]:
+    """
+    Build the email payloads of many messages at once, in the current schema.
+    The recipients are loaded with a single query per model
+    and the client url is resolved once per country.
+    Messages whose recipient does not exist anymore are skipped.
+    """
+
+    instance_ids = defaultdict(set)
+    for message in messages:
+        instance_ids[message["intended_for"]].add(message["id"])
+
+    instances = {}
+    for intended_for, ids in instance_ids.items():
+        queryset = apps.get_model(intended_for).objects.all()
+        instances[intended_for] = {
+            str(pk): instance for pk, instance in queryset.in_bulk(list(ids)).items()
+        }
+
+    client_urls = {}
+    payloads = []
+    for message in messages:
+        token_type = message["token_type"]
+        intended_for = message["intended_for"]
+        instance = instances[intended_for].get(message["id"])
+        if instance is None:
+            continue
 
         data = instance.to_dict()
-        data["token"] = secret
+        data["token"] = message["token"]
         if intended_for == "user.User":
-            country = getattr(instance, "country", None)
-            if not country:
-                country = instance.country
-            with tenant_context(country):
-                client_url = settings.CLIENT_URL
-                client_subdomain = get_subdomain(
-                    country.domains.first().domain
-                )
-                data["client_url"] = append_subdomain(client_url, client_subdomain)
+            if instance.country_id not in client_urls:
+                client_urls[instance.country_id] = get_client_url(instance.country_id)
+            data["client_url"] = client_urls[instance.country_id]
         else:
             data["client_url"] = settings.CLIENT_URL
 
-        return {
-            "data": data,
-            "html_template_path": html_template_path,
-            "text_template_path": text_template_path,
-            "subject": subject,
-            "recipient": recipient,
-        }
+        payloads.append(
+            {
+                "data": data,
+                "html_template_path": SECURITY_EMAIL_TEMPLATES[intended_for][token_type]["html"],
+                "text_template_path": SECURITY_EMAIL_TEMPLATES[intended_for][token_type]["text"],
+                "subject": SECURITY_EMAIL_SUBJECTS[intended_for][token_type],
+                "recipient": instance.email,
+            }
+        )
+    return payloads
+
+
+def get_client_url(country_id) -> str:
+    """
+    Return the client url of the country
+    (the client url with the subdomain of the country's primary domain).
+    The primary domain is cached by `tenant_cache` and invalidated
+    when a domain of the country changes, so no query is run on a hit.
+    """
+    domain = tenant_cache.get_primary_domain(Domain, country_id)
+    if domain is None:
+        return settings.CLIENT_URL
+    return build_client_url(settings.CLIENT_URL, domain)
+
+
+@functools.lru_cache(maxsize=1024)
+def build_client_url(client_url: str, domain: str) -> str:
+    """
+    Return the client url with the subdomain of the domain.
+    It only depends on its arguments, so it is computed once per domain.
+    """
+    return append_subdomain(client_url, get_subdomain(domain))
 
 
 SECURITY_EMAIL_SUBJECTS = {
@@ -92,3 +171,15 @@ SECURITY_EMAIL_TEMPLATES = {
         },
     },
 }
+
+
+def get_security_template_paths() -> list[str]:
+    """
+    Return the paths of all the security email templates.
+    """
+    return [
+        path
+        for templates in SECURITY_EMAIL_TEMPLATES.values()
+        for paths in templates.values()
+        for path in paths.values()
+    ]
@@ -1,5 +1,50 @@
-from rest_framework import viewsets
+"""
+Mail views
+The mails are only created by the email tasks (the log of the delivered emails),
+the API is read-only.
+"""
 
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import mixins, viewsets
+from rest_framework.pagination import CursorPagination
 
-class MailViewSet(viewsets.ModelViewSet):
-    pass
+from helpers.auth.custom_jwt import JWTAuth
+from helpers.permissions.model import ModelPermissions
+from services.mailer.filters.mail import MailFilterSet
+from services.mailer.models import Mail
+from services.mailer.serializers.mail import MailSerializer
+
+
+class MailCursorPagination(CursorPagination):
+    """
+    Keyset pagination, newest first.
+    A page is a range scan of the `created_at` index,
+    however deep it is in the log.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class MailViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    API endpoint for the log of the delivered emails.
+    """
+
+    queryset = Mail.objects.prefetch_related("recipients")
+    serializer_class = MailSerializer
+
+    pagination_class = MailCursorPagination
+
+    # the order is fixed by the cursor pagination
+    filterset_class = MailFilterSet
+    filter_backends = (DjangoFilterBackend,)
+
+    authentication_classes = [JWTAuth]
+    permission_classes = [ModelPermissions]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class OutboxConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "services.outbox"
+
+    def ready(self):
+        import services.outbox.utils.handlers  # noqa: F401 pylint: disable=unused-import
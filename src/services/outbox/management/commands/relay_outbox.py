@@ -0,0 +1,47 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the command running the outbox relay.
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from services.outbox.utils.relay import OutboxRelay
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish the messages of the outbox as their transactions commit. "
+        "Several relays can run at the same time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Publish the available messages and exit",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve the prometheus metrics of the relay on this port",
+        )
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay.from_settings()
+        if options["once"]:
+            count = relay.drain()
+            self.stdout.write(f"Published {count} messages.")
+            return
+
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"])
+
+        stopping = []
+        # the current batch is finished before exiting
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stopping.append(True))
+        self.stdout.write("Relaying the outbox messages...")
+        relay.run(should_stop=lambda: bool(stopping))
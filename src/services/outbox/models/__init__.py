@@ -0,0 +1 @@
+from .message import OutboxMessage
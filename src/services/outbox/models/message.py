@@ -0,0 +1,30 @@
+"""
+Outbox entities
+A message is written in the transaction which produces it
+and published by the relay once the transaction is committed
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    A message waiting to be published by the relay.
+    It is deleted once published.
+    """
+
+    topic = models.CharField(max_length=100, help_text="Name of the handler publishing the message")
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    # a message whose handler failed is retried after this time
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["available_at", "id"], name="outbox_available_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.topic} #{self.pk}"
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from services.outbox.models import OutboxMessage
+from services.outbox.utils.relay import OutboxRelay
+
+pytestmark = [pytest.mark.django_db, pytest.mark.integration]
+
+
+@pytest.fixture
+def relay():
+    return OutboxRelay(batch_size=10, poll_interval=1, retry_delay=5, max_retry_delay=60)
+
+
+@pytest.fixture
+def handlers(mocker):
+    """
+    Handlers of the topics, by topic (`get_handler` of the relay).
+    """
+    registry = {"sent": mocker.Mock(), "broken": mocker.Mock(side_effect=RuntimeError("broker down"))}
+    mocker.patch("services.outbox.utils.relay.get_handler", side_effect=registry.__getitem__)
+    return registry
+
+
+def make_messages(topic: str, count: int, **fields) -> list[OutboxMessage]:
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(topic=topic, payload={"index": index}, **fields) for index in range(count)]
+    )
+
+
+def test_relay_batch_publishes_and_deletes_messages(relay, handlers):
+    make_messages("sent", 3)
+
+    assert relay.relay_batch() == 3
+
+    handlers["sent"].assert_called_once_with([{"index": 0}, {"index": 1}, {"index": 2}])
+    assert not OutboxMessage.objects.exists()
+
+
+def test_relay_batch_takes_at_most_batch_size_messages(relay, handlers):
+    make_messages("sent", 15)
+
+    assert relay.relay_batch() == 10
+    assert OutboxMessage.objects.count() == 5
+    assert relay.drain() == 5
+    assert not OutboxMessage.objects.exists()
+
+
+def test_relay_batch_keeps_failed_messages_with_backoff(relay, handlers):
+    make_messages("broken", 2)
+    before = timezone.now()
+
+    assert relay.relay_batch() == 2
+
+    messages = list(OutboxMessage.objects.all())
+    assert len(messages) == 2
+    for message in messages:
+        assert message.attempts == 1
+        assert "broker down" in message.error
+        assert message.available_at >= before + timedelta(seconds=5)
+    # not available before the retry delay
+    assert relay.relay_batch() == 0
+
+
+def test_relay_batch_doubles_the_retry_delay(relay, handlers):
+    (message,) = make_messages("broken", 1, attempts=3)
+    before = timezone.now()
+
+    relay.relay_batch()
+
+    message.refresh_from_db()
+    assert message.attempts == 4
+    assert before + timedelta(seconds=40) <= message.available_at < before + timedelta(seconds=60)
+
+
+def test_get_retry_delay_is_capped(relay):
+    assert [relay.get_retry_delay(attempts) for attempts in (1, 2, 3, 4, 5)] == [5, 10, 20, 40, 60]
+
+
+def test_relay_batch_failing_topic_does_not_block_the_others(relay, handlers):
+    make_messages("broken", 1)
+    make_messages("sent", 2)
+
+    assert relay.relay_batch() == 3
+
+    handlers["sent"].assert_called_once_with([{"index": 0}, {"index": 1}])
+    assert list(OutboxMessage.objects.values_list("topic", flat=True)) == ["broken"]
+
+
+def test_relay_batch_retries_failed_messages_once_available(relay, handlers):
+    make_messages("sent", 1, attempts=1, available_at=timezone.now() - timedelta(seconds=1))
+    make_messages("sent", 1, attempts=1, available_at=timezone.now() + timedelta(minutes=1))
+
+    assert relay.relay_batch() == 1
+    assert OutboxMessage.objects.count() == 1
@@ -0,0 +1,25 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the outbox handlers of the messages
+which are not specific to an app.
+"""
+
+from core.celery import app
+
+from services.outbox.utils.outbox import CELERY_TASK_TOPIC, register_handler
+
+
+@register_handler(CELERY_TASK_TOPIC)
+def publish_celery_tasks(payloads: list[dict]) -> None:
+    """
+    Send the tasks written by `send_task`, on a single broker connection.
+    """
+    with app.producer_or_acquire() as producer:
+        for payload in payloads:
+            app.send_task(
+                payload["task"],
+                args=payload["args"],
+                kwargs=payload["kwargs"],
+                producer=producer,
+                **payload["options"],
+            )
@@ -0,0 +1,87 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the functions writing messages to the outbox
+and the registry of the handlers publishing them.
+
+A message is written in the current transaction, so it is only
+published (by the relay, see `services.outbox.utils.relay`)
+if the transaction commits, and the request does not wait for the broker.
+
+    >>> @register_handler("audit")
+    ... def publish_audit_events(payloads):
+    ...     ...
+    >>> publish("audit", [{"user": 1, "action": "login"}])
+"""
+
+from typing import Callable, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from services.outbox.models import OutboxMessage
+
+# Channel notified when messages are written.
+# Postgres delivers the notifications on commit only, and drops them on rollback.
+NOTIFY_CHANNEL = "outbox"
+CELERY_TASK_TOPIC = "celery.task"
+
+_handlers: dict[str, Callable[[list], None]] = {}
+
+
+def register_handler(topic: str):
+    """
+    Register the decorated function as the handler of the topic.
+    It is called by the relay with the payloads of a batch of messages,
+    and must raise if they could not be published (they are retried later).
+    A message may be published more than once (the relay may stop
+    after the handler and before deleting the message).
+    """
+
+    def decorator(func: Callable[[list], None]):
+        if _handlers.get(topic, func) is not func:
+            raise ValueError(f"The topic {topic} already has a handler.")
+        _handlers[topic] = func
+        return func
+
+    return decorator
+
+
+def get_handler(topic: str) -> Callable[[list], None]:
+    """
+    Return the handler of the topic.
+    Raises `KeyError` if the topic has no handler.
+    """
+    return _handlers[topic]
+
+
+def publish(topic: str, payloads: list, using: Optional[str] = None) -> None:
+    """
+    Write the payloads to the outbox, in the current transaction.
+
+    :param topic: Topic of the messages, a handler must be registered for it
+    :param payloads: JSON serializable payloads, one per message
+    :param using: Alias of the database
+    """
+    if not payloads:
+        return
+    using = using or DEFAULT_DB_ALIAS
+    OutboxMessage.objects.using(using).bulk_create(
+        [OutboxMessage(topic=topic, payload=payload) for payload in payloads]
+    )
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, topic])
+
+
+def send_task(name: str, args=(), kwargs=None, **options) -> None:
+    """
+    Send the Celery task once the current transaction commits,
+    like `app.send_task`, but through the outbox.
+
+    :param name: Name of the task
+    :param args: Positional arguments of the task
+    :param kwargs: Keyword arguments of the task
+    :param options: Options of `apply_async` (e.g. queue, countdown)
+    """
+    publish(
+        CELERY_TASK_TOPIC,
+        [{"task": name, "args": list(args), "kwargs": kwargs or {}, "options": options}],
+    )
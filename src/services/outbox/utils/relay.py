@@ -0,0 +1,208 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the relay publishing the messages of the outbox.
+It waits for the notifications of `publish` (polling as a fallback),
+takes the committed messages in batches, hands them over to the handler
+of their topic and deletes them once published.
+"""
+
+import logging
+import select
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from prometheus_client import Counter, Gauge, Histogram
+
+from services.outbox.models import OutboxMessage
+from services.outbox.utils.outbox import NOTIFY_CHANNEL, get_handler
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_RELAY_LAG = Histogram(
+    "outbox_relay_lag_seconds",
+    "Seconds between the write of a message and its publication.",
+    ["topic"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+OUTBOX_MESSAGES_RELAYED = Counter(
+    "outbox_messages_relayed",
+    "Messages handed over to their handler by the relay.",
+    ["topic", "result"],  # result is "published" or "failed"
+)
+OUTBOX_PENDING_MESSAGES = Gauge(
+    "outbox_pending_messages",
+    "Messages of the outbox not published yet.",
+)
+OUTBOX_OLDEST_MESSAGE_AGE = Gauge(
+    "outbox_oldest_message_age_seconds",
+    "Age of the oldest message of the outbox not published yet.",
+)
+
+
+class OutboxRelay:
+    """
+    Publishes the messages of the outbox.
+    1. The messages are locked with `SKIP LOCKED`, so several relays
+       can run side by side without publishing the same batch.
+    2. The messages of a batch are grouped by topic, and each handler
+       gets all the payloads of its topic at once.
+    3. The messages of a failing handler are kept and retried
+       with an exponential backoff.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        retry_delay: float,
+        max_retry_delay: float,
+        using: str = DEFAULT_DB_ALIAS,
+    ):
+        """
+        :param batch_size: Maximum number of messages taken at a time
+        :param poll_interval: Seconds to wait for a notification before
+            looking for messages anyway (e.g. messages to retry)
+        :param retry_delay: Seconds before a failed message is retried,
+            doubled after every failed attempt
+        :param max_retry_delay: Upper bound of the retry delay
+        :param using: Alias of the database
+        """
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.using = using
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Build the relay from `settings.OUTBOX`.
+        """
+        config = getattr(settings, "OUTBOX", {})
+        return cls(
+            batch_size=config.get("BATCH_SIZE", 500),
+            poll_interval=config.get("POLL_INTERVAL", 5),
+            retry_delay=config.get("RETRY_DELAY", 5),
+            max_retry_delay=config.get("MAX_RETRY_DELAY", 600),
+        )
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def relay_batch(self) -> int:
+        """
+        Publish a batch of the available messages.
+
+        :return: the number of messages taken (published or failed)
+        """
+        now = timezone.now()
+        with transaction.atomic(using=self.using):
+            messages = list(
+                OutboxMessage.objects.using(self.using)
+                .select_for_update(skip_locked=True)
+                .filter(available_at__lte=now)
+                .order_by("id")[: self.batch_size]
+            )
+            if not messages:
+                return 0
+
+            by_topic = defaultdict(list)
+            for message in messages:
+                by_topic[message.topic].append(message)
+
+            published, failed = [], []
+            for topic, topic_messages in by_topic.items():
+                try:
+                    get_handler(topic)([message.payload for message in topic_messages])
+                except Exception as error:  # pylint: disable=broad-except
+                    logger.exception("Could not publish %s %s messages", len(topic_messages), topic)
+                    OUTBOX_MESSAGES_RELAYED.labels(topic=topic, result="failed").inc(len(topic_messages))
+                    for message in topic_messages:
+                        message.attempts += 1
+                        message.available_at = now + timedelta(seconds=self.get_retry_delay(message.attempts))
+                        message.error = repr(error)
+                    failed.extend(topic_messages)
+                    continue
+                published_at = timezone.now()
+                OUTBOX_MESSAGES_RELAYED.labels(topic=topic, result="published").inc(len(topic_messages))
+                for message in topic_messages:
+                    OUTBOX_RELAY_LAG.labels(topic=topic).observe(
+                        (published_at - message.created_at).total_seconds()
+                    )
+                published.extend(topic_messages)
+
+            if published:
+                OutboxMessage.objects.using(self.using).filter(
+                    pk__in=[message.pk for message in published]
+                ).delete()
+            if failed:
+                OutboxMessage.objects.using(self.using).bulk_update(
+                    failed, ["attempts", "available_at", "error"]
+                )
+        return len(messages)
+
+    def get_retry_delay(self, attempts: int) -> float:
+        return min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+
+    def drain(self) -> int:
+        """
+        Publish the available messages until none is left.
+
+        :return: the number of messages taken
+        """
+        total = 0
+        while True:
+            count = self.relay_batch()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    def update_gauges(self) -> None:
+        stats = OutboxMessage.objects.using(self.using).aggregate(
+            pending=Count("id"), oldest=Min("created_at")
+        )
+        OUTBOX_PENDING_MESSAGES.set(stats["pending"])
+        oldest = stats["oldest"]
+        OUTBOX_OLDEST_MESSAGE_AGE.set((timezone.now() - oldest).total_seconds() if oldest else 0)
+
+    def listen(self) -> None:
+        self.connection.ensure_connection()
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{NOTIFY_CHANNEL}"')
+
+    def wait(self, timeout: float) -> None:
+        """
+        Wait for a notification or the timeout.
+        """
+        raw_connection = self.connection.connection
+        if select.select([raw_connection], [], [], timeout)[0]:
+            raw_connection.poll()
+            raw_connection.notifies.clear()
+
+    def run(self, should_stop: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Publish the messages until `should_stop` returns True.
+        A lost database connection is opened again after `poll_interval`.
+        """
+        should_stop = should_stop or (lambda: False)
+        listening = False
+        while not should_stop():
+            try:
+                if not listening:
+                    self.listen()
+                    listening = True
+                self.drain()
+                self.update_gauges()
+                self.wait(self.poll_interval)
+            except DatabaseError:
+                logger.exception("The outbox relay lost the database, reconnecting")
+                self.connection.close()
+                listening = False
+                time.sleep(self.poll_interval)
@@ -7,3 +7,4 @@ class UserConfig(AppConfig):
 
     def ready(self):
         import services.user.signals.user  # noqa: F401 pylint: disable=unused-import
+        import services.user.signals.permissions  # noqa: F401 pylint: disable=unused-import
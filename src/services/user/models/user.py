@@ -12,6 +12,8 @@ from helpers.auth.token import (
     VerificationToken,
     BaseToken,
 )
+from helpers.auth import hashing
+from helpers.auth.user_cache import user_snapshot_cache
 
 
 class UserManager(BaseUserManager):
@@ -118,6 +120,31 @@ class User(AbstractUser):
         self.full_clean()
         super().save(*args, **kwargs)
 
+    def set_password(self, raw_password):
+        """
+        Set the password and drop the cached snapshot of the user,
+        so the authentication does not use the old state.
+        The password is hashed in the password hashing pool.
+        """
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+        if not self._state.adding:
+            user_snapshot_cache.invalidate(self.pk)
+
+    def check_password(self, raw_password):
+        """
+        Verify the password in the password hashing pool.
+        The password is re-hashed if the hasher is outdated.
+        """
+
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
     def create_token(
             self,
             purpose: str,
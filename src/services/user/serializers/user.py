@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
 from rest_framework import serializers
 
 from services.user.models.user import User
@@ -104,3 +107,35 @@ class UserPasswordResetSerializer(serializers.Serializer):
         user.set_password(self.validated_data["password"])
         user.save()
         return True
+
+
+class UserEmailListSerializer(serializers.Serializer):
+    """
+    Serializer for the batch endpoints
+    which take a list of user email addresses
+    """
+
+    # the addresses are validated by `validate_emails`: the errors
+    # of an `EmailField` child are keyed by their index, which
+    # the exception handler (exceptions_hog) can not report
+    emails = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=getattr(settings, "USER_BATCH_MAX_EMAILS", 1000),
+    )
+
+    def validate_emails(self, value):
+        """
+        Validate the addresses and drop the duplicated ones keeping the given order
+        """
+        invalid = []
+        for email in value:
+            try:
+                validate_email(email)
+            except DjangoValidationError:
+                invalid.append(email)
+        if invalid:
+            raise serializers.ValidationError(
+                f"Enter valid email addresses: {', '.join(invalid)}"
+            )
+        return list(dict.fromkeys(value))
@@ -0,0 +1,117 @@
+"""
+This file is part of the Yoona.ai project.
+It contains the logic for invalidating the cached
+permissions of users (see `helpers.permissions.cache`).
+The bulk operations of guardian (`bulk_assign_perm`, `assign_perm_to_many`)
+send none of these signals, their callers have to invalidate the cache.
+"""
+
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from helpers.permissions.cache import permission_cache
+from services.user.models import User
+
+
+def invalidate_groups(group_ids) -> None:
+    """
+    Drop the cached permissions of all the members of the given groups.
+    """
+    permission_cache.invalidate(
+        User.objects.filter(groups__in=group_ids).values_list("pk", flat=True).distinct()
+    )
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def manage_user_permissions_change(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        instance,
+        action: str,
+        reverse: bool,
+        pk_set,
+        **kwargs
+):
+    """
+    This signal is triggered when the groups or the permissions
+    of a user change (from either side of the relation).
+    """
+
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        permission_cache.invalidate([instance.pk])
+    elif action == "pre_clear":
+        # the members are unknown once the relation is cleared
+        permission_cache.invalidate(instance.user_set.values_list("pk", flat=True))
+    else:
+        permission_cache.invalidate(pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def manage_group_permissions_change(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        instance,
+        action: str,
+        reverse: bool,
+        pk_set,
+        **kwargs
+):
+    """
+    This signal is triggered when the permissions of a group change.
+    """
+
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_groups([instance.pk])
+    elif action == "pre_clear":
+        invalidate_groups(instance.group_set.values_list("pk", flat=True))
+    else:
+        invalidate_groups(pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+def manage_group_deletion(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        instance: Group,
+        **kwargs
+):
+    """
+    This signal is triggered before a group is deleted,
+    while its members are still known.
+    """
+
+    invalidate_groups([instance.pk])
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+def manage_user_object_permission_change(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        instance: UserObjectPermission,
+        **kwargs
+):
+    """
+    This signal is triggered when an object permission
+    of a user is assigned or removed.
+    """
+
+    permission_cache.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def manage_group_object_permission_change(
+        sender,  # noqa: F841 pylint: disable=unused-argument
+        instance: GroupObjectPermission,
+        **kwargs
+):
+    """
+    This signal is triggered when an object permission
+    of a group is assigned or removed.
+    """
+
+    invalidate_groups([instance.group_id])
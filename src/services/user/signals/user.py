@@ -3,9 +3,10 @@ This file is part of the Yoona.ai project.
 It contains the logic for sending emails to users.
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from helpers.auth.user_cache import user_snapshot_cache
 from services.user.models import User
 
 
@@ -24,3 +25,19 @@ def manage_post_creation(
 
     if created:
         instance.create_token(purpose="verification")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(
+        sender: User,  # noqa: F841 pylint: disable=unused-argument
+        instance: User,
+        **kwargs
+):
+    """
+    This signal is triggered when a user is saved or deleted.
+    It drops the cached snapshot of the user
+    which is used by the JWT authentication.
+    """
+
+    user_snapshot_cache.invalidate(instance.pk)
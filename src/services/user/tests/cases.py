@@ -0,0 +1,32 @@
+from django.db import connection
+from django_tenants.test.cases import TenantTestCase
+
+from services.country.models import Country, Domain
+
+
+def drop_tenant(tenant: Country, domain: Domain) -> None:
+    """
+    Drop the schema before deleting the country: `Country.delete`
+    looks for the users of the country (a tenant app) in its schema.
+    """
+    connection.set_schema_to_public()
+    domain.delete()
+    tenant._drop_schema(force_drop=True)  # pylint: disable=protected-access
+    Country.objects.filter(pk=tenant.pk)._raw_delete(  # pylint: disable=protected-access
+        connection.alias
+    )
+
+
+class UserTenantTestCase(TenantTestCase):
+    """
+    TenantTestCase of the tenant apps, the users live in the test schema.
+    """
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.name = "test"
+
+    @classmethod
+    def tearDownClass(cls):
+        drop_tenant(cls.tenant, cls.domain)
+        cls.remove_allowed_test_domain()
@@ -0,0 +1,104 @@
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.test import override_settings
+from guardian.shortcuts import assign_perm, remove_perm
+
+from helpers.permissions.cache import permission_cache
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase
+
+LOCAL_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "shared")
+}
+
+
+@pytest.mark.integration
+@pytest.mark.django_signals
+class PermissionCacheTests(UserTenantTestCase):
+    def setUp(self):
+        # `TenantTestCase` skips the class-level `override_settings`
+        self.enterContext(override_settings(CACHES=LOCAL_CACHES))
+        self.user = User.objects.create_user(
+            email="user@test.com",
+            username="user",
+            password="password",
+            country=self.tenant,
+            is_active=True,
+        )
+        self.group = Group.objects.create(name="readers")
+        self.permission = Permission.objects.get(
+            content_type__app_label="mailer", codename="view_mail"
+        )
+
+    def has_perm(self, perm: str, obj=None) -> bool:
+        # the permissions are kept on the instance, as for a request
+        return User.objects.get(pk=self.user.pk).has_perm(perm, obj)
+
+    def assertCached(self, cached: bool = True):
+        key = permission_cache.make_key(self.user.pk)
+        self.assertEqual(permission_cache.shared.get(key) is not None, cached)
+
+    def test_permissions_are_cached(self):
+        self.assertFalse(self.has_perm("mailer.view_mail"))
+        self.assertCached()
+
+        with self.assertNumQueries(0):
+            self.assertFalse(self.user.has_perm("mailer.view_mail"))
+
+    def test_user_permission_change_invalidates(self):
+        self.has_perm("mailer.view_mail")
+
+        self.user.user_permissions.add(self.permission)
+
+        self.assertCached(False)
+        self.assertTrue(self.has_perm("mailer.view_mail"))
+
+    def test_group_membership_change_invalidates(self):
+        self.group.permissions.add(self.permission)
+        self.assertFalse(self.has_perm("mailer.view_mail"))
+
+        self.user.groups.add(self.group)
+        self.assertTrue(self.has_perm("mailer.view_mail"))
+
+        self.group.user_set.clear()
+        self.assertFalse(self.has_perm("mailer.view_mail"))
+
+    def test_group_permission_change_invalidates_its_members(self):
+        self.user.groups.add(self.group)
+        self.assertFalse(self.has_perm("mailer.view_mail"))
+
+        self.group.permissions.add(self.permission)
+
+        self.assertTrue(self.has_perm("mailer.view_mail"))
+
+    def test_group_deletion_invalidates_its_members(self):
+        self.group.permissions.add(self.permission)
+        self.user.groups.add(self.group)
+        self.assertTrue(self.has_perm("mailer.view_mail"))
+
+        self.group.delete()
+
+        self.assertFalse(self.has_perm("mailer.view_mail"))
+
+    def test_object_permission_grant_invalidates(self):
+        other = Group.objects.create(name="other")
+        self.assertFalse(self.has_perm("auth.change_group", self.group))
+
+        assign_perm("auth.change_group", self.user, self.group)
+
+        self.assertTrue(self.has_perm("auth.change_group", self.group))
+        self.assertFalse(self.has_perm("auth.change_group", other))
+
+        remove_perm("auth.change_group", self.user, self.group)
+
+        self.assertFalse(self.has_perm("auth.change_group", self.group))
+
+    def test_group_object_permission_grant_invalidates_its_members(self):
+        other = Group.objects.create(name="other")
+        self.user.groups.add(self.group)
+        self.assertFalse(self.has_perm("auth.change_group", other))
+
+        assign_perm("auth.change_group", self.group, other)
+
+        self.assertTrue(self.has_perm("auth.change_group", other))
@@ -0,0 +1,98 @@
+from unittest import mock
+
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from services.country.models import Country
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase
+from services.user.views.user import UserViewSet
+
+
+@pytest.mark.integration
+@pytest.mark.django_views
+class ResendBatchTests(UserTenantTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", password="password", country=self.tenant
+        )
+        # a user has a country of its own, without a schema here
+        countries = Country.objects.bulk_create(
+            [Country(name=f"other{index}", schema_name=f"other{index}") for index in range(2)]
+        )
+        self.pending, self.done = [
+            User.objects.create_user(
+                email=f"user{index}@example.com",
+                username=f"user{index}",
+                password="password",
+                country=country,
+                is_active=bool(index),
+                is_verified=bool(index),
+            )
+            for index, country in enumerate(countries)
+        ]
+        self.publish = self.enterContext(
+            mock.patch("services.mailer.signals.security.publish")
+        )
+
+    def resend(self, action: str, emails: list[str]):
+        request = self.factory.post("/", {"emails": emails}, format="json")
+        force_authenticate(request, user=self.admin)
+        view = UserViewSet.as_view({"post": action}, **getattr(UserViewSet, action).kwargs)
+        return view(request)
+
+    def get_sent(self) -> list[tuple[str, str]]:
+        return [
+            (message["token_type"], message["id"])
+            for (_, messages), _ in self.publish.call_args_list
+            for message in messages
+        ]
+
+    def test_verification_status_per_email(self):
+        emails = [self.pending.email, "unknown@example.com", self.done.email, self.pending.email]
+
+        response = self.resend("resend_verification_batch", emails)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"email": self.pending.email, "status": "sent"},
+                {"email": "unknown@example.com", "status": "not_registered"},
+                {"email": self.done.email, "status": "already_verified"},
+            ],
+        )
+        self.assertEqual(self.get_sent(), [("verification", str(self.pending.pk))])
+        self.assertEqual(self.publish.call_count, 1)
+
+    def test_activation_status_per_email(self):
+        response = self.resend("resend_activation_batch", [self.done.email, self.pending.email])
+
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["already_active", "sent"],
+        )
+        self.assertEqual(self.get_sent(), [("activation", str(self.pending.pk))])
+
+    def test_users_are_loaded_at_once(self):
+        emails = [f"unknown{index}@example.com" for index in range(10)] + [self.pending.email]
+
+        # the users only, the outbox is mocked
+        with self.assertNumQueries(1):
+            self.resend("resend_activation_batch", emails)
+
+    def test_invalid_emails_are_rejected(self):
+        response = self.resend(
+            "resend_verification_batch", [self.pending.email, "not an email"]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["attr"], "emails")
+        self.assertEqual(response.data["detail"], "Enter valid email addresses: not an email")
+        self.publish.assert_not_called()
+
+    def test_empty_list_is_rejected(self):
+        response = self.resend("resend_verification_batch", [])
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,82 @@
+import pytest
+from django.test import override_settings
+
+from helpers.auth.user_cache import user_snapshot_cache
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase
+
+LOCAL_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "shared")
+}
+
+
+@pytest.mark.integration
+@pytest.mark.django_signals
+class UserSnapshotCacheTests(UserTenantTestCase):
+    def setUp(self):
+        # `TenantTestCase` skips the class-level `override_settings`
+        self.enterContext(override_settings(CACHES=LOCAL_CACHES))
+        self.user = User.objects.create_user(
+            email="user@test.com",
+            username="user",
+            password="password",
+            country=self.tenant,
+            is_active=True,
+        )
+        self.key = user_snapshot_cache.make_key(self.user.pk)
+        self.addCleanup(user_snapshot_cache.local.clear)
+
+    def load(self) -> User:
+        return user_snapshot_cache.get(User, "id", self.user.pk)
+
+    def assertCached(self, cached: bool = True):
+        self.assertEqual(user_snapshot_cache.local.get(self.key) is not None, cached)
+        self.assertEqual(user_snapshot_cache.shared.get(self.key) is not None, cached)
+
+    def test_get_caches_the_snapshot_in_both_tiers(self):
+        user = self.load()
+
+        self.assertEqual(user.email, "user@test.com")
+        self.assertCached()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.load().pk, self.user.pk)
+
+    def test_snapshot_has_no_password(self):
+        self.load()
+
+        self.assertNotIn("password", user_snapshot_cache.shared.get(self.key))
+
+    def test_save_evicts_the_snapshot(self):
+        self.load()
+
+        self.user.first_name = "changed"
+        self.user.save()
+
+        self.assertCached(False)
+        self.assertEqual(self.load().first_name, "changed")
+
+    def test_set_password_evicts_the_snapshot(self):
+        self.load()
+
+        self.user.set_password("changed")
+
+        self.assertCached(False)
+
+    def test_delete_evicts_the_snapshot(self):
+        self.load()
+
+        self.user.delete()
+
+        self.assertCached(False)
+        with self.assertRaises(User.DoesNotExist):
+            self.load()
+
+    def test_snapshot_is_evicted_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.save()
+            # read by a concurrent request before the commit
+            self.load()
+
+        self.assertTrue(callbacks)
+        self.assertCached(False)
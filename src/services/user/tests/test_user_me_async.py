@@ -0,0 +1,75 @@
+from uuid import uuid4
+
+import pytest
+from django.db import connection
+from django_tenants.utils import schema_context
+from rest_framework_simplejwt.tokens import AccessToken
+
+from helpers.auth.custom_jwt import JWTAuth
+from services.country.models import Country, Domain
+from services.user.models import User
+from services.user.tests.cases import UserTenantTestCase, drop_tenant
+
+
+@pytest.mark.integration
+@pytest.mark.django_views
+class UserMeAsyncTests(UserTenantTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connection.set_schema_to_public()
+        cls.other_tenant = Country(schema_name="other", name="other")
+        cls.other_tenant.save(verbosity=0)
+        cls.other_domain = Domain.objects.create(
+            tenant=cls.other_tenant, domain="other.test.com", is_primary=True
+        )
+        connection.set_tenant(cls.tenant)
+
+    @classmethod
+    def tearDownClass(cls):
+        drop_tenant(cls.other_tenant, cls.other_domain)
+        super().tearDownClass()
+
+    def setUp(self):
+        # the same id in both tenants, only the schema tells them apart
+        self.user_id = uuid4()
+        self.user = self.create_user(self.tenant, "user@test.com")
+        self.other_user = self.create_user(self.other_tenant, "user@other.com")
+
+    def create_user(self, tenant: Country, email: str) -> User:
+        with schema_context(tenant.schema_name):
+            return User.objects.create_user(
+                id=self.user_id,
+                email=email,
+                username=email,
+                password="password",
+                country=tenant,
+                is_active=True,
+                is_verified=True,
+            )
+
+    def get_me(self, domain: Domain):
+        token = AccessToken.for_user(self.user)
+        return self.client.get(
+            "/users/me/async/",
+            HTTP_HOST=domain.domain,
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+    def test_me_is_the_user_of_the_tenant_of_the_request(self):
+        response = self.get_me(self.domain)
+        other_response = self.get_me(self.other_domain)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["email"], "user@test.com")
+        self.assertEqual(other_response.status_code, 200)
+        self.assertEqual(other_response.json()["email"], "user@other.com")
+
+    async def test_user_is_loaded_from_its_schema_whatever_the_connection(self):
+        # the connection was left on the tenant of another request
+        connection.set_tenant(self.other_tenant)
+        token = AccessToken.for_user(self.user)
+
+        user = await JWTAuth().aget_user(token, schema_name=self.tenant.schema_name)
+
+        self.assertEqual(user.email, "user@test.com")
@@ -1,7 +1,11 @@
-from services.user.views.user import UserViewSet
+from django.urls import path
+
+from services.user.views.user import UserMeView, UserViewSet
 from rest_framework import routers
 
 router = routers.DefaultRouter()
 router.register("", UserViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("me/async/", UserMeView.as_view(), name="user-me-async"),
+] + router.urls
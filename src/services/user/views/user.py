@@ -2,20 +2,24 @@
 This module contains the User views
 """
 
+from django.http import JsonResponse
+from django.utils.cache import add_never_cache_headers
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.cache import never_cache
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, ValidationError
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, DjangoObjectPermissions, IsAuthenticated
 from rest_framework.response import Response
 
 from helpers.auth.custom_jwt import JWTAuth
+from helpers.auth.token import BaseToken
 from helpers.mixins.permissions.policy import PermissionPolicyMixin
 from helpers.permissions.model import ModelPermissions
 from services.user.filters.user import UserFilterSet
@@ -24,6 +28,28 @@ from services.user.serializers.user import (UserPasswordResetSerializer)
 from services.user.serializers.user import (
     UserSerializer,
     UserActivationSerializer,
+    UserEmailListSerializer,
+)
+
+BATCH_RESEND_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["results"],
+    properties={
+        "results": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                required=["email", "status"],
+                properties={
+                    "email": openapi.Schema(type=openapi.TYPE_STRING),
+                    "status": openapi.Schema(
+                        type=openapi.TYPE_STRING,
+                        enum=["sent", "not_registered", "already_verified", "already_active"],
+                    ),
+                },
+            ),
+        ),
+    },
 )
 
 
@@ -226,10 +252,9 @@ class UserViewSet(PermissionPolicyMixin, viewsets.ModelViewSet):
             email to the user's email address (background task)
         """
         email = request.data.get("email")
-        user = User.objects.filter(email=email)
-        if not user.exists():
+        user = User.objects.filter(email=email).first()
+        if user is None:
             raise ValidationError(detail="User with provided email is not registered.")
-        user = user.first()
         if user.is_verified:
             raise ValidationError(detail="User is already verified.")
         user.create_token(
@@ -272,10 +297,9 @@ class UserViewSet(PermissionPolicyMixin, viewsets.ModelViewSet):
             to the user's email address (background task)
         """
         email = request.data.get("email")
-        user = User.objects.filter(email=email)
-        if not user.exists():
+        user = User.objects.filter(email=email).first()
+        if user is None:
             raise ValidationError(detail="User with provided email is not registered.")
-        user = user.first()
         if user.is_active:
             raise ValidationError(detail="User is already active.")
         user.create_token(purpose="activation", should_signal=True)
@@ -284,6 +308,115 @@ class UserViewSet(PermissionPolicyMixin, viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @swagger_auto_schema(
+        operation_summary="Resend verification emails in batch",
+        operation_description="Resend verification emails to a list of user emails",
+        request_body=UserEmailListSerializer,
+        responses={
+            200: openapi.Response(
+                description="Status per email",
+                schema=BATCH_RESEND_RESPONSE_SCHEMA,
+            ),
+        },
+        methods=["POST"],
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        serializer_class=UserEmailListSerializer,
+        url_path="resend-verification-batch",
+        url_name="resend-verification-batch",
+    )
+    def resend_verification_batch(
+            self, request, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        """
+        Batch version of `resend_verification` used to onboard
+        whole cohorts of users at once.
+        The following steps are performed:
+        1. Get all the users using a single query
+        2. Skip the unknown and already verified users
+        3. Issue the verification tokens in bulk,
+           the emails are enqueued as one chunked task (background task)
+        4. Return the status per email
+        """
+        return self._resend_batch(
+            request,
+            purpose="verification",
+            done_field="is_verified",
+            done_status="already_verified",
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Resend activation emails in batch",
+        operation_description="Resend activation emails to a list of user emails",
+        request_body=UserEmailListSerializer,
+        responses={
+            200: openapi.Response(
+                description="Status per email",
+                schema=BATCH_RESEND_RESPONSE_SCHEMA,
+            ),
+        },
+        methods=["POST"],
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        serializer_class=UserEmailListSerializer,
+        url_path="resend-activation-batch",
+        url_name="resend-activation-batch",
+    )
+    def resend_activation_batch(
+            self, request, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        """
+        Batch version of `resend_activation` used to onboard
+        whole cohorts of users at once.
+        The following steps are performed:
+        1. Get all the users using a single query
+        2. Skip the unknown and already active users
+        3. Issue the activation tokens in bulk,
+           the emails are enqueued as one chunked task (background task)
+        4. Return the status per email
+        """
+        return self._resend_batch(
+            request,
+            purpose="activation",
+            done_field="is_active",
+            done_status="already_active",
+        )
+
+    def _resend_batch(self, request, purpose, done_field, done_status):
+        """
+        Issue tokens of the given purpose for the users of the given emails.
+
+        :param purpose: token purpose (e.g. "verification")
+        :param done_field: user field which tells the token is not needed anymore
+        :param done_status: status reported for the users having `done_field` set
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        emails = serializer.validated_data["emails"]
+
+        users = {
+            user.email: user
+            for user in User.objects.filter(email__in=emails).only("id", "email", done_field)
+        }
+        results = []
+        recipients = []
+        for email in emails:
+            user = users.get(email)
+            if user is None:
+                results.append({"email": email, "status": "not_registered"})
+            elif getattr(user, done_field):
+                results.append({"email": email, "status": done_status})
+            else:
+                recipients.append(user)
+                results.append({"email": email, "status": "sent"})
+
+        BaseToken.for_users(recipients, purpose=purpose)
+        return Response(data={"results": results}, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
         operation_summary="Request password reset",
         operation_description="Request password reset for user",
@@ -364,10 +497,9 @@ class UserViewSet(PermissionPolicyMixin, viewsets.ModelViewSet):
         Request forgot password
         """
         email = request.data.get("email")
-        user = User.objects.filter(email=email)
-        if not user.exists():
+        user = User.objects.filter(email=email).first()
+        if user is None:
             raise ValidationError(detail="User with provided email is not registered.")
-        user = user.first()
         user.create_token(purpose="password_reset", should_signal=True)
         return Response(
             data={
@@ -416,3 +548,33 @@ class UserViewSet(PermissionPolicyMixin, viewsets.ModelViewSet):
             data={"message": "Password reset successful."},
             status=status.HTTP_200_OK,
         )
+
+
+class UserMeView(View):
+    """
+    Async version of `GET /users/me`.
+    It authenticates the request with `JWTAuth.aauthenticate`,
+    so under ASGI it does not go through the DRF sync stack.
+    """
+
+    async def get(
+            self, request, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        """
+        Get the current user.
+        """
+        try:
+            auth = await JWTAuth().aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+        except (AuthenticationFailed, NotAuthenticated) as exc:
+            detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+            return JsonResponse(data=detail, status=exc.status_code)
+
+        user, _ = auth
+        response = JsonResponse(
+            data=UserSerializer(user).data,
+            status=status.HTTP_200_OK,
+        )
+        add_never_cache_headers(response)
+        return response